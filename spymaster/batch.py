@@ -0,0 +1,294 @@
+import typing
+from typing import Callable, List, Optional, Sequence
+
+import numpy as np
+
+from spymaster.rng import game_rngs, numpy_rng
+from spymaster.spymaster import MissionResult, Spymaster, max_gain
+
+if typing.TYPE_CHECKING:
+    from spymaster.players import Player
+
+POWERS = 1 << np.arange(16, dtype=np.int64)
+CARDS = np.arange(16)
+MISSIONS = np.arange(1, 17)
+
+
+def masks_of(rows: np.ndarray) -> np.ndarray:
+    """Pack an (N, 16) boolean matrix into N bitmasks, as used by
+    Spymaster.
+    """
+    return rows @ POWERS
+
+
+OnRound = Callable[["BatchSpymaster", np.ndarray, np.ndarray], None]
+
+
+class BatchSpymaster:
+    """N games of Spymaster between the same two players, played in
+    lockstep.
+
+    The hands and remaining missions are (N, 16) boolean matrices:
+    white_cards[g, i] says whether White still holds card i in game g,
+    and remaining_missions[g, i] whether mission i + 1 is still to be
+    played. Each round draws a mission for every game at once and
+    resolves all N games with a single vectorized resolve.
+
+    If seeds are given, each game gets its own random.Random, which is
+    used both to draw its missions and by players picking one game at a
+    time, exactly as a Spymaster with that generator would. A seeded
+    game then plays out the same whether it is played alone, in any
+    batch, or in any worker process. Otherwise missions are drawn with
+    a single vectorized draw from rng.
+    """
+
+    def __init__(
+        self,
+        n_games: int,
+        white: "Player",
+        black: "Player",
+        rng: Optional[np.random.Generator] = None,
+        seeds: Optional[Sequence[int]] = None,
+    ):
+        if seeds is not None and len(seeds) != n_games:
+            raise ValueError(f"Expected {n_games} seeds, got {len(seeds)}")
+        self.n_games = n_games
+        self.white = white
+        self.black = black
+        self.rng = numpy_rng(rng)
+        self.rngs = game_rngs(seeds)
+        self.white_cards = np.ones((n_games, 16), dtype=bool)
+        self.black_cards = np.ones((n_games, 16), dtype=bool)
+        self.white_score = np.zeros(n_games, dtype=np.int64)
+        self.black_score = np.zeros(n_games, dtype=np.int64)
+        self.current_mission = np.zeros(n_games, dtype=np.int64)
+        self.remaining_missions = np.ones((n_games, 16), dtype=bool)
+
+    def __len__(self) -> int:
+        return self.n_games
+
+    def flipped(self) -> "BatchSpymaster":
+        """Black's view of the games. The arrays are shared, not copied."""
+        other = BatchSpymaster.__new__(BatchSpymaster)
+        other.n_games = self.n_games
+        other.white = self.black
+        other.black = self.white
+        other.rng = self.rng
+        other.rngs = self.rngs
+        other.white_cards = self.black_cards
+        other.black_cards = self.white_cards
+        other.white_score = self.black_score
+        other.black_score = self.white_score
+        other.current_mission = self.current_mission
+        other.remaining_missions = self.remaining_missions
+        return other
+
+    def game(self, index: int) -> Spymaster:
+        """A standalone Spymaster holding a copy of one of the games."""
+        return Spymaster.from_masks(
+            white=self.white,
+            black=self.black,
+            white_hand=int(masks_of(self.white_cards[index])),
+            black_hand=int(masks_of(self.black_cards[index])),
+            white_score=int(self.white_score[index]),
+            black_score=int(self.black_score[index]),
+            current_mission=int(self.current_mission[index]),
+            missions=int(masks_of(self.remaining_missions[index])),
+            rng=None if self.rngs is None else self.rngs[index],
+        )
+
+    def games(self) -> List[Spymaster]:
+        white_hands = masks_of(self.white_cards).tolist()
+        black_hands = masks_of(self.black_cards).tolist()
+        missions = masks_of(self.remaining_missions).tolist()
+        white_scores = self.white_score.tolist()
+        black_scores = self.black_score.tolist()
+        current = self.current_mission.tolist()
+        rngs = self.rngs or [None] * self.n_games
+        return [
+            Spymaster.from_masks(
+                white=self.white,
+                black=self.black,
+                white_hand=white_hands[g],
+                black_hand=black_hands[g],
+                white_score=white_scores[g],
+                black_score=black_scores[g],
+                current_mission=current[g],
+                missions=missions[g],
+                rng=rngs[g],
+            )
+            for g in range(self.n_games)
+        ]
+
+    def draw_missions(self) -> np.ndarray:
+        """Draw a mission uniformly at random from those remaining in
+        each game, and make it that game's current mission.
+        """
+        if self.rngs is None:
+            keys = self.rng.random((self.n_games, 16))
+            keys[~self.remaining_missions] = -1
+            drawn = keys.argmax(axis=1)
+        else:
+            # Same draw as Spymaster.draw_mission: the k-th remaining
+            # mission, where k is drawn from the game's own generator
+            counts = self.remaining_missions.sum(axis=1).tolist()
+            ks = [rng.randrange(n) for rng, n in zip(self.rngs, counts)]
+            ranks = self.remaining_missions.cumsum(axis=1)
+            hits = self.remaining_missions & (ranks == np.array(ks)[:, None] + 1)
+            drawn = hits.argmax(axis=1)
+        self.remaining_missions[np.arange(self.n_games), drawn] = False
+        self.current_mission[:] = drawn + 1
+        return self.current_mission
+
+    def randint(self, low, high, where: Optional[np.ndarray] = None) -> np.ndarray:
+        """An integer drawn uniformly from [low, high] for each game (or
+        for each game where where is True, and 0 for the rest). Bounds
+        may be scalars or one per game.
+
+        If the games are seeded, each is drawn with its own generator's
+        randint, exactly as a player picking in that game alone would
+        draw it, so that batched players keep seeded games reproducible.
+        """
+        low = np.broadcast_to(low, self.n_games)
+        high = np.broadcast_to(high, self.n_games)
+        out = np.zeros(self.n_games, dtype=np.int64)
+        if self.rngs is None:
+            draws = self.rng.random(self.n_games)
+            out[:] = low + (draws * (high - low + 1)).astype(np.int64)
+            if where is not None:
+                out[~where] = 0
+            return out
+        games = self.seeded_games(where)
+        lows = low.tolist()
+        highs = high.tolist()
+        rngs = self.rngs
+        out[games] = [rngs[g].randint(lows[g], highs[g]) for g in games]
+        return out
+
+    def random(self, where: Optional[np.ndarray] = None) -> np.ndarray:
+        """A float drawn uniformly from [0, 1) for each game (or for each
+        game where where is True, and 0 for the rest), as randint.
+        """
+        if self.rngs is None:
+            out = self.rng.random(self.n_games)
+            if where is not None:
+                out[~where] = 0
+            return out
+        out = np.zeros(self.n_games)
+        games = self.seeded_games(where)
+        rngs = self.rngs
+        out[games] = [rngs[g].random() for g in games]
+        return out
+
+    def seeded_games(self, where: Optional[np.ndarray]) -> List[int]:
+        if where is None:
+            return list(range(self.n_games))
+        return np.flatnonzero(where).tolist()
+
+    def resolve(
+        self, white_play: np.ndarray, black_play: np.ndarray
+    ) -> typing.Tuple[np.ndarray, np.ndarray]:
+        """Vectorized Spymaster.resolve. Remove the cards that were
+        played from every game and update the scores.
+
+        @param white_play: The cards that White played, one per game
+        @param black_play: The cards that Black played, one per game
+        @return: The points scored by White and by Black in each game
+        """
+        white_play = np.asarray(white_play, dtype=np.int64)
+        black_play = np.asarray(black_play, dtype=np.int64)
+        rows = np.arange(self.n_games)
+
+        if not self.white_cards[rows, white_play].all():
+            raise ValueError("White card not in hand")
+
+        if not self.black_cards[rows, black_play].all():
+            raise ValueError("Black card not in hand")
+
+        self.white_cards[rows, white_play] = False
+        self.black_cards[rows, black_play] = False
+
+        same = white_play == black_play
+        white_stabs = white_play == 0
+        black_stabs = black_play == 0
+        mission = self.current_mission
+        dw = np.select(
+            [same, white_stabs, black_stabs, white_play > black_play],
+            [0, black_play, 0, mission],
+            0,
+        )
+        db = np.select(
+            [same, black_stabs, white_stabs, black_play > white_play],
+            [0, white_play, 0, mission],
+            0,
+        )
+
+        self.white_score += dw
+        self.black_score += db
+        return dw, db
+
+    def results(
+        self,
+        white_play: np.ndarray,
+        black_play: np.ndarray,
+        dw: np.ndarray,
+        db: np.ndarray,
+    ) -> List[MissionResult]:
+        """MissionResults from White's point of view, one per game."""
+        game_over = not self.white_cards.any()
+        return [
+            MissionResult(
+                you_played=w,
+                opp_played=b,
+                mission=m,
+                you_scored=sw,
+                opp_scored=sb,
+                game_over=game_over,
+            )
+            for w, b, m, sw, sb in zip(
+                white_play.tolist(),
+                black_play.tolist(),
+                self.current_mission.tolist(),
+                dw.tolist(),
+                db.tolist(),
+            )
+        ]
+
+    def decided(self) -> np.ndarray:
+        """Vectorized Spymaster.decided: whether each game's winner is
+        settled.
+        """
+        lead = self.white_score - self.black_score
+        white_hand = masks_of(self.white_cards)
+        black_hand = masks_of(self.black_cards)
+        missions = masks_of(self.remaining_missions)
+        return (lead > max_gain(black_hand, white_hand, missions)) | (
+            -lead > max_gain(white_hand, black_hand, missions)
+        )
+
+    def play(
+        self, on_round: Optional[OnRound] = None, stop_when_decided: bool = False
+    ) -> None:
+        """Play all the games to completion. Both players must be
+        SyncPlayers. If given, on_round is called after each round with
+        the batch and the cards White and Black played.
+
+        If stop_when_decided, play stops once the winner of every game is
+        settled (see Spymaster.decided). The games are played in
+        lockstep, so a game that is settled early carries on until they
+        all are; its winner is the same either way.
+        """
+        white = self.white
+        black = self.black
+        flipped = self.flipped()
+        for _ in range(16):
+            self.draw_missions()
+            white_play = white.pick_batch(self)  # type: ignore
+            black_play = black.pick_batch(flipped)  # type: ignore
+            dw, db = self.resolve(white_play, black_play)
+            if on_round is not None:
+                on_round(self, white_play, black_play)
+            white.receive_batch(self, white_play, black_play, dw, db)  # type: ignore
+            black.receive_batch(flipped, black_play, white_play, db, dw)  # type: ignore
+            if stop_when_decided and self.decided().all():
+                break
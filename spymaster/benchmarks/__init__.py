@@ -0,0 +1,8 @@
+"""Benchmarks. Run the whole suite, and optionally compare it with an
+earlier run, with
+
+    python -m spymaster.benchmarks [--output results.json] [--compare old.json]
+
+(see spymaster.benchmarks.suite). Modules such as
+spymaster.benchmarks.protocol can also be run on their own.
+"""
@@ -0,0 +1,73 @@
+"""Run the benchmark suite and write its results as JSON, to compare
+between commits.
+
+    python -m spymaster.benchmarks [names...] [--quick]
+        [--output results.json] [--compare baseline.json]
+"""
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from spymaster.benchmarks.suite import BENCHMARKS, compare
+
+
+def git_commit() -> Optional[str]:
+    try:
+        output = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=Path(__file__).parent,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.stdout.strip()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "names", nargs="*", help=f"Benchmarks to run, of {', '.join(BENCHMARKS)}"
+    )
+    parser.add_argument("--quick", action="store_true", help="Do less work")
+    parser.add_argument("--output", help="Write the results here as JSON")
+    parser.add_argument("--compare", help="Compare with the results in this file")
+    args = parser.parse_args()
+    unknown = set(args.names) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"Unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    report: Dict[str, Any] = {
+        "commit": git_commit(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "quick": args.quick,
+        "results": {},
+    }
+    for name in args.names or BENCHMARKS:
+        print(f"Running {name}...", file=sys.stderr)
+        report["results"][name] = BENCHMARKS[name](args.quick)
+
+    text = json.dumps(report, indent=2)
+    if args.output is None:
+        print(text)
+    else:
+        Path(args.output).write_text(text + "\n")
+    if args.compare is not None:
+        baseline = json.loads(Path(args.compare).read_text())
+        print(compare(baseline, report), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
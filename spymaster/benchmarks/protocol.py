@@ -0,0 +1,87 @@
+"""Compare the CPU time and bytes per game of the websocket protocol
+versions, encoding the messages of recorded games the way the server
+does.
+
+    python -m spymaster.benchmarks.protocol [n_games]
+"""
+
+import json
+import random
+import sys
+import time
+from typing import Any, Callable, List, Tuple
+
+from spymaster import protocol
+from spymaster.players.computer_players import china, russia
+from spymaster.spymaster import MissionResult, Spymaster
+
+# The state when White is asked to pick, the state after the round,
+# and the result
+Round = Tuple[Spymaster, Spymaster, MissionResult]
+
+
+def dumps(message: Any) -> str:
+    # As sent by WebSocket.send_json
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+
+
+def record_games(n_games: int, seed: int = 0) -> List[List[Round]]:
+    """White's view of each round of n_games games."""
+    games = []
+    for i in range(n_games):
+        game = Spymaster(white=russia, black=china, rng=random.Random(seed + i))
+        rounds = []
+        while game.missions:
+            game.draw_mission()
+            asked = game.copy()
+            white_play = russia.pick_sync(game)
+            black_play = china.pick_sync(game.flipped())
+            result = game.resolve(white_play, black_play)
+            result.game_over = not game.white_hand
+            rounds.append((asked, game.copy(), result))
+        games.append(rounds)
+    return games
+
+
+def version_1(rounds: List[Round]) -> List[str]:
+    messages = []
+    for asked, after, result in rounds:
+        messages.append(dumps(protocol.full_situation(asked, None)))
+        messages.append(dumps(protocol.full_result(after, result)))
+    return messages
+
+
+def version_2(rounds: List[Round]) -> List[str]:
+    messages = [dumps(protocol.snapshot(rounds[0][0]))]
+    for asked, _, result in rounds:
+        messages.append(dumps(protocol.pick(asked)))
+        messages.append(dumps(protocol.result(result)))
+    return messages
+
+
+def measure(
+    encode: Callable[[List[Round]], List[str]], games: List[List[Round]]
+) -> Tuple[float, float, float]:
+    """Microseconds per message and per game, and bytes per game."""
+    start = time.perf_counter()
+    encoded = [encode(rounds) for rounds in games]
+    seconds = time.perf_counter() - start
+    n_messages = sum(len(messages) for messages in encoded)
+    n_bytes = sum(len(m.encode()) for messages in encoded for m in messages)
+    return (
+        1e6 * seconds / n_messages,
+        1e6 * seconds / len(games),
+        n_bytes / len(games),
+    )
+
+
+def main(n_games: int = 2000) -> None:
+    games = record_games(n_games)
+    print(f"{'protocol':>10} {'us/message':>11} {'us/game':>9} {'bytes/game':>11}")
+    for name, encode in [("version 1", version_1), ("version 2", version_2)]:
+        per_message, per_game, n_bytes = measure(encode, games)
+        print(f"{name:>10} {per_message:11.2f} {per_game:9.1f} {n_bytes:11.0f}")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
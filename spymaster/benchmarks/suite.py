@@ -0,0 +1,216 @@
+"""Speed benchmarks for the engine, the players, evolution and the
+server. Each benchmark returns a dict of named measurements; rates are
+per second and latencies in microseconds. With quick, every benchmark
+does less work, e.g. for a smoke test.
+"""
+
+import asyncio
+import contextlib
+import io
+import random
+import time
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+from spymaster.batch import BatchSpymaster
+from spymaster.gene_pool import GenePool, RoundRobinTournament
+from spymaster.players import SyncPlayer
+from spymaster.players.computer_players import china, computer_players, russia
+from spymaster.players.evolutionary_players import SingleLayerPerceptronPlayer
+from spymaster.spymaster import Spymaster
+
+Results = Dict[str, float]
+
+
+def rate(run: Callable[[], int], min_seconds: float) -> float:
+    """How many things per second run does, calling it until at least
+    min_seconds have passed. run returns how many things it did.
+    """
+    n = 0
+    start = time.perf_counter()
+    while True:
+        n += run()
+        seconds = time.perf_counter() - start
+        if seconds >= min_seconds:
+            return n / seconds
+
+
+def engine(quick: bool = False) -> Results:
+    """Games per second between Russia and China."""
+    min_seconds = 0.2 if quick else 2.0
+    seeds = iter(range(10**9))
+
+    def play_async() -> int:
+        game = Spymaster(white=russia, black=china, rng=random.Random(next(seeds)))
+        asyncio.run(game.play())
+        return 1
+
+    def play_sync() -> int:
+        game = Spymaster(white=russia, black=china, rng=random.Random(next(seeds)))
+        game.play_sync()
+        return 1
+
+    def play_batch() -> int:
+        batch = BatchSpymaster(256, white=russia, black=china)
+        batch.play()
+        return 256
+
+    return {
+        "play_games_per_second": rate(play_async, min_seconds),
+        "play_sync_games_per_second": rate(play_sync, min_seconds),
+        "batch_games_per_second": rate(play_batch, min_seconds),
+    }
+
+
+def record_states(n_games: int, seed: int = 0) -> List[Spymaster]:
+    """The state whenever White picks a card, in games between Russia
+    and China.
+    """
+    states = []
+    for i in range(n_games):
+        game = Spymaster(white=russia, black=china, rng=random.Random(seed + i))
+        while game.missions:
+            game.draw_mission()
+            states.append(game.copy())
+            game.resolve(russia.pick_sync(game), china.pick_sync(game.flipped()))
+    return states
+
+
+def players(quick: bool = False) -> Results:
+    """Microseconds per decision of each computer player and of a
+    perceptron, picking cards one state at a time.
+    """
+    states = record_states(20 if quick else 200)
+    contestants: Dict[str, SyncPlayer] = {
+        **computer_players,
+        "Perceptron": SingleLayerPerceptronPlayer.randomized(np.random.default_rng(0)),
+    }
+    results = {}
+    for name, player in contestants.items():
+        start = time.perf_counter()
+        for state in states:
+            player.pick_sync(state)
+        seconds = time.perf_counter() - start
+        results[f"{name}_pick_us"] = 1e6 * seconds / len(states)
+    return results
+
+
+def evolution(quick: bool = False) -> Results:
+    """Generations per second of a gene pool evolving by round robin, at
+    several population sizes.
+    """
+    sizes = [8, 32] if quick else [8, 32, 128]
+    n_generations = 2 if quick else 5
+    results = {}
+    for n_players in sizes:
+        pool = GenePool(
+            n_players=n_players,
+            tournament=RoundRobinTournament(seed=0),
+            n_replace=n_players // 4,
+            seed=0,
+        )
+        # simulate reports each generation
+        with (
+            contextlib.redirect_stdout(io.StringIO()),
+            contextlib.redirect_stderr(io.StringIO()),
+        ):
+            start = time.perf_counter()
+            asyncio.run(pool.simulate(n_generations))
+            seconds = time.perf_counter() - start
+        results[f"generations_per_second_{n_players}"] = n_generations / seconds
+    return results
+
+
+def server(quick: bool = False) -> Results:
+    """Websocket messages per second, both ways, between the server's
+    websocket handler and in-process clients playing the lowest card
+    against the AI with version 2 of the protocol. The clients use the
+    tests' stand-in websocket, so this measures the server, not
+    Starlette's websocket transport.
+    """
+    from spymaster import protocol, webserver
+    from spymaster.tests.fake_websocket import FakeWebSocket
+
+    async def play() -> int:
+        """Play one game, returning the number of messages exchanged."""
+        websocket = FakeWebSocket({"v": str(protocol.PROTOCOL_VERSION)})
+        handler = asyncio.create_task(webserver.ws(websocket))
+        n_messages = 0
+        hand = 0
+        async for message in websocket.received():
+            n_messages += 1
+            if isinstance(message, dict):
+                continue
+            if message[0] == protocol.SNAPSHOT:
+                hand = message[4]
+            elif message[0] == protocol.PICK:
+                card = (hand & -hand).bit_length() - 1
+                websocket.put({"msgType": "card", "card": card})
+                n_messages += 1
+            elif message[0] == protocol.RESULT:
+                hand &= ~(1 << message[1])
+                if message[5]:
+                    break
+        await handler
+        return n_messages
+
+    async def play_all(n_games: int) -> int:
+        return sum([await play() for _ in range(n_games)])
+
+    n_games = 3 if quick else 20
+    start = time.perf_counter()
+    n_messages = asyncio.run(play_all(n_games))
+    seconds = time.perf_counter() - start
+    return {
+        "messages_per_second": n_messages / seconds,
+        "games_per_second": n_games / seconds,
+    }
+
+
+def lobby(quick: bool = False) -> Results:
+    """Players per second that the lobby pairs up, when they all arrive
+    at once.
+    """
+    from spymaster.lobby import Lobby
+    from spymaster.players.online_player import OnlinePlayer
+
+    n_players = 1000 if quick else 10000
+
+    async def arrive() -> float:
+        waiting: Lobby = Lobby()
+        players = [OnlinePlayer(name=str(i)) for i in range(n_players)]
+        start = time.perf_counter()
+        await asyncio.gather(
+            *(waiting.match(player, lambda white, black: None) for player in players)
+        )
+        return time.perf_counter() - start
+
+    return {"players_paired_per_second": n_players / asyncio.run(arrive())}
+
+
+BENCHMARKS: Dict[str, Callable[[bool], Results]] = {
+    "engine": engine,
+    "players": players,
+    "evolution": evolution,
+    "server": server,
+    "lobby": lobby,
+}
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any]) -> str:
+    """A table of the measurements in both runs, with the change in
+    each. Latencies (in microseconds) are better lower, and everything
+    else higher.
+    """
+    lines = [f"{'benchmark':<45} {'baseline':>12} {'current':>12} {'change':>8}"]
+    for name, results in current["results"].items():
+        for metric, value in results.items():
+            old = baseline["results"].get(name, {}).get(metric)
+            if old is None:
+                continue
+            change = value / old - 1 if old else float("inf")
+            lines.append(
+                f"{name + '.' + metric:<45} {old:12.2f} {value:12.2f} {change:+8.1%}"
+            )
+    return "\n".join(lines)
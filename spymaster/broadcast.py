@@ -0,0 +1,108 @@
+import asyncio
+from collections import deque
+from typing import Deque, Generic, List, TypeVar, Union
+
+T = TypeVar("T")
+
+
+class Lagged:
+    """Returned by a subscription in place of the events it dropped."""
+
+    def __repr__(self) -> str:
+        return "LAGGED"
+
+
+LAGGED = Lagged()
+
+
+class Subscription(Generic[T]):
+    """One subscriber's queue of events from a Channel.
+
+    Putting an event never waits. If the subscriber falls more than
+    maxsize events behind, everything queued is dropped and the next
+    get returns LAGGED instead: the subscriber should then catch up from
+    the current state of whatever it is watching, which includes all
+    the events it missed.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.events: Deque[T] = deque()
+        self.lagged = False
+        self.closed = False
+        self.n_dropped = 0
+        self.ready = asyncio.Event()
+
+    def put(self, event: T) -> None:
+        if self.lagged:
+            self.n_dropped += 1
+        elif len(self.events) >= self.maxsize:
+            self.n_dropped += len(self.events) + 1
+            self.events.clear()
+            self.lagged = True
+        else:
+            self.events.append(event)
+        self.ready.set()
+
+    def close(self) -> None:
+        self.closed = True
+        self.ready.set()
+
+    async def get(self) -> Union[T, Lagged]:
+        """The next event, or LAGGED. Raises StopAsyncIteration once the
+        subscription is closed and there are no more events.
+        """
+        while not (self.events or self.lagged or self.closed):
+            self.ready.clear()
+            await self.ready.wait()
+        if self.lagged:
+            self.lagged = False
+            return LAGGED
+        if self.events:
+            return self.events.popleft()
+        raise StopAsyncIteration
+
+    def __aiter__(self) -> "Subscription[T]":
+        return self
+
+    async def __anext__(self) -> Union[T, Lagged]:
+        return await self.get()
+
+
+class Channel(Generic[T]):
+    """Fans events out to any number of subscribers, each with their own
+    bounded queue (see Subscription), so that slow subscribers never hold
+    up the publisher.
+    """
+
+    def __init__(self, maxsize: int = 64):
+        self.maxsize = maxsize
+        self.subscriptions: List[Subscription[T]] = []
+        self.closed = False
+
+    def __len__(self) -> int:
+        return len(self.subscriptions)
+
+    def subscribe(self) -> Subscription[T]:
+        subscription: Subscription[T] = Subscription(self.maxsize)
+        if self.closed:
+            subscription.close()
+        else:
+            self.subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription[T]) -> None:
+        if subscription in self.subscriptions:
+            self.subscriptions.remove(subscription)
+        subscription.close()
+
+    def publish(self, event: T) -> None:
+        for subscription in self.subscriptions:
+            subscription.put(event)
+
+    def close(self) -> None:
+        """Tell the subscribers that there will be no more events."""
+        self.closed = True
+        for subscription in self.subscriptions:
+            subscription.close()
+        self.subscriptions = []
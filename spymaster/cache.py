@@ -0,0 +1,128 @@
+"""A cache of the results of seeded games.
+
+A seeded game between two stateless players always ends the same way,
+so its result can be looked up rather than played again, by the ids of
+its players (which for perceptrons are hashes of their weights; see
+SingleLayerPerceptronPlayer.player_id) and its seed. Tournaments given a
+cache play each call with the same seeds, so that players who haven't
+changed since the last call, such as a gene pool's survivors, don't
+replay their games.
+
+Games that stopped as soon as they were decided (see
+Tournament.stop_when_decided) end on different scores from the same
+games played out, so whether a game stopped early is part of its key,
+and tournaments that stop games early can share a cache with ones that
+need the final scores.
+"""
+
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from spymaster.files import PathLike, write_atomically
+
+GameKey = Tuple[str, str, int, bool]
+
+
+class GameCache:
+    """White's and Black's scores in seeded games, keyed by (white_id,
+    black_id, seed, stopped), where stopped is whether the game stopped
+    as soon as it was decided. Holds at most max_size games, evicting the least
+    recently used.
+
+    If a path is given, the cache is loaded from it if it exists, and
+    save writes it back there.
+    """
+
+    def __init__(self, max_size: int = 1_000_000, path: Optional[PathLike] = None):
+        self.max_size = max_size
+        self.path = None if path is None else Path(path)
+        self.results: "OrderedDict[GameKey, Tuple[int, int]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        if self.path is not None and self.path.exists():
+            self.load(self.path)
+
+    def __len__(self) -> int:
+        return len(self.results)
+
+    def lookup(
+        self,
+        white_ids: Sequence[str],
+        black_ids: Sequence[str],
+        seeds: Sequence[int],
+        stopped: bool = False,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Which of the games are cached, as a boolean array, and White's
+        and Black's scores in them (zero for the games that aren't).
+        """
+        n_games = len(seeds)
+        found = np.zeros(n_games, dtype=bool)
+        white_scores = np.zeros(n_games, dtype=np.int64)
+        black_scores = np.zeros(n_games, dtype=np.int64)
+        keys = zip(white_ids, black_ids, seeds, [stopped] * n_games)
+        for k, key in enumerate(keys):
+            result = self.results.get(key)
+            if result is not None:
+                self.results.move_to_end(key)
+                found[k] = True
+                white_scores[k], black_scores[k] = result
+        n_found = int(found.sum())
+        self.hits += n_found
+        self.misses += n_games - n_found
+        return found, white_scores, black_scores
+
+    def store(
+        self,
+        white_ids: Sequence[str],
+        black_ids: Sequence[str],
+        seeds: Sequence[int],
+        white_scores: np.ndarray,
+        black_scores: np.ndarray,
+        stopped: Union[bool, Sequence[bool]] = False,
+    ) -> None:
+        if isinstance(stopped, bool):
+            stopped = [stopped] * len(seeds)
+        for key, ws, bs in zip(
+            zip(white_ids, black_ids, seeds, stopped),
+            white_scores.tolist(),
+            black_scores.tolist(),
+        ):
+            self.results[key] = (ws, bs)
+            self.results.move_to_end(key)
+        while len(self.results) > self.max_size:
+            self.results.popitem(last=False)
+
+    def save(self, path: Optional[PathLike] = None) -> None:
+        """Write the cache, least recently used first, to path or else to
+        the cache's own path.
+        """
+        path = self.path if path is None else path
+        if path is None:
+            raise ValueError("No path to save the cache to")
+        keys: List[GameKey] = list(self.results)
+        scores = np.array(list(self.results.values()), dtype=np.int64).reshape(-1, 2)
+        write_atomically(
+            path,
+            lambda f: np.savez(
+                f,
+                white=np.array([key[0] for key in keys], dtype=str),
+                black=np.array([key[1] for key in keys], dtype=str),
+                seed=np.array([key[2] for key in keys], dtype=np.uint64),
+                stopped=np.array([key[3] for key in keys], dtype=bool),
+                scores=scores,
+            ),
+        )
+
+    def load(self, path: PathLike) -> None:
+        with np.load(path, allow_pickle=False) as data:
+            self.store(
+                data["white"].tolist(),
+                data["black"].tolist(),
+                data["seed"].tolist(),
+                data["scores"][:, 0],
+                data["scores"][:, 1],
+                data["stopped"].tolist(),
+            )
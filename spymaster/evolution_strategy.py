@@ -0,0 +1,180 @@
+"""Evolution strategies: an alternative to GenePool that, rather than
+breeding a population, moves a single set of weights along an estimate
+of the gradient of the tournament score (OpenAI-ES).
+"""
+
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+
+from spymaster.gene_pool import Optimizer, Tournament, main
+from spymaster.players import Player
+from spymaster.players.computer_players import russia
+from spymaster.players.evolutionary_players import EvolutionaryPlayer, Network
+
+
+def centered_ranks(scores: np.ndarray) -> np.ndarray:
+    """Rank-based fitness shaping: the scores replaced by their ranks,
+    scaled to lie evenly in [-0.5, 0.5], so that the update depends only
+    on the order of the scores and not on their scale.
+    """
+    scores = np.asarray(scores, dtype=float)
+    ranks = np.empty(len(scores))
+    ranks[np.argsort(scores, kind="stable")] = np.arange(len(scores))
+    return ranks / max(len(scores) - 1, 1) - 0.5
+
+
+class EvolutionStrategy(Optimizer):
+    def __init__(
+        self,
+        n_players: int,
+        tournament: Tournament,
+        reference_player: Player = russia,
+        sigma: float = 1.0,
+        learning_rate: float = 0.1,
+        seed: Optional[int] = None,
+        network: Optional[Network] = None,
+        beta1: float = 0.9,
+        beta2: float = 0.999,
+    ):
+        """Random initial weights, center, and room in population for the
+        players sampled around them (see Optimizer). If a seed is given,
+        it also seeds center and the noise.
+
+        Each generation samples n_players players around center: in
+        antithetic pairs, center + sigma * noise and center - sigma *
+        noise, so n_players must be even. The tournament plays them all
+        together, so a tournament that batches (like the ones in
+        gene_pool) evaluates the whole generation in one BatchSpymaster,
+        and a ParallelTournament spreads it over worker processes. Their
+        scores are shaped by rank (see centered_ranks) into an estimate
+        of the gradient, which moves center by Adam with the given
+        learning_rate, beta1 and beta2. The defaults suit perceptrons,
+        whose initial weights are drawn with standard deviation 1;
+        networks start smaller (see Network.initialize), and want a
+        smaller sigma.
+        """
+        if n_players < 2 or n_players % 2:
+            raise ValueError(f"n_players must be even, got {n_players}")
+        super().__init__(
+            n_players,
+            tournament,
+            reference_player,
+            seed=seed,
+            network=network,
+            name="es",
+        )
+        self.sigma = sigma
+        self.learning_rate = learning_rate
+        self.beta1 = beta1
+        self.beta2 = beta2
+        center = np.empty(self.population.shape[1:], dtype=np.float32)
+        self.center = self.randomize(center).reshape(-1)
+        # Adam's running averages of the gradient and its square
+        self.momentum = np.zeros_like(self.center)
+        self.velocity = np.zeros_like(self.center)
+        self.noise: Optional[np.ndarray] = None
+
+    def sample(self) -> np.ndarray:
+        """Fill population with antithetic samples around center, and
+        return the noise of the first of each pair.
+        """
+        half = self.n_players // 2
+        noise = self.random.standard_normal((half, len(self.center)))
+        noise = noise.astype(np.float32)
+        parameters = self.population.reshape(self.n_players, -1)
+        parameters[:half] = self.center + self.sigma * noise
+        parameters[half:] = self.center - self.sigma * noise
+        return noise
+
+    def gradient(self, noise: np.ndarray, scores) -> np.ndarray:
+        """The estimated gradient of the shaped scores at center."""
+        utilities = centered_ranks(scores)
+        half = len(noise)
+        # Each pair contributes its difference along its noise
+        difference = utilities[:half] - utilities[half:]
+        return (difference @ noise) / (self.n_players * self.sigma)
+
+    def update(self, gradient: np.ndarray) -> None:
+        """Take an Adam step up the gradient."""
+        t = self.generation + 1
+        self.momentum *= self.beta1
+        self.momentum += (1 - self.beta1) * gradient
+        self.velocity *= self.beta2
+        self.velocity += (1 - self.beta2) * gradient**2
+        step_size = (
+            self.learning_rate * np.sqrt(1 - self.beta2**t) / (1 - self.beta1**t)
+        )
+        self.center += step_size * self.momentum / (np.sqrt(self.velocity) + 1e-8)
+
+    async def play_generation(self) -> Sequence[float]:
+        self.noise = self.sample()
+        return await self.tournament.play(self.players)
+
+    async def evaluate_fitness(self) -> float:
+        """The points best_player (center, not the samples around it)
+        scores against the reference player in n_players games.
+        """
+        best = self.best_player
+        points = await self.fitness_evaluator.play_against(
+            [best] * self.n_players, self.reference_player
+        )
+        return float(points.sum())
+
+    def breed(self, scores: Sequence[float]) -> None:
+        self.update(self.gradient(self.noise, scores))
+
+    def checkpoint_arrays(self) -> Dict[str, np.ndarray]:
+        return {
+            "center": self.center,
+            "momentum": self.momentum,
+            "velocity": self.velocity,
+        }
+
+    def checkpoint_state(self) -> Dict[str, Any]:
+        return {
+            **super().checkpoint_state(),
+            "sigma": self.sigma,
+            "learning_rate": self.learning_rate,
+            "beta1": self.beta1,
+            "beta2": self.beta2,
+        }
+
+    @classmethod
+    def from_checkpoint(
+        cls,
+        state: Dict[str, Any],
+        arrays: Dict[str, np.ndarray],
+        tournament: Tournament,
+        reference_player: Player,
+        network: Optional[Network],
+    ) -> "EvolutionStrategy":
+        strategy = cls(
+            n_players=state["n_players"],
+            tournament=tournament,
+            reference_player=reference_player,
+            sigma=state["sigma"],
+            learning_rate=state["learning_rate"],
+            seed=state["seed"],
+            network=network,
+            beta1=state["beta1"],
+            beta2=state["beta2"],
+        )
+        strategy.center[...] = arrays["center"]
+        strategy.momentum[...] = arrays["momentum"]
+        strategy.velocity[...] = arrays["velocity"]
+        return strategy
+
+    @property
+    def best_player(self) -> EvolutionaryPlayer:
+        """A player with the current weights, center."""
+        return self.players[0].with_parameters(self.center.copy())
+
+
+if __name__ == "__main__":
+    main(
+        EvolutionStrategy,
+        lambda tournament: EvolutionStrategy(
+            n_players=32, tournament=tournament, seed=0
+        ),
+    )
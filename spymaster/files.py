@@ -0,0 +1,18 @@
+import os
+from pathlib import Path
+from typing import BinaryIO, Callable, Union
+
+PathLike = Union[str, Path]
+
+
+def write_atomically(path: PathLike, write: Callable[[BinaryIO], None]) -> None:
+    """Write a file by writing a temporary file next to it and renaming
+    it into place, so that the file is never left half-written.
+    """
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
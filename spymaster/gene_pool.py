@@ -1,162 +1,1008 @@
 import abc
+import argparse
 import asyncio
-from typing import List, Optional
+import json
+import math
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple, Type
 
 import numpy as np
 from tqdm import tqdm
 
-from spymaster.players import Player, russia
+from spymaster import Spymaster, metrics
+from spymaster.batch import BatchSpymaster, OnRound
+from spymaster.cache import GameCache
+from spymaster.files import PathLike, write_atomically
+from spymaster.players import Player, is_sync
+from spymaster.players.computer_players import russia
 from spymaster.players.evolutionary_players import (
     EvolutionaryPlayer,
+    Network,
+    NetworkPlayer,
     SingleLayerPerceptronPlayer,
+    mutate,
+    stack_population,
+    stackable,
 )
-from spymaster import Spymaster
+from spymaster.ratings import EloRatings, outcome
+from spymaster.records import GameRecorder
+from spymaster.rng import (
+    game_rngs,
+    game_seeds,
+    next_game_seeds,
+    numpy_rng,
+    respawn,
+    spawned,
+)
+from spymaster.spymaster import OnResult
+
+
+async def play_games(
+    games: List[Spymaster],
+    on_finish: Optional[Callable[[Spymaster], None]] = None,
+    on_result: Optional[OnResult] = None,
+    stop_when_decided: bool = False,
+) -> None:
+    """Play all the games to completion, calling on_finish with each game
+    as soon as it is over (and passing on_result and stop_when_decided
+    to Spymaster.play). If no player in any game needs to wait on I/O
+    then the games are played synchronously, skipping the overhead of
+    the event loop.
+    """
+    if all(is_sync(game.white) and is_sync(game.black) for game in games):
+        for game in games:
+            game.play_sync(on_result, stop_when_decided)
+            if on_finish is not None:
+                on_finish(game)
+    else:
+
+        async def play(game: Spymaster) -> None:
+            await game.play(on_result, stop_when_decided)
+            if on_finish is not None:
+                on_finish(game)
+
+        await asyncio.gather(*(play(game) for game in games))
 
 
 class Tournament(abc.ABC):
+    """A way of scoring a population of players by playing games.
+
+    If a seed is given, each call to play gets a fresh child of the
+    seed's SeedSequence, from which every game gets its own seed (see
+    BatchSpymaster). Seeded tournaments are reproducible however their
+    games are batched or sharded, as long as the players themselves are
+    stateless.
+
+    If ratings are given, every game is recorded in them as it finishes;
+    and if a recorder is given, every game is written to its log.
+
+    If a cache is given (which needs a seed), every call to play uses
+    the same seeds, and games that are in the cache aren't played again,
+    or recorded again. The players must then be stateless.
+
+    Tournaments that only score wins, draws and losses set
+    stop_when_decided, so that games end as soon as their winner is
+    settled (see Spymaster.decided), unless they are being recorded.
+    """
+
+    stop_when_decided = False
+
+    def __init__(
+        self,
+        seed: Optional[int] = None,
+        ratings: Optional[EloRatings] = None,
+        recorder: Optional[GameRecorder] = None,
+        cache: Optional[GameCache] = None,
+    ):
+        if cache is not None and seed is None:
+            raise ValueError("Only seeded tournaments can use a cache")
+        self.seed_sequence = None if seed is None else np.random.SeedSequence(seed)
+        self.ratings = ratings
+        self.recorder = recorder
+        self.cache = cache
+
+    @property
+    def stops_early(self) -> bool:
+        """Whether games stop as soon as they are decided: if the
+        tournament only needs their winners, and isn't recording them.
+        """
+        return self.stop_when_decided and self.recorder is None
+
+    def game_seeds(self, n_games: int) -> Optional[List[int]]:
+        """Seeds for the next n_games games, or None if unseeded."""
+        if self.cache is not None and self.seed_sequence is not None:
+            # The same seeds every time, so that games can be looked up
+            return game_seeds(self.seed_sequence, n_games)
+        return next_game_seeds(self.seed_sequence, n_games)
+
     @abc.abstractmethod
     async def play(self, players: List[Player]) -> List[float]:
         pass
 
+    def record(self, game: Spymaster) -> None:
+        if self.ratings is not None:
+            self.ratings.update(
+                game.white.player_id,
+                game.black.player_id,
+                outcome(game.white_score, game.black_score),
+            )
+
+    def watch(
+        self, games: List[Spymaster], seeds: Optional[List[int]]
+    ) -> Optional[OnResult]:
+        """The on_result callback that records the games, if recording."""
+        if self.recorder is None:
+            return None
+        for game, seed in zip(games, seeds or [None] * len(games)):
+            self.recorder.watch(game, seed)
+        return self.recorder.on_result
+
+    def batch_hook(
+        self,
+        white_ids: Sequence[str],
+        black_ids: Sequence[str],
+        seeds: Optional[List[int]],
+    ) -> Optional[OnRound]:
+        """The on_round callback that records a batch, if recording."""
+        if self.recorder is None:
+            return None
+        return self.recorder.batch_hook(white_ids, black_ids, seeds)
+
+    def record_batch(
+        self,
+        white_ids: Sequence[str],
+        black_ids: Sequence[str],
+        white_scores: np.ndarray,
+        black_scores: np.ndarray,
+    ) -> None:
+        """Record a batch of games, given the players' ids in each."""
+        if self.ratings is None:
+            return
+        for white_id, black_id, ws, bs in zip(
+            white_ids, black_ids, white_scores.tolist(), black_scores.tolist()
+        ):
+            self.ratings.update(white_id, black_id, outcome(ws, bs))
+
+    async def play_matchups(
+        self, players: List[Player], whites: Sequence[int], blacks: Sequence[int]
+    ) -> np.ndarray:
+        """Play one game for each pair of indices (whites[k], blacks[k])
+        into players. Returns each player's points, one for a win and a
+        half for a draw.
+        """
+        seeds = self.game_seeds(len(whites))
+        white_scores, black_scores = await self.play_pairs(
+            players, whites, blacks, seeds
+        )
+
+        white_wins = white_scores > black_scores
+        black_wins = black_scores > white_scores
+        draws = white_scores == black_scores
+        scores = np.zeros(len(players))
+        np.add.at(scores, np.asarray(whites, dtype=int), white_wins + 0.5 * draws)
+        np.add.at(scores, np.asarray(blacks, dtype=int), black_wins + 0.5 * draws)
+        return scores
+
+    async def play_pairs(
+        self,
+        players: List[Player],
+        whites: Sequence[int],
+        blacks: Sequence[int],
+        seeds: Optional[List[int]],
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Play one game for each pair of indices (whites[k], blacks[k])
+        into players, looking up in the cache any that have been played
+        before. Returns the white and black scores of each game.
+        """
+        whites = np.asarray(whites, dtype=int)
+        blacks = np.asarray(blacks, dtype=int)
+        if self.cache is None or seeds is None:
+            return await self.play_new(players, whites, blacks, seeds)
+
+        ids = [player.player_id for player in players]
+        white_ids = [ids[i] for i in whites]
+        black_ids = [ids[j] for j in blacks]
+        found, white_scores, black_scores = self.cache.lookup(
+            white_ids, black_ids, seeds, self.stops_early
+        )
+        new = np.flatnonzero(~found)
+        if len(new):
+            new_seeds = [seeds[k] for k in new]
+            new_white, new_black = await self.play_new(
+                players, whites[new], blacks[new], new_seeds
+            )
+            white_scores[new] = new_white
+            black_scores[new] = new_black
+            self.cache.store(
+                [white_ids[k] for k in new],
+                [black_ids[k] for k in new],
+                new_seeds,
+                new_white,
+                new_black,
+                self.stops_early,
+            )
+        return white_scores, black_scores
+
+    async def play_new(
+        self,
+        players: List[Player],
+        whites: np.ndarray,
+        blacks: np.ndarray,
+        seeds: Optional[List[int]],
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Play the games of play_pairs, as one BatchSpymaster if
+        possible (see play_population), or else as one per pairing if
+        every player is synchronous (see play_pairings).
+        """
+        white_players = [players[i] for i in np.unique(whites)]
+        black_players = [players[j] for j in np.unique(blacks)]
+        one_black = len(black_players) == 1 and is_sync(black_players[0])
+        if stackable(white_players) and (
+            one_black or stackable(white_players + black_players)
+        ):
+            return self.play_population(players, whites, blacks, seeds)
+        if all(is_sync(player) for player in white_players + black_players):
+            return self.play_pairings(players, whites, blacks, seeds)
+
+        rngs = game_rngs(seeds) or [None] * len(whites)
+        games = [
+            Spymaster(white=players[i], black=players[j], rng=rng)
+            for i, j, rng in zip(whites, blacks, rngs)
+        ]
+        await play_games(games, self.record, self.watch(games, seeds), self.stops_early)
+        white_scores = np.array([game.white_score for game in games], dtype=np.int64)
+        black_scores = np.array([game.black_score for game in games], dtype=np.int64)
+        return white_scores, black_scores
+
+    def play_pairings(
+        self,
+        players: List[Player],
+        whites: np.ndarray,
+        blacks: np.ndarray,
+        seeds: Optional[List[int]] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Play the matchups between synchronous players as one
+        BatchSpymaster for each pairing of White and Black, such as each
+        player against a challenger. Returns the white and black scores
+        of each game.
+        """
+        white_scores = np.zeros(len(whites), dtype=np.int64)
+        black_scores = np.zeros(len(whites), dtype=np.int64)
+        pairings = whites * len(players) + blacks
+        for pairing in np.unique(pairings):
+            games = np.flatnonzero(pairings == pairing)
+            white = players[whites[games[0]]]
+            black = players[blacks[games[0]]]
+            pairing_seeds = None if seeds is None else [seeds[k] for k in games]
+            batch = BatchSpymaster(
+                len(games), white=white, black=black, seeds=pairing_seeds
+            )
+            white_ids = [white.player_id] * len(games)
+            black_ids = [black.player_id] * len(games)
+            batch.play(
+                self.batch_hook(white_ids, black_ids, pairing_seeds),
+                self.stops_early,
+            )
+            self.record_batch(
+                white_ids, black_ids, batch.white_score, batch.black_score
+            )
+            white_scores[games] = batch.white_score
+            black_scores[games] = batch.black_score
+        return white_scores, black_scores
+
+    def play_population(
+        self,
+        players: List[Player],
+        whites: Sequence[int],
+        blacks: Sequence[int],
+        seeds: Optional[List[int]] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Play the matchups between a population of perceptrons, or of
+        networks of the same architecture, as one BatchSpymaster. Every
+        White must be in the population, and so must every Black, unless
+        Black is the same synchronous player (such as a challenger) in
+        every game. Returns the white and black scores of each game.
+        """
+        whites = np.asarray(whites, dtype=int)
+        blacks = np.asarray(blacks, dtype=int)
+        one_black = not stackable([players[whites[0]], players[blacks[0]]])
+        indices = np.unique(whites if one_black else np.concatenate([whites, blacks]))
+        population = [players[i] for i in indices]
+        white = stack_population(population, np.searchsorted(indices, whites))
+        if one_black:
+            black = players[blacks[0]]
+        else:
+            black = stack_population(population, np.searchsorted(indices, blacks))
+        batch = BatchSpymaster(len(whites), white=white, black=black, seeds=seeds)
+        ids = [player.player_id for player in players]
+        white_ids = [ids[i] for i in whites]
+        black_ids = [ids[j] for j in blacks]
+        batch.play(
+            self.batch_hook(white_ids, black_ids, seeds),
+            self.stops_early,
+        )
+        self.record_batch(white_ids, black_ids, batch.white_score, batch.black_score)
+        return batch.white_score, batch.black_score
+
 
 class RoundRobinTournament(Tournament):
+    stop_when_decided = True
+
     async def play(self, players: List[Player]):
         """Round-robin tournament between all pairs of players. Each
         pair plays two games.
         """
         n_players = len(players)
-        scores = [0] * n_players
-
-        games: List[Optional[Spymaster]] = [None] * n_players * n_players
-        awaitables = []
-
-        for i in range(n_players):
-            for j in range(n_players):
-                if i == j:
-                    continue
-                # print(i, j)
-                white = players[i]
-                black = players[j]
-                game = Spymaster(white=white, black=black)
-                games[i * n_players + j] = game
-                awaitables.append(game.play())
-
-        # Wait for all games to finish
-        done, pending = await asyncio.wait(awaitables)
-
-        for i in range(n_players):
-            for j in range(n_players):
-                if i == j:
-                    continue
-
-                game = games[i * n_players + j]
-                # scores[i] += game.white_score
-                # scores[j] += game.black_score
-                if game.white_score > game.black_score:
-                    scores[i] += 1
-                elif game.black_score > game.white_score:
-                    scores[j] += 1
-                else:
-                    scores[i] += 0.5
-                    scores[j] += 0.5
-        return scores
+        whites, blacks = np.nonzero(~np.eye(n_players, dtype=bool))
+        scores = await self.play_matchups(players, whites, blacks)
+        return scores.tolist()
+
+
+class SwissTournament(Tournament):
+    """Swiss-system tournament. Each round, players are paired with
+    opponents on a similar score that they have not met yet, and each
+    pair plays two games, one with each colour. A player left over
+    after pairing sits the round out with a bye worth one point.
+
+    After a few rounds the strong players are separated from the weak
+    for n_rounds * n_players games rather than a round robin's
+    n_players ** 2. By default n_rounds is ceil(log2(n_players)) + 1.
+    The first round is paired in a random order, or by rating if the
+    tournament has ratings.
+    """
+
+    stop_when_decided = True
+
+    def __init__(
+        self,
+        n_rounds: Optional[int] = None,
+        seed: Optional[int] = None,
+        ratings: Optional[EloRatings] = None,
+        recorder: Optional[GameRecorder] = None,
+        cache: Optional[GameCache] = None,
+    ):
+        super().__init__(seed=seed, ratings=ratings, recorder=recorder, cache=cache)
+        self.n_rounds = n_rounds
+
+    async def play(self, players: List[Player]) -> List[float]:
+        n_players = len(players)
+        n_rounds = self.n_rounds
+        if n_rounds is None:
+            n_rounds = math.ceil(math.log2(max(n_players, 2))) + 1
+
+        if self.seed_sequence is None:
+            rng = np.random
+        else:
+            rng = np.random.default_rng(self.seed_sequence.spawn(1)[0])
+        order = rng.permutation(n_players).tolist()
+        if self.ratings is not None:
+            ratings = self.ratings
+            order.sort(key=lambda i: -ratings.rating(players[i].player_id))
+
+        scores = np.zeros(n_players)
+        met: Set[Tuple[int, int]] = set()
+        had_bye: Set[int] = set()
+        for _ in range(n_rounds):
+            # Stable sort, so ties keep the order of the previous round
+            order.sort(key=lambda i: -scores[i])
+            pairs, bye = swiss_pairs(order, met, had_bye)
+            if bye is not None:
+                scores[bye] += 1
+                had_bye.add(bye)
+            if not pairs:
+                continue
+            met.update((min(i, j), max(i, j)) for i, j in pairs)
+            whites = [i for pair in pairs for i in (pair[0], pair[1])]
+            blacks = [j for pair in pairs for j in (pair[1], pair[0])]
+            scores += await self.play_matchups(players, whites, blacks)
+        return scores.tolist()
+
+
+def swiss_pairs(
+    order: List[int], met: Set[Tuple[int, int]], had_bye: Set[int]
+) -> Tuple[List[Tuple[int, int]], Optional[int]]:
+    """Pair off players, given in standings order, each with the
+    highest-placed player below them that they have not met yet (or
+    just the next one if they have met everyone left). With an odd
+    number of players, the lowest-placed player who has not yet had a
+    bye gets one.
+    """
+    unpaired = list(order)
+    bye = None
+    if len(unpaired) % 2:
+        bye = next((i for i in reversed(unpaired) if i not in had_bye), unpaired[-1])
+        unpaired.remove(bye)
+
+    pairs = []
+    while unpaired:
+        i = unpaired.pop(0)
+        k = next(
+            (k for k, j in enumerate(unpaired) if (min(i, j), max(i, j)) not in met),
+            0,
+        )
+        pairs.append((i, unpaired.pop(k)))
+    return pairs, bye
 
 
 class PlayAgainstChallengerTournament(Tournament):
-    def __init__(self, challenger: Player = russia):
+    # Players are scored on their points difference, so every game is
+    # played out
+    stop_when_decided = False
+
+    def __init__(
+        self,
+        challenger: Player = russia,
+        n_games: int = 30,
+        seed: Optional[int] = None,
+        ratings: Optional[EloRatings] = None,
+        recorder: Optional[GameRecorder] = None,
+        cache: Optional[GameCache] = None,
+    ):
+        super().__init__(seed, ratings, recorder, cache)
         self.challenger = challenger
+        self.n_games = n_games
 
     async def play(self, players: List[Player]) -> List[float]:
         n_players = len(players)
-        scores = [0] * n_players
+        n_games = self.n_games
+        seeds = self.game_seeds(n_players * n_games)
+        whites = np.repeat(np.arange(n_players), n_games)
+        blacks = np.full(len(whites), n_players)
+        white_scores, black_scores = await self.play_pairs(
+            [*players, self.challenger], whites, blacks, seeds
+        )
+        diffs = white_scores - black_scores
+        return diffs.reshape(n_players, n_games).sum(axis=1).tolist()
 
-        for i in range(n_players):
-            white = players[i]
-            black = self.challenger
-            games = [Spymaster(white=white, black=black) for _ in range(30)]
-            awaitables = [game.play() for game in games]
-            done, pending = await asyncio.wait(awaitables)
 
-            for game in games:
-                scores[i] += game.white_score
-                scores[i] -= game.black_score
+class FitnessEvaluator(Tournament):
+    """Scores each player by one game as White against a reference
+    player: one point for a win and a half for a draw.
+    """
 
-        return scores
+    stop_when_decided = True
 
+    def __init__(
+        self,
+        seed: Optional[int] = None,
+        reference_player: Player = russia,
+        cache: Optional[GameCache] = None,
+    ):
+        super().__init__(seed, cache=cache)
+        self.reference_player = reference_player
+
+    async def play(self, players: List[Player]) -> List[float]:
+        points = await self.play_against(players, self.reference_player)
+        return points.tolist()
+
+    async def play_against(
+        self, players: List[Player], reference: Player
+    ) -> np.ndarray:
+        n_players = len(players)
+        whites = np.arange(n_players)
+        blacks = np.full(n_players, n_players)
+        points = await self.play_matchups([*players, reference], whites, blacks)
+        return points[:n_players]
 
-class FitnessEvaluator:
     async def evaluate_population(self, gene_pool: "GenePool") -> float:
         """Evaluate the population fitness by how well they play against
-        the reference player.
+        the gene pool's reference player.
         """
-        fitness = 0
-        games = []
-        awaitables = []
-        for i in range(gene_pool.n_players):
-            white = gene_pool.players[i]
-            black = russia
-            game = Spymaster(white=white, black=black)
-            games.append(game)
-            awaitables.append(game.play())
+        points = await self.play_against(gene_pool.players, gene_pool.reference_player)
+        return float(points.sum())
 
-        done, pending = await asyncio.wait(awaitables)
 
-        for game in games:
-            if game.white_score > game.black_score:
-                fitness += 1
-            elif game.white_score == game.black_score:
-                fitness += 0.5
+CHECKPOINT_VERSION = 1
 
-        return fitness
 
+PERCEPTRON_SHAPE = (16, SingleLayerPerceptronPlayer.INPUTS_LENGTH)
+
+
+def open_population(
+    path: PathLike, n_players: int, shape: Tuple[int, ...] = PERCEPTRON_SHAPE
+) -> np.ndarray:
+    """A new (n_players, *shape) float32 array backed by an .npy file,
+    which other processes can map with np.load(path, mmap_mode="r").
+    """
+    return np.lib.format.open_memmap(
+        path, mode="w+", dtype=np.float32, shape=(n_players, *shape)
+    )
+
+
+SELECTIONS = ("truncation", "rank", "tournament")
+
+
+def select_parents(
+    scores: np.ndarray,
+    n_parents: int,
+    selection: str = "truncation",
+    tournament_size: int = 3,
+    rng=None,
+) -> np.ndarray:
+    """Indices of n_parents parents, chosen on their scores by
+
+    truncation: the best n_parents, best first;
+    rank: at random, with probability proportional to rank;
+    tournament: each the best of tournament_size drawn at random.
+    """
+    rng = numpy_rng(rng)
+    n_players = len(scores)
+    if selection == "truncation":
+        return np.argsort(-scores, kind="stable")[:n_parents]
+    if selection == "rank":
+        ranks = np.empty(n_players)
+        ranks[np.argsort(scores, kind="stable")] = np.arange(1, n_players + 1)
+        return rng.choice(n_players, size=n_parents, p=ranks / ranks.sum())
+    if selection == "tournament":
+        contestants = rng.choice(n_players, size=(n_parents, tournament_size))
+        best = np.argmax(scores[contestants], axis=1)
+        return contestants[np.arange(n_parents), best]
+    raise ValueError(f"Unknown selection: {selection}")
+
+
+def crossover(
+    first: np.ndarray, second: np.ndarray, crossover_rate: float, rng=None
+) -> np.ndarray:
+    """Cross each of the N players' weights in first, with probability
+    crossover_rate, with its partner in second: each row of weights is
+    taken from either parent at random. A perceptron's (16, 51) weights
+    have a row per card; a network's flat parameters are crossed one by
+    one. Modifies first.
+    """
+    rng = numpy_rng(rng)
+    crossed = rng.random(len(first)) < crossover_rate
+    rows = rng.random(first.shape[:2]) < 0.5
+    swap = crossed[:, None] & rows
+    first[swap] = second[swap]
+    return first
+
+
+def split_seed(
+    seed: Optional[int],
+) -> Tuple[Optional[np.random.Generator], Optional[int]]:
+    """An optimizer's seed split into a generator for its own draws and a
+    seed for its fitness evaluator's games, or (None, None) if unseeded.
+    """
+    if seed is None:
+        return None, None
+    weights_seq, evaluator_seq = np.random.SeedSequence(seed).spawn(2)
+    return np.random.default_rng(weights_seq), int(evaluator_seq.generate_state(1)[0])
+
+
+class Optimizer(abc.ABC):
+    """Evolves the weights of a population of players, generation by
+    generation: a GenePool by breeding them, an EvolutionStrategy by
+    following an estimate of the gradient of their scores.
+    """
 
-class GenePool:
     def __init__(
         self,
         n_players: int,
         tournament: Tournament,
         reference_player: Player = russia,
-        n_replace: int = 20,
-        mutation_rate: float = 0.1,
+        seed: Optional[int] = None,
+        network: Optional[Network] = None,
+        population_path: Optional[PathLike] = None,
+        cache: Optional[GameCache] = None,
+        name: str = "random",
     ):
+        """The players are SingleLayerPerceptronPlayers, or if a network
+        is given, NetworkPlayers with that architecture, all called name.
+
+        The weights of the whole population are kept in one contiguous
+        float32 array, population, of which each player's weights are a
+        view: (n_players, 16, 51) for perceptrons, and (n_players,
+        n_parameters) for networks. If population_path is given, the
+        array is a memmap of a new .npy file there.
+
+        If a seed is given, it seeds the optimizer's own draws (see
+        random) and the games played by the fitness evaluator. Seed the
+        tournament separately.
+        """
         self.n_players = n_players
-        self.reference_player = reference_player
-        self.players: List[EvolutionaryPlayer] = [
-            SingleLayerPerceptronPlayer.randomized() for _ in range(n_players)
-        ]
         self.tournament = tournament
-        self.fitness_evaluator = FitnessEvaluator()
-        self.n_replace = n_replace
-        self.mutation_rate = mutation_rate
+        self.reference_player = reference_player
+        self.seed = seed
+        self.network = network
+        self.rng, evaluator_seed = split_seed(seed)
+        self.fitness_evaluator = FitnessEvaluator(seed=evaluator_seed, cache=cache)
+        self.cache = cache
+        shape = PERCEPTRON_SHAPE if network is None else (network.n_parameters,)
+        if population_path is None:
+            self.population = np.zeros((n_players, *shape), dtype=np.float32)
+        else:
+            self.population = open_population(population_path, n_players, shape)
+        self.players: List[EvolutionaryPlayer]
+        if network is None:
+            self.players = [
+                SingleLayerPerceptronPlayer(name=name, weights_matrix=weights)
+                for weights in self.population
+            ]
+        else:
+            self.players = [
+                NetworkPlayer(name=name, parameters=parameters, network=network)
+                for parameters in self.population
+            ]
+        self.generation = 0
+        # One entry per generation: its best and worst scores, and the
+        # fitness (see evaluate_fitness)
+        self.history: List[Dict[str, float]] = []
 
-    def replacement(self, scores):
-        # Rank the players from worst to best
-        sorted_players_indices = sorted(range(self.n_players), key=lambda i: scores[i])
-
-        # Replace the worst players
-        for i in range(self.n_replace):
-            idx_to_replace = sorted_players_indices[i]
-            new_parent_idx = sorted_players_indices[-i - 1]
-            self.players[idx_to_replace] = self.players[
-                new_parent_idx
-            ].create_offspring(self.mutation_rate)
-
-        # Replace the worst players with the offspring of the best players
-        parents = self.players[: self.n_replace]
-        children = [parent.create_offspring(self.mutation_rate) for parent in parents]
-        self.players[-self.n_replace :] = children
-
-    async def simulate(self, n_iterations):
+    @property
+    def random(self):
+        """The generator of the optimizer's own draws (see numpy_rng)."""
+        return numpy_rng(self.rng)
+
+    def randomize(self, weights: np.ndarray) -> np.ndarray:
+        """Fill weights, for one player or many, with initial values."""
+        if self.network is None:
+            weights[...] = self.random.normal(0, 1, weights.shape)
+        else:
+            self.network.initialize(weights, self.random)
+        return weights
+
+    @abc.abstractmethod
+    async def play_generation(self) -> Sequence[float]:
+        """Play the tournament of a generation, returning the players'
+        scores.
+        """
+
+    @abc.abstractmethod
+    async def evaluate_fitness(self) -> float:
+        """The points of the generation against the reference player."""
+
+    @abc.abstractmethod
+    def breed(self, scores: Sequence[float]) -> None:
+        """Move the population on to the next generation, given the
+        scores of this one.
+        """
+
+    @property
+    @abc.abstractmethod
+    def best_player(self) -> EvolutionaryPlayer:
+        """The player to show for the evolution so far."""
+
+    async def simulate(
+        self,
+        n_iterations: int,
+        checkpoint_path: Optional[PathLike] = None,
+        checkpoint_every: int = 10,
+    ):
+        """Run n_iterations more generations. If checkpoint_path is given,
+        save a checkpoint there every checkpoint_every generations, and
+        after the last one.
+        """
+        clock = time.perf_counter
         for t in tqdm(range(n_iterations)):
-            scores = await self.tournament.play(self.players)
-            fitness = await self.fitness_evaluator.evaluate_population(self)
+            start = clock()
+            scores = await self.play_generation()
+            played = clock()
+            fitness = await self.evaluate_fitness()
+            evaluated = clock()
             print(
-                f"{t}: max score = {max(scores)}, "
+                f"{self.generation}: max score = {max(scores)}, "
                 f"min score = {min(scores)}, "
                 f"fitness = {fitness}"
             )
+            self.history.append(
+                {
+                    "max_score": float(max(scores)),
+                    "min_score": float(min(scores)),
+                    "fitness": float(fitness),
+                }
+            )
+
+            self.breed(scores)
+            bred = clock()
+            self.generation += 1
+            if checkpoint_path is not None and (
+                self.generation % checkpoint_every == 0 or t == n_iterations - 1
+            ):
+                self.save_checkpoint(checkpoint_path)
+            instruments = metrics.instruments
+            if instruments is not None:
+                instruments.observe_generation(
+                    tournament=played - start,
+                    fitness=evaluated - played,
+                    breeding=bred - evaluated,
+                    checkpoint=clock() - bred,
+                    total=clock() - start,
+                )
 
-            self.replacement(scores)
+    @abc.abstractmethod
+    def checkpoint_arrays(self) -> Dict[str, np.ndarray]:
+        """The arrays to save in a checkpoint, by name."""
+
+    def checkpoint_state(self) -> Dict[str, Any]:
+        """The settings and state to save in a checkpoint, which must be
+        JSON serializable. Subclasses add their own.
+        """
+        return {
+            "version": CHECKPOINT_VERSION,
+            "generation": self.generation,
+            "history": self.history,
+            "seed": self.seed,
+            "n_players": self.n_players,
+            "network": None if self.network is None else self.network.to_dict(),
+            "rng": None if self.rng is None else self.rng.bit_generator.state,
+            "tournament_spawned": spawned(self.tournament.seed_sequence),
+            "evaluator_spawned": spawned(self.fitness_evaluator.seed_sequence),
+        }
+
+    def save_checkpoint(self, path: PathLike) -> None:
+        """Save the weights, the generation, the fitness history and the
+        state of every random generator to an .npz file, atomically, so
+        that evolution can resume from it (see resume). Caches with a
+        path are saved too.
+        """
+        if isinstance(self.population, np.memmap):
+            self.population.flush()
+        caches = {id(c): c for c in (self.tournament.cache, self.cache)}
+        for cache in caches.values():
+            if cache is not None and cache.path is not None:
+                cache.save()
+        state = self.checkpoint_state()
+        arrays = self.checkpoint_arrays()
+        write_atomically(
+            path,
+            lambda f: np.savez(f, **arrays, state=np.array(json.dumps(state))),
+        )
+
+    @classmethod
+    @abc.abstractmethod
+    def from_checkpoint(
+        cls,
+        state: Dict[str, Any],
+        arrays: Dict[str, np.ndarray],
+        tournament: Tournament,
+        reference_player: Player,
+        network: Optional[Network],
+        **kwargs,
+    ) -> "Optimizer":
+        """A new optimizer with the settings and weights of a checkpoint,
+        which resume brings up to its generation.
+        """
+
+    @classmethod
+    def resume(
+        cls,
+        path: PathLike,
+        tournament: Tournament,
+        reference_player: Player = russia,
+        **kwargs,
+    ):
+        """An optimizer as it was when a checkpoint was saved. The
+        tournament should be constructed as it was for the original run
+        (with the same seed, and cache, if any); its random state is
+        restored from the checkpoint. Any other keyword arguments go to
+        from_checkpoint.
+        """
+        with np.load(path, allow_pickle=False) as checkpoint:
+            arrays = {name: checkpoint[name] for name in checkpoint.files}
+        state = json.loads(str(arrays.pop("state")))
+        if state["version"] != CHECKPOINT_VERSION:
+            raise ValueError(f"{path} is not a version {CHECKPOINT_VERSION} checkpoint")
+
+        network = state["network"]
+        optimizer = cls.from_checkpoint(
+            state,
+            arrays,
+            tournament,
+            reference_player,
+            network=None if network is None else Network(**network),
+            **kwargs,
+        )
+        optimizer.generation = state["generation"]
+        optimizer.history = state["history"]
+        if optimizer.rng is not None:
+            optimizer.rng.bit_generator.state = state["rng"]
+        tournament.seed_sequence = respawn(
+            tournament.seed_sequence, state["tournament_spawned"]
+        )
+        evaluator = optimizer.fitness_evaluator
+        evaluator.seed_sequence = respawn(
+            evaluator.seed_sequence, state["evaluator_spawned"]
+        )
+        return optimizer
+
+
+def main(
+    optimizer_type: Type[Optimizer],
+    new_optimizer: Callable[[Tournament], Optimizer],
+) -> None:
+    """The command line of an optimizer module: evolve players against
+    russia, from new_optimizer or from a checkpoint, and print the best.
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--generations", type=int, default=1000)
+    parser.add_argument(
+        "--checkpoint", help="Save checkpoints here, and resume from it if it exists"
+    )
+    parser.add_argument("--checkpoint-every", type=int, default=10)
+    args = parser.parse_args()
+
+    tournament = PlayAgainstChallengerTournament(russia, seed=1)
+    if args.checkpoint is not None and Path(args.checkpoint).exists():
+        optimizer = optimizer_type.resume(args.checkpoint, tournament)
+    else:
+        optimizer = new_optimizer(tournament)
+    asyncio.run(
+        optimizer.simulate(
+            n_iterations=max(args.generations - optimizer.generation, 0),
+            checkpoint_path=args.checkpoint,
+            checkpoint_every=args.checkpoint_every,
+        )
+    )
+    print(optimizer.best_player)
+
+
+class GenePool(Optimizer):
+    def __init__(
+        self,
+        n_players: int,
+        tournament: Tournament,
+        reference_player: Player = russia,
+        n_replace: int = 20,
+        mutation_rate: float = 0.1,
+        seed: Optional[int] = None,
+        ratings: Optional[EloRatings] = None,
+        population_path: Optional[PathLike] = None,
+        selection: str = "truncation",
+        tournament_size: int = 3,
+        crossover_rate: float = 0.0,
+        cache: Optional[GameCache] = None,
+        network: Optional[Network] = None,
+    ):
+        """A population of players with random weights (see Optimizer).
+        If a seed is given, it also seeds the initial weights and the
+        mutations.
+
+        If ratings are given, the tournament records its games in them,
+        and players are selected on their ratings, which accumulate over
+        the generations, rather than on one tournament's scores.
+        Offspring start at their parent's rating.
+
+        Each generation, the n_replace lowest scoring players are
+        replaced by offspring of parents chosen by selection (see
+        select_parents), crossed over with a second parent with
+        probability crossover_rate and then mutated with Gaussian noise
+        of standard deviation mutation_rate. The whole generation is
+        bred at once, in place in population.
+
+        If a cache is given, the fitness evaluator plays the same games
+        every generation and looks up those of the players that survived
+        (see GameCache). This needs a seed. The tournament can be given
+        the same cache, or one of its own: games stopped as soon as they
+        were decided are cached apart from games played out. Caches with
+        a path are saved with every checkpoint.
+        """
+        if selection not in SELECTIONS:
+            raise ValueError(f"Unknown selection: {selection}")
+        super().__init__(
+            n_players,
+            tournament,
+            reference_player,
+            seed=seed,
+            network=network,
+            population_path=population_path,
+            cache=cache,
+        )
+        self.randomize(self.population)
+        self.ratings = ratings
+        if ratings is not None:
+            tournament.ratings = ratings
+        self.n_replace = n_replace
+        self.mutation_rate = mutation_rate
+        self.selection = selection
+        self.tournament_size = tournament_size
+        self.crossover_rate = crossover_rate
+
+    def replacement(self, scores):
+        scores = np.asarray(scores, dtype=float)
+        n_replace = min(self.n_replace, self.n_players)
+        # The worst players make way for the offspring
+        losers = np.argsort(scores, kind="stable")[:n_replace]
+        parents = select_parents(
+            scores, n_replace, self.selection, self.tournament_size, self.rng
+        )
+        if self.selection == "truncation":
+            # Pair the best with the second best, and so on
+            partners = np.roll(parents, -1)
+        else:
+            partners = select_parents(
+                scores, n_replace, self.selection, self.tournament_size, self.rng
+            )
+
+        # Everyone who might be rated, so we can forget the losers
+        if self.ratings is not None:
+            loser_ids = {self.players[i].player_id for i in losers}
+            parent_ids = [self.players[i].player_id for i in parents]
+
+        children = crossover(
+            self.population[parents],
+            self.population[partners],
+            self.crossover_rate,
+            self.rng,
+        )
+        self.population[losers] = mutate(children, self.mutation_rate, self.rng)
+
+        if self.ratings is not None:
+            for i, parent_id in zip(losers, parent_ids):
+                self.ratings.inherit(self.players[i].player_id, parent_id)
+            self.ratings.forget(loser_ids - {p.player_id for p in self.players})
+
+    async def play_generation(self) -> Sequence[float]:
+        scores = await self.tournament.play(self.players)
+        if self.ratings is not None:
+            scores = [self.ratings.rating(p.player_id) for p in self.players]
+        return scores
+
+    async def evaluate_fitness(self) -> float:
+        """The points the whole population scores against the reference
+        player.
+        """
+        return await self.fitness_evaluator.evaluate_population(self)
+
+    def breed(self, scores: Sequence[float]) -> None:
+        self.replacement(scores)
+
+    def checkpoint_arrays(self) -> Dict[str, np.ndarray]:
+        return {"population": self.population}
+
+    def checkpoint_state(self) -> Dict[str, Any]:
+        return {
+            **super().checkpoint_state(),
+            "n_replace": self.n_replace,
+            "mutation_rate": self.mutation_rate,
+            "selection": self.selection,
+            "tournament_size": self.tournament_size,
+            "crossover_rate": self.crossover_rate,
+            "names": [player.name for player in self.players],
+            "ratings": None if self.ratings is None else self.ratings.to_dict(),
+        }
+
+    @classmethod
+    def from_checkpoint(
+        cls,
+        state: Dict[str, Any],
+        arrays: Dict[str, np.ndarray],
+        tournament: Tournament,
+        reference_player: Player,
+        network: Optional[Network],
+        population_path: Optional[PathLike] = None,
+        cache: Optional[GameCache] = None,
+    ) -> "GenePool":
+        """See Optimizer.resume, which also takes population_path and
+        cache, as GenePool does.
+        """
+        ratings = state["ratings"]
+        pool = cls(
+            n_players=len(arrays["population"]),
+            tournament=tournament,
+            reference_player=reference_player,
+            n_replace=state["n_replace"],
+            mutation_rate=state["mutation_rate"],
+            selection=state["selection"],
+            tournament_size=state["tournament_size"],
+            crossover_rate=state["crossover_rate"],
+            seed=state["seed"],
+            ratings=None if ratings is None else EloRatings.from_dict(ratings),
+            population_path=population_path,
+            cache=cache,
+            network=network,
+        )
+        pool.population[...] = arrays["population"]
+        for player, name in zip(pool.players, state["names"]):
+            player.name = name
+        return pool
+
+    @property
+    def weights(self) -> np.ndarray:
+        """The weights of the whole population, as a (P, 16, 51) tensor,
+        or for networks a (P, n_parameters) matrix.
+        """
+        return self.population
 
     @property
     def best_player(self):
@@ -164,12 +1010,13 @@ class GenePool:
 
 
 if __name__ == "__main__":
-    np.random.seed(0)
-    pool = GenePool(
-        n_players=32,
-        tournament=PlayAgainstChallengerTournament(russia),
-        n_replace=8,
-        mutation_rate=0.1,
+    main(
+        GenePool,
+        lambda tournament: GenePool(
+            n_players=32,
+            tournament=tournament,
+            n_replace=8,
+            mutation_rate=0.1,
+            seed=0,
+        ),
     )
-    asyncio.run(pool.simulate(n_iterations=1000))
-    print(pool.best_player)
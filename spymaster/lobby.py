@@ -0,0 +1,61 @@
+import asyncio
+from collections import OrderedDict
+from typing import Callable, Generic, Optional, Tuple, TypeVar
+
+from spymaster.players.online_player import OnlinePlayer
+
+T = TypeVar("T")
+
+
+class Lobby(Generic[T]):
+    """Pairs up online players in the order they arrive.
+
+    A waiting player costs one future and one entry in an ordered dict,
+    so thousands can wait at once. Players who leave before they are
+    paired are skipped, and players who have waited wait_timeout
+    seconds give up (typically to play the AI instead).
+    """
+
+    def __init__(self, wait_timeout: float = 30.0):
+        self.wait_timeout = wait_timeout
+        # Waiting players and the futures that their opponents complete,
+        # by id of the player, in the order they arrived
+        self.waiting: OrderedDict[
+            int, Tuple[OnlinePlayer, "asyncio.Future[Optional[T]]"]
+        ] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.waiting)
+
+    async def match(
+        self,
+        player: OnlinePlayer,
+        pair: Callable[[OnlinePlayer, OnlinePlayer], T],
+    ) -> Optional[T]:
+        """Pair the player with the longest-waiting player, or if no one
+        is waiting then wait for someone to arrive. Either way, the
+        player who arrived first is passed to pair as White, the other as
+        Black, and both get the result. Returns None if no one arrived
+        within wait_timeout, or if the player left (see leave).
+        """
+        while self.waiting:
+            _, (opponent, paired) = self.waiting.popitem(last=False)
+            if not paired.done():
+                result = pair(opponent, player)
+                paired.set_result(result)
+                return result
+
+        paired = asyncio.get_running_loop().create_future()
+        self.waiting[id(player)] = (player, paired)
+        try:
+            return await asyncio.wait_for(paired, self.wait_timeout)
+        except TimeoutError:
+            return None
+        finally:
+            self.waiting.pop(id(player), None)
+
+    def leave(self, player: OnlinePlayer) -> None:
+        """Stop waiting for an opponent for the player."""
+        _, paired = self.waiting.pop(id(player), (None, None))
+        if paired is not None and not paired.done():
+            paired.set_result(None)
@@ -0,0 +1,353 @@
+"""Opt-in instrumentation: an in-process registry of counters, gauges and
+histograms, rendered in the Prometheus text format (see the webserver's
+/metrics).
+
+Instrumentation is off by default. Call enable() to switch it on, after
+which games (see Spymaster.play) time their picks, resolves and
+receives, and gene pools (see GenePool.simulate) time each generation.
+Games run the same loop either way, through GameHooks: while
+instrumentation is off, the hooks record nothing.
+"""
+
+import abc
+import math
+import time
+import typing
+from typing import (
+    Awaitable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+if typing.TYPE_CHECKING:
+    from spymaster.players import Player, SyncPlayer
+    from spymaster.spymaster import MissionResult, Spymaster
+
+LabelValues = Tuple[str, ...]
+
+# From a microsecond to about four seconds
+TIME_BUCKETS = tuple(1e-6 * 4**k for k in range(12))
+
+
+def format_labels(names: Sequence[str], values: LabelValues, **extra: str) -> str:
+    pairs = [*zip(names, values), *extra.items()]
+    if not pairs:
+        return ""
+    escaped = (
+        (name, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in pairs
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric(abc.ABC):
+    """A named metric, with one value per combination of label values."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+
+    def check_labels(self, values: LabelValues) -> None:
+        if len(values) != len(self.labelnames):
+            raise ValueError(
+                f"{self.name} takes labels {self.labelnames}, got {values}"
+            )
+
+    @abc.abstractmethod
+    def samples(self) -> Iterable[str]:
+        """The metric's lines in the text format, after HELP and TYPE."""
+
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.help}",
+            f"# TYPE {self.name} {self.kind}",
+            *self.samples(),
+        ]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self.values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, *labels: str) -> None:
+        self.check_labels(labels)
+        self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def get(self, *labels: str) -> float:
+        return self.values.get(labels, 0.0)
+
+    def samples(self) -> Iterable[str]:
+        for labels, value in self.values.items():
+            label_text = format_labels(self.labelnames, labels)
+            yield f"{self.name}{label_text} {format_value(value)}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, *labels: str) -> None:
+        self.check_labels(labels)
+        self.values[labels] = value
+
+
+class Histogram(Metric):
+    """Counts of observations no greater than each of the buckets' upper
+    bounds, plus their sum and count.
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = TIME_BUCKETS,
+    ):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label values: the count in each bucket (not cumulative),
+        # the sum and the count
+        self.values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        entry = self.values.get(labels)
+        if entry is None:
+            self.check_labels(labels)
+            entry = self.values[labels] = ([0] * (len(self.buckets) + 1), [0.0, 0])
+        counts, totals = entry
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+                break
+        else:
+            counts[-1] += 1
+        totals[0] += value
+        totals[1] += 1
+
+    def count(self, *labels: str) -> int:
+        entry = self.values.get(labels)
+        return 0 if entry is None else int(entry[1][1])
+
+    def total(self, *labels: str) -> float:
+        entry = self.values.get(labels)
+        return 0.0 if entry is None else entry[1][0]
+
+    def samples(self) -> Iterable[str]:
+        for labels, (counts, (total, count)) in self.values.items():
+            cumulative = 0
+            for bound, n in zip((*self.buckets, math.inf), counts):
+                cumulative += n
+                label_text = format_labels(
+                    self.labelnames, labels, le=format_value(bound)
+                )
+                yield f"{self.name}_bucket{label_text} {cumulative}"
+            label_text = format_labels(self.labelnames, labels)
+            yield f"{self.name}_sum{label_text} {format_value(total)}"
+            yield f"{self.name}_count{label_text} {format_value(count)}"
+
+
+class MetricsRegistry:
+    """Metrics by name. Asking for a metric that already exists returns
+    it, so that code can register the metrics it uses without caring
+    whether something else already has.
+    """
+
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        existing = self.metrics.get(metric.name)
+        if existing is None:
+            self.metrics[metric.name] = metric
+            return metric
+        if type(existing) is not type(metric):
+            raise ValueError(f"{metric.name} is already a {existing.kind}")
+        return existing
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labelnames))  # type: ignore[return-value]
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, help, labelnames))  # type: ignore[return-value]
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = TIME_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))  # type: ignore[return-value]
+
+    def render(self) -> str:
+        """All the metrics in the Prometheus text exposition format."""
+        lines = [line for metric in self.metrics.values() for line in metric.render()]
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+class GameHooks:
+    """What a game's loop calls to pick, resolve and receive, so that
+    the same loop runs with instrumentation on or off. These hooks just
+    call through; Instruments' also time each step.
+    """
+
+    def pick_sync(self, player: "SyncPlayer", state: "Spymaster") -> int:
+        return player.pick_sync(state)
+
+    def pick(self, player: "Player", pick: Awaitable[int]) -> Awaitable[int]:
+        return pick
+
+    def resolve(
+        self, game: "Spymaster", white_play: int, black_play: int
+    ) -> "MissionResult":
+        return game.resolve(white_play, black_play)
+
+    def receive_sync(self, game: "Spymaster", result: "MissionResult") -> None:
+        game.white.receive_sync(game, result)  # type: ignore[attr-defined]
+        game.black.receive_sync(game, result.flipped())  # type: ignore[attr-defined]
+
+    def receive(self, receives: Awaitable[None]) -> Awaitable[None]:
+        return receives
+
+    def round_played(self) -> None:
+        pass
+
+    def game_played(self) -> None:
+        pass
+
+
+NO_HOOKS = GameHooks()
+
+
+class Instruments(GameHooks):
+    """The metrics that instrumented code records to."""
+
+    def __init__(self, registry: MetricsRegistry):
+        self.registry = registry
+        self.pick_seconds = registry.histogram(
+            "spymaster_pick_seconds",
+            "Time for a player to pick a legal card, by class of player",
+            ["player"],
+        )
+        self.resolve_seconds = registry.histogram(
+            "spymaster_resolve_seconds", "Time to resolve a round"
+        )
+        self.receive_seconds = registry.histogram(
+            "spymaster_receive_seconds",
+            "Time for both players to receive a round's result",
+        )
+        self.rounds = registry.counter("spymaster_rounds_total", "Rounds played")
+        self.games = registry.counter("spymaster_games_total", "Games finished")
+        self.generation_seconds = registry.histogram(
+            "gene_pool_generation_seconds",
+            "Time for each stage of a gene pool generation",
+            ["stage"],
+            buckets=tuple(1e-3 * 4**k for k in range(10)),
+        )
+        self.generations = registry.counter(
+            "gene_pool_generations_total", "Gene pool generations evolved"
+        )
+
+    def pick_sync(self, player: "SyncPlayer", state: "Spymaster") -> int:
+        start = time.perf_counter()
+        card = player.pick_sync(state)
+        self.observe_pick(player, time.perf_counter() - start)
+        return card
+
+    def pick(self, player: "Player", pick: Awaitable[int]) -> Awaitable[int]:
+        return self.timed_pick(player, pick)
+
+    async def timed_pick(self, player: "Player", pick: Awaitable[int]) -> int:
+        start = time.perf_counter()
+        card = await pick
+        self.observe_pick(player, time.perf_counter() - start)
+        return card
+
+    def observe_pick(self, player: "Player", seconds: float) -> None:
+        self.pick_seconds.observe(seconds, type(player).__name__)
+
+    def resolve(
+        self, game: "Spymaster", white_play: int, black_play: int
+    ) -> "MissionResult":
+        with Timer(self.resolve_seconds):
+            return game.resolve(white_play, black_play)
+
+    def receive_sync(self, game: "Spymaster", result: "MissionResult") -> None:
+        with Timer(self.receive_seconds):
+            super().receive_sync(game, result)
+
+    async def receive(self, receives: Awaitable[None]) -> None:
+        with Timer(self.receive_seconds):
+            await receives
+
+    def round_played(self) -> None:
+        self.rounds.inc()
+
+    def game_played(self) -> None:
+        self.games.inc()
+
+    def observe_generation(self, **stages: float) -> None:
+        """Record the seconds spent in each stage of a generation."""
+        for stage, seconds in stages.items():
+            self.generation_seconds.observe(seconds, stage)
+        self.generations.inc()
+
+
+# The instruments in use, or None while instrumentation is off
+instruments: Optional[Instruments] = None
+
+
+def enable(registry: MetricsRegistry = REGISTRY) -> Instruments:
+    """Switch instrumentation on, recording to registry."""
+    global instruments
+    instruments = Instruments(registry)
+    return instruments
+
+
+def disable() -> None:
+    global instruments
+    instruments = None
+
+
+def game_hooks() -> GameHooks:
+    """The hooks for a game about to be played: the instruments, or
+    hooks that record nothing while instrumentation is off.
+    """
+    return NO_HOOKS if instruments is None else instruments
+
+
+class Timer:
+    """Observes the time spent in a with block into a histogram."""
+
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram: Histogram, *labels: str):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self) -> "Timer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
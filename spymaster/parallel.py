@@ -0,0 +1,299 @@
+import abc
+import asyncio
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from spymaster.batch import BatchSpymaster
+from spymaster.gene_pool import Tournament
+from spymaster.players import Player
+from spymaster.players.computer_players import computer_players, russia
+from spymaster.players.evolutionary_players import (
+    NetworkPlayer,
+    SingleLayerPerceptronPlayer,
+)
+from spymaster.ratings import EloRatings
+
+PlayerSpec = Tuple[str, Any]
+Matchup = Tuple[int, int, int]
+# A matchup together with the seeds for its games, if any
+SeededMatchup = Tuple[int, int, int, Optional[List[int]]]
+
+
+def mapped_location(array: np.ndarray) -> Optional[Tuple[str, int]]:
+    """The file and byte offset of a contiguous array that is, or is a
+    view of, a memmap; or None if it isn't.
+    """
+    top = array
+    while isinstance(top.base, np.ndarray):
+        top = top.base
+    if (
+        not isinstance(top, np.memmap)
+        or top.filename is None
+        or not array.flags.c_contiguous
+    ):
+        return None
+    start = array.__array_interface__["data"][0] - top.__array_interface__["data"][0]
+    return top.filename, top.offset + start
+
+
+def player_spec(player: Player) -> PlayerSpec:
+    """Describe a player by its parameters, so that workers can rebuild
+    it without unpickling a live object. Perceptrons whose weights are
+    in a memmapped file (as in a GenePool with a population_path) are
+    described by where their weights are, and workers map them from
+    there. Networks are described by their architecture and parameters.
+    Other players that aren't one of the named computer players are sent
+    as they are.
+    """
+    if isinstance(player, SingleLayerPerceptronPlayer):
+        location = mapped_location(player.weights_matrix)
+        if location is not None:
+            return ("mapped", (player.name, *location))
+        return ("perceptron", (player.name, player.weights_matrix))
+    if isinstance(player, NetworkPlayer):
+        return ("network", (player.name, player.network, player.parameters))
+    if computer_players.get(player.name) is player:
+        return ("computer", player.name)
+    return ("object", player)
+
+
+def player_from_spec(spec: PlayerSpec) -> Player:
+    kind, params = spec
+    if kind == "perceptron":
+        name, weights = params
+        return SingleLayerPerceptronPlayer(name=name, weights_matrix=weights)
+    if kind == "mapped":
+        name, filename, offset = params
+        weights = np.memmap(
+            filename,
+            dtype=np.float32,
+            mode="r",
+            offset=offset,
+            shape=(16, SingleLayerPerceptronPlayer.INPUTS_LENGTH),
+        )
+        return SingleLayerPerceptronPlayer(name=name, weights_matrix=weights)
+    if kind == "network":
+        name, network, parameters = params
+        return NetworkPlayer(name=name, parameters=parameters, network=network)
+    if kind == "computer":
+        return computer_players[params]
+    if kind == "object":
+        return params
+    raise ValueError(f"Unknown player spec: {kind}")
+
+
+@dataclass
+class WorkerStats:
+    pid: int
+    n_games: int
+    seconds: float
+
+    @property
+    def games_per_second(self) -> float:
+        return self.n_games / self.seconds if self.seconds else float("inf")
+
+
+@dataclass
+class MatchupResult:
+    white: int
+    black: int
+    white_scores: np.ndarray
+    black_scores: np.ndarray
+
+
+def play_shard(
+    specs: Sequence[PlayerSpec],
+    matchups: Sequence[SeededMatchup],
+    stop_when_decided: bool = False,
+) -> Tuple[List[MatchupResult], WorkerStats]:
+    """Play a shard of matchups in a worker process. Each matchup is a
+    (white, black, n_games, seeds) tuple, where white and black index
+    into specs.
+    """
+    start = time.perf_counter()
+    players = {}
+    results = []
+    n_games = 0
+    for white, black, n, seeds in matchups:
+        for idx in (white, black):
+            if idx not in players:
+                players[idx] = player_from_spec(specs[idx])
+        batch = BatchSpymaster(
+            n, white=players[white], black=players[black], seeds=seeds
+        )
+        batch.play(stop_when_decided=stop_when_decided)
+        results.append(
+            MatchupResult(white, black, batch.white_score, batch.black_score)
+        )
+        n_games += n
+    stats = WorkerStats(os.getpid(), n_games, time.perf_counter() - start)
+    return results, stats
+
+
+class ParallelTournament(Tournament):
+    """A tournament whose games are sharded across a pool of worker
+    processes. Subclasses say which matchups to play and how to turn
+    their results into scores.
+
+    The pool is created on first use and reused between calls to play;
+    call close (or use the tournament as a context manager) to shut it
+    down. Seeds are assigned to games before sharding, so a seeded
+    parallel tournament gives the same scores as the serial one.
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        shards_per_worker: int = 4,
+        executor: Optional[Executor] = None,
+        seed: Optional[int] = None,
+        ratings: Optional[EloRatings] = None,
+    ):
+        super().__init__(seed, ratings)
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.shards_per_worker = shards_per_worker
+        self._executor = executor
+        self._owns_executor = executor is None
+        self.stats: List[WorkerStats] = []
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    def close(self) -> None:
+        if self._executor is not None and self._owns_executor:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self) -> "ParallelTournament":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def extra_players(self) -> List[Player]:
+        """Players other than the competitors, e.g. a challenger. These
+        are indexed after the competitors in the matchups.
+        """
+        return []
+
+    @abc.abstractmethod
+    def matchups(self, n_players: int) -> List[Matchup]:
+        pass
+
+    @abc.abstractmethod
+    def score(self, n_players: int, results: List[MatchupResult]) -> List[float]:
+        pass
+
+    async def play(self, players: List[Player]) -> List[float]:
+        n_players = len(players)
+        everyone = players + self.extra_players()
+        specs = [player_spec(p) for p in everyone]
+        matchups = self.seeded(self.matchups(n_players))
+        n_shards = min(len(matchups), self.max_workers * self.shards_per_worker)
+        shards = [matchups[k::n_shards] for k in range(n_shards)]
+
+        loop = asyncio.get_running_loop()
+        outputs = await asyncio.gather(
+            *(
+                loop.run_in_executor(
+                    self.executor, play_shard, specs, shard, self.stop_when_decided
+                )
+                for shard in shards
+            )
+        )
+
+        results = [result for shard_results, _ in outputs for result in shard_results]
+        # Back in the order they were scheduled, so that ratings are
+        # updated in the same order as by the serial tournaments
+        results.sort(key=lambda r: (r.white, r.black))
+        self.stats = [stats for _, stats in outputs]
+        if self.ratings is not None:
+            ids = [player.player_id for player in everyone]
+            for r in results:
+                n = len(r.white_scores)
+                self.record_batch(
+                    [ids[r.white]] * n,
+                    [ids[r.black]] * n,
+                    r.white_scores,
+                    r.black_scores,
+                )
+        return self.score(n_players, results)
+
+    def seeded(self, matchups: List[Matchup]) -> List[SeededMatchup]:
+        seeds = self.game_seeds(sum(n for _, _, n in matchups))
+        seeded = []
+        start = 0
+        for white, black, n in matchups:
+            matchup_seeds = None if seeds is None else seeds[start : start + n]
+            seeded.append((white, black, n, matchup_seeds))
+            start += n
+        return seeded
+
+    def report(self) -> str:
+        """Summarise the throughput of each worker in the last call to
+        play.
+        """
+        by_pid = {}
+        for s in self.stats:
+            games, seconds = by_pid.get(s.pid, (0, 0.0))
+            by_pid[s.pid] = (games + s.n_games, seconds + s.seconds)
+        lines = [
+            f"worker {pid}: {games} games in {seconds:.2f}s "
+            f"({games / seconds if seconds else float('inf'):.0f} games/s)"
+            for pid, (games, seconds) in sorted(by_pid.items())
+        ]
+        return "\n".join(lines)
+
+
+class ParallelRoundRobinTournament(ParallelTournament):
+    """RoundRobinTournament, played across a pool of worker processes."""
+
+    stop_when_decided = True
+
+    def matchups(self, n_players: int) -> List[Matchup]:
+        return [(i, j, 1) for i in range(n_players) for j in range(n_players) if i != j]
+
+    def score(self, n_players: int, results: List[MatchupResult]) -> List[float]:
+        scores = [0.0] * n_players
+        for r in results:
+            for ws, bs in zip(r.white_scores.tolist(), r.black_scores.tolist()):
+                if ws > bs:
+                    scores[r.white] += 1
+                elif bs > ws:
+                    scores[r.black] += 1
+                else:
+                    scores[r.white] += 0.5
+                    scores[r.black] += 0.5
+        return scores
+
+
+class ParallelChallengerTournament(ParallelTournament):
+    """PlayAgainstChallengerTournament, played across a pool of worker
+    processes.
+    """
+
+    def __init__(self, challenger: Player = russia, n_games: int = 30, **kwargs):
+        """Keyword arguments are passed on to ParallelTournament."""
+        super().__init__(**kwargs)
+        self.challenger = challenger
+        self.n_games = n_games
+
+    def extra_players(self) -> List[Player]:
+        return [self.challenger]
+
+    def matchups(self, n_players: int) -> List[Matchup]:
+        return [(i, n_players, self.n_games) for i in range(n_players)]
+
+    def score(self, n_players: int, results: List[MatchupResult]) -> List[float]:
+        scores = [0.0] * n_players
+        for r in results:
+            scores[r.white] += int(r.white_scores.sum() - r.black_scores.sum())
+        return scores
@@ -1,8 +1,14 @@
+import typing
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
 
+import numpy as np
+
 from spymaster.spymaster import MissionResult, Spymaster
 
+if typing.TYPE_CHECKING:
+    from spymaster.batch import BatchSpymaster
+
 
 @dataclass
 class Player(ABC):
@@ -14,7 +20,11 @@ class Player(ABC):
 
     async def receive(self, state: Spymaster, result: MissionResult) -> None:
         """Do something with the result from a round."""
-        pass
+
+    @property
+    def player_id(self) -> str:
+        """Identifies the player, e.g. in ratings."""
+        return self.name
 
     async def warn_illegal_choice(self, situation: Spymaster, picked):
         """Warn the player that she picked an illegal card. For AI
@@ -24,6 +34,56 @@ class Player(ABC):
         raise ValueError("Illegal choice")
 
 
+class SyncPlayer(Player, ABC):
+    """A player that never needs to wait on I/O, e.g. a computer player.
+
+    Such players implement pick_sync (and optionally receive_sync), and
+    games in which both players are SyncPlayers can be played with
+    Spymaster.play_sync, without going through the event loop.
+
+    They can also play many games at once in a BatchSpymaster, through
+    pick_batch and receive_batch. By default these just loop over the
+    games; players that can choose for all the games at once should
+    override them.
+    """
+
+    @abstractmethod
+    def pick_sync(self, state: Spymaster) -> int:
+        pass
+
+    def receive_sync(self, state: Spymaster, result: MissionResult) -> None:
+        """Do something with the result from a round."""
+
+    def pick_batch(self, states: "BatchSpymaster") -> np.ndarray:
+        """Pick a card in each of a batch of games."""
+        return np.array([self.pick_sync(state) for state in states.games()])
+
+    def receive_batch(
+        self,
+        states: "BatchSpymaster",
+        you_played: np.ndarray,
+        opp_played: np.ndarray,
+        you_scored: np.ndarray,
+        opp_scored: np.ndarray,
+    ) -> None:
+        """Do something with the results of a round in a batch of games."""
+        if type(self).receive_sync is SyncPlayer.receive_sync:
+            return
+        results = states.results(you_played, opp_played, you_scored, opp_scored)
+        for state, result in zip(states.games(), results):
+            self.receive_sync(state, result)
+
+    async def pick(self, state: Spymaster) -> int:
+        return self.pick_sync(state)
+
+    async def receive(self, state: Spymaster, result: MissionResult) -> None:
+        self.receive_sync(state, result)
+
+
+def is_sync(player: Player) -> bool:
+    return isinstance(player, SyncPlayer)
+
+
 def tryint(x: str) -> int | None:
     try:
         return int(x)
@@ -1,6 +1,28 @@
-from random import randint
+"""Heuristics used by the computer players to pick a card.
+
+Each comes in three forms: on collections of cards (as the rollout
+policies use), on hand bitmasks as held by Spymaster (the *_mask
+functions), and on the (N, 16) boolean hands of a BatchSpymaster, for
+every game at once (the *_batch functions). The three forms pick the
+same cards and make the same random draws; where a collection version
+returns None, the batch versions return NONE.
+"""
+
+import random
+import typing
 from typing import Collection, Optional
 
+import numpy as np
+
+from spymaster.batch import CARDS
+from spymaster.rng import GLOBAL_RNG
+
+if typing.TYPE_CHECKING:
+    from spymaster.batch import BatchSpymaster
+
+# No card, in the batch versions
+NONE = -1
+
 
 def prefer(*options: Optional[int]) -> Optional[int]:
     """Given a list of options, return the first one that isn't None.
@@ -34,7 +56,12 @@ def aim_low(options: Collection[int], target: int) -> Optional[int]:
     return min(options, default=None)
 
 
-def aim(options: Collection[int], target: int, cutoff=6) -> int:
+def aim(
+    options: Collection[int],
+    target: int,
+    cutoff=6,
+    rng: random.Random = GLOBAL_RNG,
+) -> int:
     """Try to play the card that is as close as possible to the target.
 
     If an exact match is not possible, then for a high-value target, try
@@ -50,7 +77,7 @@ def aim(options: Collection[int], target: int, cutoff=6) -> int:
     """
     if target > 15:
         # A high target might be treated as 0 (i.e. try to play the assassin)
-        target = randint(0, 1) * 15
+        target = rng.randint(0, 1) * 15
 
     if target in options:
         return target
@@ -72,15 +99,143 @@ def mx(
     return min((x for x in mine if their_best <= x <= high), default=None)
 
 
-def chuck(mine: Collection[int]) -> int:
+def chuck(mine: Collection[int], rng: random.Random = GLOBAL_RNG) -> int:
     """Attempt to play a low card. Prioritise playing cards above 4 (to
     have a shot of winning); if no such cards are available then play
     the absolutely lowest cards. Only play the assassin if nothing else
     is available.
     """
-    lower = randint(1, 4)
+    lower = rng.randint(1, 4)
     return prefer(
         min((x for x in mine if x >= lower), default=None),
         min((x for x in mine if x > 0), default=None),
         0,
     )
+
+
+def lowest_bit(mask: int) -> Optional[int]:
+    return (mask & -mask).bit_length() - 1 if mask else None
+
+
+def highest_bit(mask: int) -> Optional[int]:
+    return mask.bit_length() - 1 if mask else None
+
+
+def aim_high_mask(hand: int, target: int) -> Optional[int]:
+    """aim_high on a hand bitmask."""
+    return highest_bit(hand >> (target + 1) << (target + 1))
+
+
+def aim_low_mask(hand: int, target: int) -> Optional[int]:
+    """aim_low on a hand bitmask."""
+    return lowest_bit(hand & ((1 << target) - 1))
+
+
+def aim_mask(hand: int, target: int, cutoff=6, rng: random.Random = GLOBAL_RNG) -> int:
+    """aim on a hand bitmask."""
+    if target > 15:
+        target = rng.randint(0, 1) * 15
+
+    if hand >> target & 1:
+        return target
+
+    if target > cutoff:
+        return prefer(aim_high_mask(hand, target), aim_low_mask(hand, target))
+    else:
+        return prefer(aim_low_mask(hand, target), aim_high_mask(hand, target))
+
+
+def mx_mask(mine: int, theirs: int, low: int, high: int) -> Optional[int]:
+    """mx on hand bitmasks."""
+    below_high = (2 << high) - 1
+    their_best = highest_bit(theirs & below_high >> low << low)
+    if their_best is None:
+        their_best = low
+    return lowest_bit(mine & below_high >> their_best << their_best)
+
+
+def chuck_mask(mine: int, rng: random.Random = GLOBAL_RNG) -> int:
+    """chuck on a hand bitmask."""
+    lower = rng.randint(1, 4)
+    return prefer(lowest_bit(mine >> lower << lower), lowest_bit(mine & ~1), 0)
+
+
+def as_column(values) -> np.ndarray:
+    """Scalars or one value per game, shaped to compare with CARDS."""
+    return np.asarray(values).reshape(-1, 1)
+
+
+def lowest_card(cards: np.ndarray) -> np.ndarray:
+    """The lowest card in each row of an (N, 16) boolean matrix, or
+    NONE for empty rows.
+    """
+    return np.where(cards.any(axis=1), cards.argmax(axis=1), NONE)
+
+
+def highest_card(cards: np.ndarray) -> np.ndarray:
+    return np.where(cards.any(axis=1), 15 - cards[:, ::-1].argmax(axis=1), NONE)
+
+
+def prefer_batch(*options) -> np.ndarray:
+    """prefer, game by game: the first option that isn't NONE."""
+    result = np.asarray(options[-1])
+    for option in reversed(options[:-1]):
+        result = np.where(option != NONE, option, result)
+    return result
+
+
+def aim_high_batch(cards: np.ndarray, target) -> np.ndarray:
+    return highest_card(cards & (CARDS > as_column(target)))
+
+
+def aim_low_batch(cards: np.ndarray, target) -> np.ndarray:
+    return lowest_card(cards & (CARDS < as_column(target)))
+
+
+def aim_batch(
+    cards: np.ndarray,
+    target,
+    states: "BatchSpymaster",
+    cutoff=6,
+    where: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """aim in every game of a batch, drawing from states. Only the games
+    where where is True make random draws.
+    """
+    target = np.broadcast_to(target, states.n_games)
+    high = target > 15
+    if where is not None:
+        high &= where
+    if high.any():
+        target = np.where(high, states.randint(0, 1, where=high) * 15, target)
+    exact = cards[np.arange(states.n_games), np.minimum(target, 15)]
+    above = aim_high_batch(cards, target)
+    below = aim_low_batch(cards, target)
+    return np.where(
+        exact,
+        target,
+        np.where(
+            target > cutoff, prefer_batch(above, below), prefer_batch(below, above)
+        ),
+    )
+
+
+def mx_batch(mine: np.ndarray, theirs: np.ndarray, low, high) -> np.ndarray:
+    """mx in every game of a batch."""
+    low = as_column(low)
+    high = as_column(high)
+    their_best = highest_card(theirs & (CARDS >= low) & (CARDS <= high))
+    their_best = np.where(their_best == NONE, low[:, 0], their_best)
+    return lowest_card(mine & (CARDS >= their_best[:, None]) & (CARDS <= high))
+
+
+def chuck_batch(
+    mine: np.ndarray, states: "BatchSpymaster", where: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """chuck in every game of a batch, drawing from states."""
+    lower = states.randint(1, 4, where=where)
+    return prefer_batch(
+        lowest_card(mine & (CARDS >= lower[:, None])),
+        lowest_card(mine & (CARDS > 0)),
+        0,
+    )
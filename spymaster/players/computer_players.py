@@ -1,20 +1,34 @@
+import random
 from dataclasses import dataclass, field
-from random import choice, randint, random
 
-from spymaster.players import Player
-from spymaster.spymaster import MissionResult, Spymaster
+import numpy as np
 
-from .aim import aim, chuck, mx, prefer
+from spymaster.batch import BatchSpymaster
+from spymaster.players import SyncPlayer
+from spymaster.rng import GLOBAL_RNG
+from spymaster.spymaster import ALL_CARDS, MissionResult, Spymaster
 
+from .aim import (
+    NONE,
+    aim_batch,
+    aim_mask,
+    chuck_batch,
+    chuck_mask,
+    mx_batch,
+    mx_mask,
+    prefer,
+    prefer_batch,
+)
 
-class RandomPlayer(Player):
+
+class RandomPlayer(SyncPlayer):
     """Naive player that just plays cards at random."""
 
-    async def pick(self, state: Spymaster) -> int:
-        return choice(state.white_cards)
+    def pick_sync(self, state: Spymaster) -> int:
+        return state.rng.choice(state.white_cards)
 
 
-class SimpleAimingPlayer(Player):
+class SimpleAimingPlayer(SyncPlayer):
     """Player that tries to aim for a few points above the value of each
     mission.
     """
@@ -23,88 +37,157 @@ class SimpleAimingPlayer(Player):
         super().__init__(name)
         self.variance = variance
 
-    async def pick(self, state: Spymaster) -> int:
-        target = state.current_mission + randint(1, self.variance)
-        return aim(state.white_cards, target)
+    def pick_sync(self, state: Spymaster) -> int:
+        target = state.current_mission + state.rng.randint(1, self.variance)
+        return aim_mask(state.white_hand, target, rng=state.rng)
+
+    def pick_batch(self, states: BatchSpymaster) -> np.ndarray:
+        target = states.current_mission + states.randint(1, self.variance)
+        return aim_batch(states.white_cards, target, states)
 
 
 @dataclass
-class AmericaPlayer(Player):
+class AmericaPlayer(SyncPlayer):
     """Player that adjusts its aim if it is defeated in a previous
     round.
+
+    Each game starts aiming up to two above the mission, at random from
+    the game's generator, so that a game doesn't depend on the ones
+    America played before it, and seeded games are reproducible however
+    they are batched or sharded.
     """
 
     def __post_init__(self):
-        self.diff: int = randint(0, 2)
+        self.diff = 0
+        # One diff per game when picking in a batch
+        self.diffs = np.zeros(0, dtype=np.int64)
 
-    async def pick(self, state: Spymaster) -> int:
+    def pick_sync(self, state: Spymaster) -> int:
+        if state.white_hand == ALL_CARDS:
+            self.diff = state.rng.randint(0, 2)
         target = state.current_mission + self.diff + 1
-        return aim(state.white_cards, target)
+        return aim_mask(state.white_hand, target, rng=state.rng)
 
-    async def receive(self, state, result: MissionResult) -> None:
+    def receive_sync(self, state, result: MissionResult) -> None:
         if result.opp_played >= result.you_played:
             self.diff = result.opp_played - result.you_played
 
+    def pick_batch(self, states: BatchSpymaster) -> np.ndarray:
+        if states.white_cards.all():
+            self.diffs = states.randint(0, 2)
+        target = states.current_mission + self.diffs + 1
+        return aim_batch(states.white_cards, target, states)
+
+    def receive_batch(self, states, you_played, opp_played, you_scored, opp_scored):
+        beaten = opp_played >= you_played
+        self.diffs = np.where(beaten, opp_played - you_played, self.diffs)
 
-def check(probability: float) -> bool:
-    return random() < probability
+
+def check(probability: float, rng: random.Random = GLOBAL_RNG) -> bool:
+    return rng.random() < probability
 
 
 @dataclass
-class RussiaPlayer(Player):
+class RussiaPlayer(SyncPlayer):
     stabbiness: float = field(default=0.5)
     paranoia: float = field(default=0.5)
     idleness: float = field(default=0.33)
 
-    def __post_init__(self):
-        self.diff = randint(0, 2)
-
-    async def pick(self, state: Spymaster) -> int:
+    def pick_sync(self, state: Spymaster) -> int:
         # This is broken in the original game (as of 2023-12-27); the
         # Russia AI calculates its options and then throws it away, and
         # just does the America AI's action instead!
         p = state.current_mission
-        mine = state.white_cards
-        theirs = state.black_cards
+        mine = state.white_hand
+        theirs = state.black_hand
+        rng = state.rng
 
         def _mx(low, high):
-            return mx(mine, theirs, low, high)
+            return mx_mask(mine, theirs, low, high)
 
         def _aim(target):
-            return aim(mine, target)
+            return aim_mask(mine, target, rng=rng)
 
         if p < 5:
             # Try to win in the range if we can, otherwise discard
-            return prefer(_mx(p, p + 4), chuck(mine))
+            return prefer(_mx(p, p + 4), chuck_mask(mine, rng))
         elif p < 9:
             # Try to win in the range if we can, otherwise aim just above
-            return prefer(_mx(p, p + 3), _aim(randint(p + 1, p + 3)))
+            return prefer(_mx(p, p + 3), _aim(rng.randint(p + 1, p + 3)))
         elif p < 13:
             # If the assassin is available, play it with 50% chance
             return prefer(
                 _mx(p, p + 2),
-                0 if (0 in mine and check(self.stabbiness)) else None,
-                _aim(randint(p + 1, p + 2)),
+                0 if (mine & 1 and check(self.stabbiness, rng)) else None,
+                _aim(rng.randint(p + 1, p + 2)),
             )
         else:
             # For really high value missions, follow a similar strategy...
             e = prefer(
                 _mx(13, 15),
-                0 if (0 in mine and check(self.stabbiness)) else None,
-                _aim(randint(p, 16)),
+                0 if (mine & 1 and check(self.stabbiness, rng)) else None,
+                _aim(rng.randint(p, 16)),
             )
             # ...but if we are about to play a high-value card, then...
 
             if e > 13:
-                paranoid = 0 in theirs and check(self.paranoia)
+                paranoid = theirs & 1 and check(self.paranoia, rng)
                 if paranoid:
-                    e = chuck(mine)
+                    e = chuck_mask(mine, rng)
 
-            if e > 13 and check(self.idleness):
-                e = _aim(randint(5, 7))
+            if e > 13 and check(self.idleness, rng):
+                e = _aim(rng.randint(5, 7))
 
             return e
 
+    def pick_batch(self, states: BatchSpymaster) -> np.ndarray:
+        """pick_sync in every game at once. Each game makes the same
+        random draws, in the same order, as it would in pick_sync.
+        """
+        p = states.current_mission
+        mine = states.white_cards
+        theirs = states.black_cards
+        low = p < 5
+        middle = (p >= 5) & (p < 9)
+        high = (p >= 9) & (p < 13)
+        top = p >= 13
+
+        won = mx_batch(
+            mine,
+            theirs,
+            np.where(top, 13, p),
+            np.select([low, middle, high], [p + 4, p + 3, p + 2], 15),
+        )
+        # Missions below 5: win in the range if we can, otherwise discard
+        chucked = chuck_batch(mine, states, where=low)
+        # Above that, maybe stab, otherwise aim just above the mission
+        stab = ~(low | middle) & mine[:, 0]
+        stab &= states.random(where=stab) < self.stabbiness
+        target = states.randint(
+            np.where(top, p, p + 1),
+            np.select([middle, high], [p + 3, p + 2], 16),
+            where=~low,
+        )
+        aimed = aim_batch(mine, target, states, where=~low)
+        e = np.where(
+            low,
+            prefer_batch(won, chucked),
+            prefer_batch(won, np.where(stab, 0, NONE), aimed),
+        )
+
+        # For really high value missions, think twice about playing a
+        # high-value card
+        paranoid = top & (e > 13) & theirs[:, 0]
+        paranoid &= states.random(where=paranoid) < self.paranoia
+        if paranoid.any():
+            e = np.where(paranoid, chuck_batch(mine, states, where=paranoid), e)
+        idle = top & (e > 13)
+        idle &= states.random(where=idle) < self.idleness
+        if idle.any():
+            target = states.randint(5, 7, where=idle)
+            e = np.where(idle, aim_batch(mine, target, states, where=idle), e)
+        return e
+
 
 china = RandomPlayer("China")
 france = SimpleAimingPlayer("France", 2)
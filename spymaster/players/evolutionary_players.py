@@ -1,17 +1,42 @@
 import abc
-from dataclasses import dataclass
-from typing import ClassVar
+import hashlib
+from dataclasses import dataclass, field
+from typing import Callable, ClassVar, Dict, List, Optional, Sequence, Tuple, Union
 
 import numpy as np
 
 from spymaster import Spymaster
-from spymaster.players import Player
+from spymaster.batch import CARDS, BatchSpymaster
+from spymaster.players import SyncPlayer
+from spymaster.rng import numpy_rng
 
 
-class EvolutionaryPlayer(Player, metaclass=abc.ABCMeta):
+def mutate(weights: np.ndarray, mutation_rate: float, rng=None) -> np.ndarray:
+    """Add Gaussian noise with standard deviation mutation_rate to the
+    weights, in place.
+    """
+    rng = numpy_rng(rng)
+    weights += rng.normal(0, mutation_rate, weights.shape).astype(np.float32)
+    return weights
+
+
+class EvolutionaryPlayer(SyncPlayer, metaclass=abc.ABCMeta):
+    """A player defined by a flat vector of float32 parameters."""
+
+    # The player's parameters, as a flat array (or a view onto one)
+    parameters: np.ndarray
+
     @abc.abstractmethod
-    def create_offspring(self, mutation_rate: float) -> "EvolutionaryPlayer":
-        pass
+    def with_parameters(self, parameters: np.ndarray) -> "EvolutionaryPlayer":
+        """A player like this one, but with other parameters."""
+
+    def create_offspring(
+        self, mutation_rate: float = 0.1, rng: Optional[np.random.Generator] = None
+    ) -> "EvolutionaryPlayer":
+        """A player with these parameters mutated, as in a GenePool (see
+        mutate).
+        """
+        return self.with_parameters(mutate(self.parameters.copy(), mutation_rate, rng))
 
 
 @dataclass
@@ -20,18 +45,31 @@ class SingleLayerPerceptronPlayer(EvolutionaryPlayer):
     INPUTS_LENGTH: ClassVar[int] = 16 + 16 + 16 + 1 + 1 + 1
 
     def __post_init__(self):
-        self.weights_matrix = self.weights_matrix.astype(np.float32)
+        # Float32 weights are not copied, so that a player can be a view
+        # onto a row of a population's weights
+        self.weights_matrix = np.asarray(self.weights_matrix, dtype=np.float32)
 
         if self.weights_matrix.shape != (16, self.INPUTS_LENGTH):
             raise ValueError(f"Invalid shape: {self.weights_matrix.shape}")
 
     @classmethod
-    def randomized(cls) -> "SingleLayerPerceptronPlayer":
+    def randomized(
+        cls, rng: Optional[np.random.Generator] = None
+    ) -> "SingleLayerPerceptronPlayer":
+        rng = numpy_rng(rng)
         return cls(
             name="random",
-            weights_matrix=np.random.normal(0, 1, (16, cls.INPUTS_LENGTH)),
+            weights_matrix=rng.normal(0, 1, (16, cls.INPUTS_LENGTH)),
         )
 
+    @property
+    def player_id(self) -> str:
+        """Perceptrons are identified by their weights, so that copies
+        share an identity and every mutant gets a new one.
+        """
+        digest = hashlib.blake2b(self.weights_matrix.tobytes(), digest_size=8)
+        return f"perceptron-{digest.hexdigest()}"
+
     def __str__(self):
         white_weights = self.weights_matrix[:, :16]
         black_weights = self.weights_matrix[:, 16:32]
@@ -46,31 +84,371 @@ class SingleLayerPerceptronPlayer(EvolutionaryPlayer):
     score_weights={score_weights},
 )"""
 
-    def create_offspring(
-        self, scale_rate=1.1, mutation_rate=0.1
-    ) -> "SingleLayerPerceptronPlayer":
-        new_weights = self.weights_matrix.copy()
-        new_weights *= scale_rate
-        new_weights += np.random.normal(0, mutation_rate, self.weights_matrix.shape)
-        return SingleLayerPerceptronPlayer(name=self.name, weights_matrix=new_weights)
+    @property
+    def parameters(self) -> np.ndarray:
+        return self.weights_matrix.reshape(-1)
+
+    def with_parameters(self, parameters: np.ndarray) -> "SingleLayerPerceptronPlayer":
+        return SingleLayerPerceptronPlayer(
+            name=self.name, weights_matrix=parameters.reshape(16, self.INPUTS_LENGTH)
+        )
 
     def to_vector(self, state: Spymaster) -> np.ndarray:
-        vec = np.zeros(self.INPUTS_LENGTH, dtype=np.float32)
-        for i in state.white_cards:
-            vec[i] = 1
-        for i in state.black_cards:
-            vec[i + 16] = 1
-        for i in state.remaining_missions:
-            vec[i + 32] = 1
-
-        vec[16 + 16 + 16] = state.current_mission
-        vec[16 + 16 + 16 + 1] = state.white_score
-        vec[16 + 16 + 16 + 2] = state.black_score
-        return vec
-
-    async def pick(self, state: Spymaster) -> int:
+        return encode_state(state)
+
+    def pick_batch(self, states: BatchSpymaster) -> np.ndarray:
+        choices_weights = encode_states(states) @ self.weights_matrix.T
+        choices_weights[~states.white_cards] = -np.inf
+        return np.argmax(choices_weights, axis=1)
+
+    def pick_sync(self, state: Spymaster) -> int:
         vec = self.to_vector(state)
         choices_weights = self.weights_matrix @ vec
         choices_weights[vec[:16] == 0] = -np.inf
         best_choice = np.argmax(choices_weights)
-        return best_choice
+        return int(best_choice)
+
+
+def encode_state(state: Spymaster) -> np.ndarray:
+    """The inputs to a network for a game, from White's side: which
+    cards each player holds, which missions remain, the current mission
+    and the scores, as a vector of length 51.
+    """
+    vec = np.zeros(SingleLayerPerceptronPlayer.INPUTS_LENGTH, dtype=np.float32)
+    vec[:16] = (state.white_hand >> CARDS) & 1
+    vec[16:32] = (state.black_hand >> CARDS) & 1
+    # Mission i goes to index i + 32, so mission 16 lands on (and is
+    # overwritten by) the current mission
+    vec[33:48] = (state.missions >> CARDS[:15]) & 1
+
+    vec[16 + 16 + 16] = state.current_mission
+    vec[16 + 16 + 16 + 1] = state.white_score
+    vec[16 + 16 + 16 + 2] = state.black_score
+    return vec
+
+
+def encode_states(states: BatchSpymaster) -> np.ndarray:
+    """encode_state for every game in a batch, as an (N, 51) matrix."""
+    inputs_length = SingleLayerPerceptronPlayer.INPUTS_LENGTH
+    mat = np.zeros((states.n_games, inputs_length), dtype=np.float32)
+    mat[:, :16] = states.white_cards
+    mat[:, 16:32] = states.black_cards
+    mat[:, 33:48] = states.remaining_missions[:, :15]
+    mat[:, 48] = states.current_mission
+    mat[:, 49] = states.white_score
+    mat[:, 50] = states.black_score
+    return mat
+
+
+def stack_weights(players: Sequence[SingleLayerPerceptronPlayer]) -> np.ndarray:
+    """Stack the weights of the players into one (P, 16, 51) tensor."""
+    return np.stack([player.weights_matrix for player in players])
+
+
+class PerceptronPopulation:
+    """A population of single-layer perceptrons, taking the part of one
+    side across all the games in a BatchSpymaster.
+
+    Game g is played by perceptron assignment[g]. Every decision in a
+    round is made with a single batched matmul over the stacked (P, 16,
+    51) weights, followed by a masked argmax.
+    """
+
+    def __init__(
+        self,
+        weights: np.ndarray,
+        assignment: np.ndarray,
+        name: str = "population",
+    ):
+        if weights.ndim != 3 or weights.shape[1:] != (
+            16,
+            SingleLayerPerceptronPlayer.INPUTS_LENGTH,
+        ):
+            raise ValueError(f"Invalid shape: {weights.shape}")
+        self.name = name
+        self.weights = weights.astype(np.float32, copy=False)
+        self.assignment = np.asarray(assignment)
+        # If every perceptron plays the same number of consecutive games,
+        # we can use a batched matmul instead of gathering the weights
+        self._block: Optional[int] = None
+        n_players = len(self.weights)
+        if n_players and len(self.assignment) % n_players == 0:
+            block = len(self.assignment) // n_players
+            if np.array_equal(
+                self.assignment, np.arange(len(self.assignment)) // block
+            ):
+                self._block = block
+
+    @classmethod
+    def from_players(
+        cls, players: List[SingleLayerPerceptronPlayer], games_per_player: int
+    ) -> "PerceptronPopulation":
+        """Population in which each player plays games_per_player
+        consecutive games.
+        """
+        assignment = np.repeat(np.arange(len(players)), games_per_player)
+        return cls(stack_weights(players), assignment)
+
+    def __len__(self) -> int:
+        return len(self.weights)
+
+    def pick_batch(self, states: BatchSpymaster) -> np.ndarray:
+        inputs = encode_states(states)
+        if self._block is not None:
+            inputs = inputs.reshape(len(self.weights), self._block, -1)
+            choices_weights = np.matmul(inputs, self.weights.transpose(0, 2, 1))
+            choices_weights = choices_weights.reshape(states.n_games, 16)
+        else:
+            choices_weights = np.einsum(
+                "nij,nj->ni", self.weights[self.assignment], inputs
+            )
+        choices_weights[~states.white_cards] = -np.inf
+        return np.argmax(choices_weights, axis=1)
+
+    def receive_batch(self, states, you_played, opp_played, you_scored, opp_scored):
+        pass
+
+
+def relu(x: np.ndarray) -> np.ndarray:
+    return np.maximum(x, 0)
+
+
+def identity(x: np.ndarray) -> np.ndarray:
+    return x
+
+
+ACTIVATIONS: Dict[str, Callable[[np.ndarray], np.ndarray]] = {
+    "relu": relu,
+    "tanh": np.tanh,
+    "identity": identity,
+}
+
+
+@dataclass(frozen=True)
+class Network:
+    """The architecture of a NetworkPlayer: a fully connected network
+    from the 51 inputs of encode_state, through hidden layers of the
+    given sizes with the given activation, to a score for each card.
+
+    A network's parameters are one flat vector holding, layer by layer,
+    the (outputs, inputs) weight matrix and then the biases.
+    """
+
+    hidden: Tuple[int, ...] = (32,)
+    activation: str = "tanh"
+
+    def __post_init__(self):
+        if self.activation not in ACTIVATIONS:
+            raise ValueError(f"Unknown activation: {self.activation}")
+        # Accept any sequence of sizes, but keep the network hashable
+        object.__setattr__(self, "hidden", tuple(int(n) for n in self.hidden))
+
+    @property
+    def sizes(self) -> Tuple[int, ...]:
+        return (SingleLayerPerceptronPlayer.INPUTS_LENGTH, *self.hidden, 16)
+
+    @property
+    def n_parameters(self) -> int:
+        return sum(
+            (n_in + 1) * n_out for n_in, n_out in zip(self.sizes, self.sizes[1:])
+        )
+
+    def to_dict(self) -> Dict[str, Union[str, List[int]]]:
+        return {"hidden": list(self.hidden), "activation": self.activation}
+
+    def randomized(self, rng: Optional[np.random.Generator] = None) -> np.ndarray:
+        """Initial parameters for a network (see initialize)."""
+        parameters = np.empty(self.n_parameters, dtype=np.float32)
+        return self.initialize(parameters, rng)
+
+    def initialize(
+        self, parameters: np.ndarray, rng: Optional[np.random.Generator] = None
+    ) -> np.ndarray:
+        """Fill parameters, of one network or many (see layers), with
+        initial values in place: weights drawn with standard deviation
+        1 / sqrt(inputs), and zero biases.
+        """
+        rng = numpy_rng(rng)
+        for weights, biases in self.layers(parameters):
+            n_in = weights.shape[-1]
+            weights[...] = rng.normal(0, 1 / np.sqrt(n_in), weights.shape)
+            biases[...] = 0
+        return parameters
+
+    def layers(self, parameters: np.ndarray) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """Views onto the weights and biases of each layer. parameters is
+        one network's (n_parameters,) vector, or a (P, n_parameters)
+        matrix of P networks' parameters.
+        """
+        if parameters.shape[-1] != self.n_parameters:
+            raise ValueError(f"Invalid shape: {parameters.shape}")
+        leading = parameters.shape[:-1]
+        layers = []
+        offset = 0
+        for n_in, n_out in zip(self.sizes, self.sizes[1:]):
+            weights = parameters[..., offset : offset + n_out * n_in]
+            offset += n_out * n_in
+            biases = parameters[..., offset : offset + n_out]
+            offset += n_out
+            layers.append((weights.reshape(*leading, n_out, n_in), biases))
+        return layers
+
+    def forward(self, parameters: np.ndarray, inputs: np.ndarray) -> np.ndarray:
+        """Each card's score, for a batch of inputs. Either parameters is
+        one network's and inputs is (N, 51), giving (N, 16) scores; or
+        parameters is (P, n_parameters) and inputs is (P, N, 51), and
+        network p scores inputs[p], giving (P, N, 16) scores.
+        """
+        activation = ACTIVATIONS[self.activation]
+        layers = self.layers(parameters)
+        x = inputs
+        for k, (weights, biases) in enumerate(layers):
+            x = np.matmul(x, np.swapaxes(weights, -1, -2)) + biases[..., None, :]
+            if k < len(layers) - 1:
+                x = activation(x)
+        return x
+
+
+@dataclass
+class NetworkPlayer(EvolutionaryPlayer):
+    """Player that scores each card with a multi-layer network (see
+    Network) and plays its best scoring card.
+    """
+
+    parameters: np.ndarray
+    network: Network = field(default_factory=Network)
+
+    def __post_init__(self):
+        # As for perceptrons, float32 parameters are not copied
+        self.parameters = np.asarray(self.parameters, dtype=np.float32)
+
+        if self.parameters.shape != (self.network.n_parameters,):
+            raise ValueError(f"Invalid shape: {self.parameters.shape}")
+
+    @classmethod
+    def randomized(
+        cls,
+        network: Optional[Network] = None,
+        rng: Optional[np.random.Generator] = None,
+    ) -> "NetworkPlayer":
+        network = Network() if network is None else network
+        return cls(name="random", parameters=network.randomized(rng), network=network)
+
+    @property
+    def player_id(self) -> str:
+        """Networks are identified by their architecture and parameters,
+        like perceptrons.
+        """
+        digest = hashlib.blake2b(repr(self.network).encode(), digest_size=8)
+        digest.update(self.parameters.tobytes())
+        return f"network-{digest.hexdigest()}"
+
+    def with_parameters(self, parameters: np.ndarray) -> "NetworkPlayer":
+        return NetworkPlayer(
+            name=self.name, parameters=parameters, network=self.network
+        )
+
+    def pick_batch(self, states: BatchSpymaster) -> np.ndarray:
+        choices_weights = self.network.forward(self.parameters, encode_states(states))
+        choices_weights[~states.white_cards] = -np.inf
+        return np.argmax(choices_weights, axis=1)
+
+    def pick_sync(self, state: Spymaster) -> int:
+        vec = encode_state(state)
+        choices_weights = self.network.forward(self.parameters, vec[None])[0]
+        choices_weights[vec[:16] == 0] = -np.inf
+        return int(np.argmax(choices_weights))
+
+
+class NetworkPopulation:
+    """A population of networks with the same architecture, taking the
+    part of one side across all the games in a BatchSpymaster, like
+    PerceptronPopulation.
+
+    Game g is played by network assignment[g]. The games are grouped by
+    network, padded to the size of the largest group, so that each layer
+    of every decision in a round is one batched matmul.
+    """
+
+    def __init__(
+        self,
+        network: Network,
+        parameters: np.ndarray,
+        assignment: np.ndarray,
+        name: str = "population",
+    ):
+        if parameters.ndim != 2 or parameters.shape[1] != network.n_parameters:
+            raise ValueError(f"Invalid shape: {parameters.shape}")
+        self.name = name
+        self.network = network
+        self.parameters = parameters.astype(np.float32, copy=False)
+        self.assignment = np.asarray(assignment)
+        n_players = len(self.parameters)
+        counts = np.bincount(self.assignment, minlength=n_players)
+        # Each game's network, and its place among that network's games
+        self._order = np.argsort(self.assignment, kind="stable")
+        self._rows = self.assignment[self._order]
+        starts = np.cumsum(counts) - counts
+        self._slots = np.arange(len(self.assignment)) - np.repeat(starts, counts)
+        self._group_size = int(counts.max(initial=0))
+
+    @classmethod
+    def from_players(
+        cls, players: List[NetworkPlayer], games_per_player: int
+    ) -> "NetworkPopulation":
+        """Population in which each player plays games_per_player
+        consecutive games.
+        """
+        assignment = np.repeat(np.arange(len(players)), games_per_player)
+        return cls(players[0].network, stack_parameters(players), assignment)
+
+    def __len__(self) -> int:
+        return len(self.parameters)
+
+    def pick_batch(self, states: BatchSpymaster) -> np.ndarray:
+        inputs = encode_states(states)
+        grouped = np.zeros(
+            (len(self.parameters), self._group_size, inputs.shape[1]),
+            dtype=np.float32,
+        )
+        grouped[self._rows, self._slots] = inputs[self._order]
+        outputs = self.network.forward(self.parameters, grouped)
+        choices_weights = np.empty((states.n_games, 16), dtype=outputs.dtype)
+        choices_weights[self._order] = outputs[self._rows, self._slots]
+        choices_weights[~states.white_cards] = -np.inf
+        return np.argmax(choices_weights, axis=1)
+
+    def receive_batch(self, states, you_played, opp_played, you_scored, opp_scored):
+        pass
+
+
+def stack_parameters(players: Sequence[EvolutionaryPlayer]) -> np.ndarray:
+    """Stack the parameters of the players into one (P, n) matrix."""
+    return np.stack([player.parameters for player in players])
+
+
+Population = Union[PerceptronPopulation, NetworkPopulation]
+
+
+def stackable(players: Sequence[SyncPlayer]) -> bool:
+    """Whether the players can play together as one population: they
+    are all perceptrons, or all networks of the same architecture.
+    """
+    if all(isinstance(p, SingleLayerPerceptronPlayer) for p in players):
+        return True
+    return all(isinstance(p, NetworkPlayer) for p in players) and (
+        len({p.network for p in players}) == 1  # type: ignore[attr-defined]
+    )
+
+
+def stack_population(
+    players: Sequence[EvolutionaryPlayer], assignment: np.ndarray
+) -> Population:
+    """The players (which must be stackable) as one population, in which
+    game g is played by players[assignment[g]].
+    """
+    if isinstance(players[0], NetworkPlayer):
+        return NetworkPopulation(
+            players[0].network, stack_parameters(players), assignment
+        )
+    return PerceptronPopulation(stack_weights(players), assignment)  # type: ignore[arg-type]
@@ -0,0 +1,65 @@
+import asyncio
+from concurrent.futures import Executor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+
+from spymaster.players import Player, SyncPlayer
+from spymaster.players.computer_players import russia
+from spymaster.spymaster import MissionResult, Spymaster
+
+
+@dataclass(kw_only=True)
+class ExecutorPlayer(Player):
+    """Plays a SyncPlayer's moves in an executor, so that a slow player
+    doesn't hold up the event loop, and with it every other game.
+
+    A move that takes longer than deadline seconds, including time
+    spent waiting for a free worker, is abandoned and the fallback
+    player picks instead. The wrapped player still sees its moves and
+    results in order, one at a time: each call waits for the previous
+    one to finish in the background, even if it was abandoned.
+
+    With a process pool, the player is pickled for every move, so any
+    state it keeps between moves is lost. Use it only for stateless
+    players.
+    """
+
+    player: SyncPlayer
+    executor: Executor
+    deadline: float = 1.0
+    fallback: SyncPlayer = field(default_factory=lambda: russia)
+
+    def __post_init__(self):
+        self.last_call: Optional["asyncio.Future[Any]"] = None
+        self.n_moves = 0
+        self.n_fallbacks = 0
+
+    @property
+    def player_id(self) -> str:
+        return self.player.player_id
+
+    def submit(self, fn: Callable[..., Any], *args: Any) -> "asyncio.Future[Any]":
+        """Call fn in the executor after the previous call has finished."""
+        loop = asyncio.get_running_loop()
+        previous = self.last_call
+
+        async def call():
+            if previous is not None:
+                await asyncio.wait([previous])
+            return await loop.run_in_executor(self.executor, fn, *args)
+
+        self.last_call = asyncio.ensure_future(call())
+        return self.last_call
+
+    async def pick(self, state: Spymaster) -> int:
+        self.n_moves += 1
+        move = self.submit(self.player.pick_sync, state.copy())
+        try:
+            return await asyncio.wait_for(asyncio.shield(move), self.deadline)
+        except TimeoutError:
+            self.n_fallbacks += 1
+            return self.fallback.pick_sync(state)
+
+    async def receive(self, state: Spymaster, result: MissionResult) -> None:
+        # Don't wait: the player catches up before its next move
+        self.submit(self.player.receive_sync, state.copy(), result)
@@ -1,59 +1,154 @@
+import asyncio
+import time
 from dataclasses import dataclass
 from typing import Optional
 
-from fastapi.websockets import WebSocket
+from fastapi.websockets import WebSocket, WebSocketDisconnect
 
+from spymaster import protocol
 from spymaster.players import Player
 from spymaster.spymaster import MissionResult, Spymaster
 
 
 class WsComm:
+    """Talks to the client in version 1 of the protocol, sending the
+    whole state with every message.
+    """
+
     def __init__(self, ws: WebSocket):
         self.ws = ws
 
     async def send_situation(self, state: Spymaster, message: Optional[str]):
-        await self.ws.send_json(
-            {
-                "msgType": "situation",
-                "situation": state.to_dict(),  # type: ignore
-                "message": message,
-            }
-        )
+        await self.ws.send_json(protocol.full_situation(state, message))
 
     async def receive_choice(self) -> Optional[int]:
         recv = await self.ws.receive_json()
         return recv.get("card")
 
     async def send_result(self, state: Spymaster, result: MissionResult):
-        await self.ws.send_json(
-            {
-                "msgType": "result",
-                "situation": state.to_dict(),  # type: ignore
-                "result": result.to_dict(),  # type: ignore
-            }
-        )
+        await self.ws.send_json(protocol.full_result(state, result))
+
+
+class DeltaComm(WsComm):
+    """Talks to the client in version 2 of the protocol: a snapshot of
+    the game first, then only the changes.
+    """
+
+    def __init__(self, ws: WebSocket):
+        super().__init__(ws)
+        self.synced = False
+
+    async def send_situation(self, state: Spymaster, message: Optional[str]):
+        if not self.synced:
+            await self.ws.send_json(protocol.snapshot(state))
+            self.synced = True
+        await self.ws.send_json(protocol.pick(state, message))
+
+    async def send_result(self, state: Spymaster, result: MissionResult):
+        if not self.synced:
+            await self.ws.send_json(protocol.snapshot(state, before=result))
+            self.synced = True
+        await self.ws.send_json(protocol.result(result))
+
+
+def comm_for(ws: WebSocket) -> WsComm:
+    """Talk to the client in the protocol version it asked for with ?v="""
+    if ws.query_params.get("v") == str(protocol.PROTOCOL_VERSION):
+        return DeltaComm(ws)
+    return WsComm(ws)
+
+
+# What Starlette's RuntimeErrors say when a websocket is used after it
+# has closed (newer versions raise WebSocketDisconnected, a subclass)
+CLOSED_MESSAGES = (
+    'WebSocket is not connected. Need to call "accept" first.',
+    'Cannot call "send" once a close message has been sent.',
+    'Cannot call "receive" once a disconnect message has been received.',
+)
+
+
+def disconnected(error: Exception) -> bool:
+    """Whether an error raised by a websocket means that its client has
+    gone away, rather than a bug.
+    """
+    if isinstance(error, WebSocketDisconnect):
+        return True
+    return isinstance(error, RuntimeError) and str(error) in CLOSED_MESSAGES
 
 
 @dataclass(kw_only=True)
 class OnlinePlayer(Player):
-    websocket: WebSocket
-    game: Spymaster
+    """A human playing through a websocket. If the websocket drops, the
+    player waits up to reconnect_timeout seconds for a new one (see
+    connect) before giving up on the game.
+    """
+
+    websocket: Optional[WebSocket] = None
+    game: Optional[Spymaster] = None
+    reconnect_timeout: float = 60.0
 
     def __post_init__(self):
-        self.wscomm = WsComm(self.websocket)
+        self.connected = asyncio.Event()
+        self.released = asyncio.Event()
+        self.last_seen = time.monotonic()
+        if self.websocket is not None:
+            self.connect(self.websocket)
+
+    def connect(self, websocket: WebSocket) -> asyncio.Event:
+        """Play through a new websocket, releasing the old one. Returns
+        an event that is set once the player has finished with it.
+        """
+        self.release()
+        self.websocket = websocket
+        self.wscomm = comm_for(websocket)
+        self.released = asyncio.Event()
+        self.connected.set()
+        self.last_seen = time.monotonic()
+        return self.released
+
+    def release(self) -> None:
+        """Stop using the current websocket."""
+        self.connected.clear()
+        self.released.set()
+
+    async def wait_for_connection(self) -> None:
+        await asyncio.wait_for(self.connected.wait(), self.reconnect_timeout)
 
     async def pick(self, state: Spymaster) -> int:
-        await self.wscomm.send_situation(state, "Pick a card")
-        choice = None
+        message = None
         while True:
-            choice = await self.wscomm.receive_choice()
-            print("Choice:", choice)
+            if not self.connected.is_set():
+                await self.wait_for_connection()
+            try:
+                await self.wscomm.send_situation(state, message)
+                choice = await self.wscomm.receive_choice()
+            except (WebSocketDisconnect, RuntimeError) as error:
+                if not disconnected(error):
+                    raise
+                self.release()
+                message = None
+                continue
+            self.last_seen = time.monotonic()
             if choice in state.white_cards:
                 return choice
             else:
-                await self.wscomm.send_situation(state, f"{choice} is not a valid card")
+                message = f"{choice} is not a valid card"
 
     async def receive(self, state, result: MissionResult) -> None:
-        await self.wscomm.send_result(state, result)
+        if state.black is self:
+            # Show the game from our side, as in pick
+            state = state.flipped()
+        if not self.connected.is_set():
+            # The next pick waits for the player to come back
+            return
+        try:
+            await self.wscomm.send_result(state, result)
+            if result.game_over:
+                await self.websocket.close()
+        except (WebSocketDisconnect, RuntimeError) as error:
+            if not disconnected(error):
+                raise
+            self.release()
+            return
         if result.game_over:
-            await self.websocket.close()
+            self.release()
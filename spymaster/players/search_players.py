@@ -0,0 +1,167 @@
+import math
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+from spymaster.players import SyncPlayer
+from spymaster.spymaster import (
+    MissionResult,
+    Spymaster,
+    bits_of,
+    nth_bit,
+    score_round,
+)
+
+from .aim import aim, chuck, mx, prefer
+
+# A rollout policy picks a card given our cards, their cards and the
+# current mission. Policies work on plain lists of cards rather than on
+# a Spymaster, so that rollouts never copy a game.
+Policy = Callable[[List[int], List[int], int, random.Random], int]
+
+# (our hand, their hand, remaining missions, current mission, score
+# difference), with the current mission already drawn
+NodeKey = Tuple[int, int, int, int, int]
+
+
+def random_policy(mine: List[int], theirs: List[int], mission: int, rng) -> int:
+    return rng.choice(mine)
+
+
+def aiming_policy(mine: List[int], theirs: List[int], mission: int, rng) -> int:
+    """Aim a little above the mission, like SimpleAimingPlayer."""
+    return aim(mine, mission + rng.randint(1, 2), rng=rng)
+
+
+def mx_policy(mine: List[int], theirs: List[int], mission: int, rng) -> int:
+    """Win cheaply if we can, like RussiaPlayer; otherwise throw away a
+    low card on a low mission, and aim just above a high one.
+    """
+    if mission < 5:
+        return prefer(mx(mine, theirs, mission, mission + 4), chuck(mine, rng))
+    return prefer(
+        mx(mine, theirs, mission, mission + 3),
+        aim(mine, mission + rng.randint(1, 3), rng=rng),
+    )
+
+
+@dataclass
+class MonteCarloPlayer(SyncPlayer):
+    """Player that estimates the final score difference for each card
+    it could play, by sampling the opponent's response and playing out
+    the rest of the game with cheap rollout policies, and plays the card
+    with the best estimate. Rollouts are spread over the candidate cards
+    with UCB1. By default we assume nothing about the opponent, and
+    sample their responses uniformly at random.
+
+    Each move is limited to n_rollouts rollouts and, optionally, to
+    time_limit seconds. Statistics are also kept for our decisions in
+    the first record_depth rounds of each rollout, so that the next few
+    moves of the game start from the rollouts already played through
+    them.
+    """
+
+    n_rollouts: int = field(default=500)
+    time_limit: Optional[float] = field(default=None)
+    policy: Policy = field(default=mx_policy)
+    opponent_policy: Policy = field(default=random_policy)
+    exploration: float = field(default=20.0)
+    record_depth: int = field(default=2)
+    max_nodes: int = field(default=100_000)
+
+    def __post_init__(self):
+        # For each node, the number of rollouts and the sum of the final
+        # score differences, for each card we played there
+        self.tree: Dict[NodeKey, Dict[int, List[float]]] = {}
+
+    def pick_sync(self, state: Spymaster) -> int:
+        rng = state.rng
+        mission = state.current_mission
+        mine = bits_of(state.white_hand)
+        theirs = bits_of(state.black_hand)
+        diff = state.white_score - state.black_score
+        root = (state.white_hand, state.black_hand, state.missions, mission, diff)
+
+        if len(self.tree) > self.max_nodes:
+            self.tree.clear()
+        stats = self.tree.setdefault(root, {})
+
+        deadline = None
+        if self.time_limit is not None:
+            deadline = time.perf_counter() + self.time_limit
+        for _ in range(self.n_rollouts):
+            if deadline is not None and time.perf_counter() > deadline:
+                break
+            card = self.select(stats, mine)
+            response = self.opponent_policy(theirs, mine, mission, rng)
+            dw, db = score_round(card, response, mission)
+            final, path = self.rollout(
+                state.white_hand & ~(1 << card),
+                state.black_hand & ~(1 << response),
+                state.missions,
+                diff + dw - db,
+                rng,
+            )
+            record(stats, card, final)
+            for key, played in path:
+                record(self.tree.setdefault(key, {}), played, final)
+
+        return max(mine, key=lambda c: mean(stats, c))
+
+    def select(self, stats: Dict[int, List[float]], cards: List[int]) -> int:
+        for card in cards:
+            if card not in stats:
+                return card
+        log_total = math.log(sum(stats[card][0] for card in cards))
+        return max(
+            cards,
+            key=lambda c: (
+                mean(stats, c) + self.exploration * math.sqrt(log_total / stats[c][0])
+            ),
+        )
+
+    def rollout(
+        self, me: int, opp: int, missions: int, diff: int, rng: random.Random
+    ) -> Tuple[int, List[Tuple[NodeKey, int]]]:
+        """Play out the rest of a game on bare masks, returning the final
+        score difference and the decisions to record on the way.
+        """
+        path = []
+        policy = self.policy
+        opponent_policy = self.opponent_policy
+        while missions:
+            bit = nth_bit(missions, rng.randrange(missions.bit_count()))
+            missions &= ~(1 << bit)
+            mission = bit + 1
+            mine = bits_of(me)
+            theirs = bits_of(opp)
+            played = policy(mine, theirs, mission, rng)
+            response = opponent_policy(theirs, mine, mission, rng)
+            if len(path) < self.record_depth:
+                path.append(((me, opp, missions, mission, diff), played))
+            dw, db = score_round(played, response, mission)
+            me &= ~(1 << played)
+            opp &= ~(1 << response)
+            diff += dw - db
+        return diff, path
+
+    def receive_sync(self, state: Spymaster, result: MissionResult) -> None:
+        if result.game_over:
+            self.tree.clear()
+
+
+def record(stats: Dict[int, List[float]], card: int, final: int) -> None:
+    entry = stats.get(card)
+    if entry is None:
+        stats[card] = [1, final]
+    else:
+        entry[0] += 1
+        entry[1] += final
+
+
+def mean(stats: Dict[int, List[float]], card: int) -> float:
+    entry = stats.get(card)
+    if entry is None:
+        return -math.inf
+    return entry[1] / entry[0]
@@ -0,0 +1,109 @@
+"""Messages sent to online players over their websockets, always from
+the receiving player's side of the board ("white" is the player).
+
+Version 2 sends a snapshot of the game when a websocket connects, and
+after that only what changes each round, as JSON arrays:
+
+    ["s", 2, white, black, white_hand, black_hand,
+     white_score, black_score, current_mission, missions]
+        Snapshot. Hands and missions are bit masks, as in Spymaster:
+        bit i of a hand is card i, bit i of missions is mission i + 1.
+    ["p", mission, message]
+        The mission has been drawn: pick a card. The message is null
+        unless the last pick was illegal.
+    ["r", you_played, opp_played, you_scored, opp_scored, game_over]
+        Both players have played.
+
+Spectators get a snapshot, from White's side, and then for each round
+
+    ["o", mission, white_played, black_played, white_scored,
+     black_scored, game_over]
+
+Version 1 sends the whole state, as an object with camelCase keys, in
+every message. It is the default, for clients that don't ask for a
+version.
+"""
+
+from typing import Any, Dict, List, Optional
+
+from spymaster.spymaster import MissionResult, Spymaster
+
+PROTOCOL_VERSION = 2
+
+SNAPSHOT = "s"
+PICK = "p"
+RESULT = "r"
+OBSERVED = "o"
+
+
+def snapshot(state: Spymaster, before: Optional[MissionResult] = None) -> List[Any]:
+    """A snapshot of the game; or if before is given, of the game as it
+    was before that round, so that the result can then be applied.
+    """
+    white_hand = state.white_hand
+    black_hand = state.black_hand
+    white_score = state.white_score
+    black_score = state.black_score
+    if before is not None:
+        white_hand |= 1 << before.you_played
+        black_hand |= 1 << before.opp_played
+        white_score -= before.you_scored
+        black_score -= before.opp_scored
+    return [
+        SNAPSHOT,
+        PROTOCOL_VERSION,
+        state.white.name,
+        state.black.name,
+        white_hand,
+        black_hand,
+        white_score,
+        black_score,
+        state.current_mission,
+        state.missions,
+    ]
+
+
+def pick(state: Spymaster, message: Optional[str] = None) -> List[Any]:
+    return [PICK, state.current_mission, message]
+
+
+def result(result: MissionResult) -> List[Any]:
+    return [
+        RESULT,
+        result.you_played,
+        result.opp_played,
+        result.you_scored,
+        result.opp_scored,
+        int(result.game_over),
+    ]
+
+
+def observed(result: MissionResult) -> List[Any]:
+    """A spectator's view of a round, given its result for White."""
+    return [
+        OBSERVED,
+        result.mission,
+        result.you_played,
+        result.opp_played,
+        result.you_scored,
+        result.opp_scored,
+        int(result.game_over),
+    ]
+
+
+def full_situation(state: Spymaster, message: Optional[str]) -> Dict[str, Any]:
+    """Version 1 message asking the player to pick a card."""
+    return {
+        "msgType": "situation",
+        "situation": state.to_dict(),
+        "message": message or "Pick a card",
+    }
+
+
+def full_result(state: Spymaster, result: MissionResult) -> Dict[str, Any]:
+    """Version 1 message with the result of a round."""
+    return {
+        "msgType": "result",
+        "situation": state.to_dict(),
+        "result": result.to_dict(),
+    }
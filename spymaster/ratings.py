@@ -0,0 +1,121 @@
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, Union
+
+
+@dataclass
+class Rating:
+    rating: float
+    games: int = 0
+
+
+def outcome(white_score: int, black_score: int) -> float:
+    """1 if White won, 0 if Black won, and 0.5 for a draw."""
+    if white_score > black_score:
+        return 1.0
+    elif black_score > white_score:
+        return 0.0
+    return 0.5
+
+
+class EloRatings:
+    """Elo ratings, keyed by Player.player_id and updated one game at a
+    time.
+
+    Players in their first provisional_games games move by the larger
+    provisional_k, so that new players find their level quickly.
+    """
+
+    def __init__(
+        self,
+        initial: float = 1500.0,
+        k: float = 16.0,
+        provisional_k: float = 48.0,
+        provisional_games: int = 10,
+    ):
+        self.initial = initial
+        self.k = k
+        self.provisional_k = provisional_k
+        self.provisional_games = provisional_games
+        self.ratings: Dict[str, Rating] = {}
+
+    def __len__(self) -> int:
+        return len(self.ratings)
+
+    def __contains__(self, player_id: str) -> bool:
+        return player_id in self.ratings
+
+    def get(self, player_id: str) -> Rating:
+        rating = self.ratings.get(player_id)
+        if rating is None:
+            rating = self.ratings[player_id] = Rating(self.initial)
+        return rating
+
+    def rating(self, player_id: str) -> float:
+        return self.get(player_id).rating
+
+    def expected(self, white_id: str, black_id: str) -> float:
+        """White's expected score against Black."""
+        diff = self.rating(black_id) - self.rating(white_id)
+        return 1 / (1 + 10 ** (diff / 400))
+
+    def update(self, white_id: str, black_id: str, white_outcome: float) -> None:
+        """Record a game, in which White scored white_outcome (1 for a
+        win, 0.5 for a draw and 0 for a loss).
+        """
+        white = self.get(white_id)
+        black = self.get(black_id)
+        surprise = white_outcome - self.expected(white_id, black_id)
+        white_k = self.k_factor(white)
+        black_k = self.k_factor(black)
+        white.rating += white_k * surprise
+        black.rating -= black_k * surprise
+        white.games += 1
+        black.games += 1
+
+    def k_factor(self, rating: Rating) -> float:
+        if rating.games < self.provisional_games:
+            return self.provisional_k
+        return self.k
+
+    def inherit(self, child_id: str, parent_id: str) -> None:
+        """Start a new player off at its parent's rating, but as a
+        provisional player.
+        """
+        if child_id not in self.ratings:
+            self.ratings[child_id] = Rating(self.rating(parent_id))
+
+    def forget(self, player_ids: Iterable[str]) -> None:
+        """Forget players, e.g. ones that have left the gene pool."""
+        for player_id in player_ids:
+            self.ratings.pop(player_id, None)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "initial": self.initial,
+            "k": self.k,
+            "provisional_k": self.provisional_k,
+            "provisional_games": self.provisional_games,
+            "ratings": {k: [v.rating, v.games] for k, v in self.ratings.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "EloRatings":
+        ratings = cls(
+            initial=data["initial"],
+            k=data["k"],
+            provisional_k=data["provisional_k"],
+            provisional_games=data["provisional_games"],
+        )
+        ratings.ratings = {
+            k: Rating(rating, games) for k, (rating, games) in data["ratings"].items()
+        }
+        return ratings
+
+    def save(self, path: Union[str, Path]) -> None:
+        Path(path).write_text(json.dumps(self.to_dict()))
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "EloRatings":
+        return cls.from_dict(json.loads(Path(path).read_text()))
@@ -0,0 +1,236 @@
+"""Game records: a compact, append-only log of finished games.
+
+A log is a binary file of fixed-size records, one per game, after a
+16-byte header; and a text file alongside it (the same path plus
+".players") naming the players, one player_id per line, where line i
+is player i. Each record holds the seed the game was played with (or
+NO_SEED), the indices of both players, and each round's mission and
+the cards both players played. From these any state of any game can be
+reconstructed (see replay and replay_batch) without the players.
+
+Records are buffered and written in blocks, so recording uses bounded
+memory however many games are played; and a log can be read back in
+bulk as a NumPy memmap.
+"""
+
+import contextlib
+import struct
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+from spymaster.batch import BatchSpymaster
+from spymaster.spymaster import MissionResult, Spymaster
+
+MAGIC = b"SPYMREC\0"
+VERSION = 1
+HEADER = struct.Struct("<8sII")
+
+RECORD = np.dtype(
+    [
+        ("seed", "<u8"),
+        ("white", "<u4"),
+        ("black", "<u4"),
+        ("missions", "u1", 16),
+        ("white_plays", "u1", 16),
+        ("black_plays", "u1", 16),
+    ]
+)
+
+NO_SEED = np.iinfo(np.uint64).max
+
+PathLike = Union[str, Path]
+
+
+def players_path(path: PathLike) -> Path:
+    path = Path(path)
+    return path.with_name(path.name + ".players")
+
+
+class GameRecorder:
+    """Appends finished games to a log.
+
+    To record a Spymaster game, pass recorder.on_result to its play (or
+    play_sync), having first called watch to note its seed if it has
+    one. To record a BatchSpymaster's games, pass the callback from
+    batch_hook to its play.
+
+    Records are written in blocks of flush_every games, and when the
+    recorder is closed.
+    """
+
+    def __init__(self, path: PathLike, flush_every: int = 4096):
+        self.path = Path(path)
+        self.flush_every = flush_every
+        self.player_indices: Dict[str, int] = {}
+        if players_path(self.path).exists():
+            names = players_path(self.path).read_text().splitlines()
+            self.player_indices = {name: i for i, name in enumerate(names)}
+        new = not self.path.exists() or self.path.stat().st_size == 0
+        if not new:
+            check_header(self.path)
+        with contextlib.ExitStack() as stack:
+            self.players_file = stack.enter_context(open(players_path(self.path), "a"))
+            self.file = stack.enter_context(open(self.path, "ab"))
+            if new:
+                self.file.write(HEADER.pack(MAGIC, VERSION, RECORD.itemsize))
+            # Both files stay open until the recorder is closed
+            stack.pop_all()
+
+        self.buffer: List[np.ndarray] = []
+        self.n_buffered = 0
+        # Games in progress, by id
+        self.seeds: Dict[int, int] = {}
+        self.in_progress: Dict[int, np.ndarray] = {}
+
+    def __enter__(self) -> "GameRecorder":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def player_index(self, player_id: str) -> int:
+        index = self.player_indices.get(player_id)
+        if index is None:
+            if "\n" in player_id:
+                raise ValueError(f"Player id {player_id!r} contains a newline")
+            index = self.player_indices[player_id] = len(self.player_indices)
+            # Names are written straight away, so that a record never
+            # refers to a player missing from the file
+            self.players_file.write(player_id + "\n")
+            self.players_file.flush()
+        return index
+
+    def watch(self, game: Spymaster, seed: Optional[int] = None) -> None:
+        """Note the seed of a game that is about to be recorded."""
+        if seed is not None:
+            self.seeds[id(game)] = seed
+
+    def on_result(self, game: Spymaster, result: MissionResult) -> None:
+        key = id(game)
+        record = self.in_progress.get(key)
+        if record is None:
+            record = self.in_progress[key] = np.zeros(1, dtype=RECORD)
+            record["seed"] = self.seeds.pop(key, NO_SEED)
+            record["white"] = self.player_index(game.white.player_id)
+            record["black"] = self.player_index(game.black.player_id)
+        n_round = 15 - game.white_hand.bit_count()
+        record["missions"][0, n_round] = result.mission
+        record["white_plays"][0, n_round] = result.you_played
+        record["black_plays"][0, n_round] = result.opp_played
+        if result.game_over:
+            del self.in_progress[key]
+            self.write(record)
+
+    def batch_hook(
+        self,
+        white_ids: Sequence[str],
+        black_ids: Sequence[str],
+        seeds: Optional[Sequence[int]] = None,
+    ):
+        """A callback for BatchSpymaster.play that records its games, given
+        the ids of the players in each game.
+        """
+        records = np.zeros(len(white_ids), dtype=RECORD)
+        records["seed"] = NO_SEED if seeds is None else seeds
+        records["white"] = [self.player_index(i) for i in white_ids]
+        records["black"] = [self.player_index(i) for i in black_ids]
+        rounds = iter(range(16))
+
+        def on_round(
+            batch: BatchSpymaster, white_play: np.ndarray, black_play: np.ndarray
+        ) -> None:
+            n_round = next(rounds)
+            records["missions"][:, n_round] = batch.current_mission
+            records["white_plays"][:, n_round] = white_play
+            records["black_plays"][:, n_round] = black_play
+            if n_round == 15:
+                self.write(records)
+
+        return on_round
+
+    def write(self, records: np.ndarray) -> None:
+        self.buffer.append(records)
+        self.n_buffered += len(records)
+        if self.n_buffered >= self.flush_every:
+            self.flush()
+
+    def flush(self) -> None:
+        for records in self.buffer:
+            self.file.write(records.tobytes())
+        self.buffer = []
+        self.n_buffered = 0
+        self.file.flush()
+
+    def close(self) -> None:
+        """Write out the buffered records. Games still in progress are not
+        recorded.
+        """
+        self.flush()
+        self.file.close()
+        self.players_file.close()
+
+
+def check_header(path: PathLike) -> None:
+    with open(path, "rb") as f:
+        header = f.read(HEADER.size)
+    if len(header) < HEADER.size:
+        raise ValueError(f"{path} is not a version {VERSION} game log")
+    magic, version, record_size = HEADER.unpack(header)
+    if magic != MAGIC or version != VERSION or record_size != RECORD.itemsize:
+        raise ValueError(f"{path} is not a version {VERSION} game log")
+
+
+class GameLog:
+    """The games in a log, read back as a memmap of records."""
+
+    def __init__(self, path: PathLike):
+        self.path = Path(path)
+        check_header(self.path)
+        n_games = (self.path.stat().st_size - HEADER.size) // RECORD.itemsize
+        if n_games:
+            self.records = np.memmap(
+                self.path, dtype=RECORD, mode="r", offset=HEADER.size, shape=n_games
+            )
+        else:
+            self.records = np.zeros(0, dtype=RECORD)
+        self.players = players_path(self.path).read_text().splitlines()
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __getitem__(self, index):
+        return self.records[index]
+
+    def names(self, index: int) -> List[str]:
+        """The names of White and Black in a game."""
+        record = self.records[index]
+        return [self.players[record["white"]], self.players[record["black"]]]
+
+
+def replay(record: np.void, n_rounds: int = 16) -> Spymaster:
+    """The state of a recorded game after its first n_rounds rounds.
+    The players are left as None.
+    """
+    game = Spymaster(white=None, black=None)  # type: ignore[arg-type]
+    for i in range(n_rounds):
+        mission = int(record["missions"][i])
+        game.missions &= ~(1 << (mission - 1))
+        game.current_mission = mission
+        game.resolve(record["white_plays"][i], record["black_plays"][i])
+    return game
+
+
+def replay_batch(records: np.ndarray, n_rounds: int = 16) -> BatchSpymaster:
+    """The states of many recorded games after their first n_rounds
+    rounds, as a BatchSpymaster. The players are left as None.
+    """
+    batch = BatchSpymaster(len(records), white=None, black=None)  # type: ignore[arg-type]
+    rows = np.arange(len(records))
+    for i in range(n_rounds):
+        missions = records["missions"][:, i].astype(np.int64)
+        batch.remaining_missions[rows, missions - 1] = False
+        batch.current_mission[:] = missions
+        batch.resolve(records["white_plays"][:, i], records["black_plays"][:, i])
+    return batch
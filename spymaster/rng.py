@@ -0,0 +1,68 @@
+import random
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+# The generator that games and players use when they aren't given one.
+# It is seeded from the OS, and random.seed() doesn't affect it; call
+# GLOBAL_RNG.seed() to make unseeded runs repeatable.
+GLOBAL_RNG = random.Random()
+
+
+def numpy_rng(rng: Optional[np.random.Generator] = None):
+    """rng, or if it is None numpy's global generator, so that unseeded
+    runs still respect np.random.seed().
+    """
+    return np.random if rng is None else rng
+
+
+def game_seeds(seed_sequence: np.random.SeedSequence, n_games: int) -> List[int]:
+    """Derive independent seeds for n_games games from a SeedSequence.
+
+    Seed k depends only on the sequence and on k, so the same game gets
+    the same seed however the games are later split between batches or
+    worker processes.
+    """
+    return seed_sequence.generate_state(n_games, dtype=np.uint64).tolist()
+
+
+def next_game_seeds(
+    seed_sequence: Optional[np.random.SeedSequence], n_games: int
+) -> Optional[List[int]]:
+    """Seeds for a fresh batch of n_games games, drawn from a new child
+    of seed_sequence; or None if seed_sequence is None (unseeded).
+    """
+    if seed_sequence is None:
+        return None
+    return game_seeds(seed_sequence.spawn(1)[0], n_games)
+
+
+def game_rngs(seeds: Optional[Sequence[int]]) -> Optional[List[random.Random]]:
+    """One generator per game, or None for unseeded games."""
+    if seeds is None:
+        return None
+    return [random.Random(seed) for seed in seeds]
+
+
+def spawned(seed_sequence: Optional[np.random.SeedSequence]) -> Optional[int]:
+    """How many children a SeedSequence has spawned, e.g. to checkpoint
+    it; or None if seed_sequence is None.
+    """
+    return None if seed_sequence is None else seed_sequence.n_children_spawned
+
+
+def respawn(
+    seed_sequence: Optional[np.random.SeedSequence], n_children_spawned: Optional[int]
+) -> Optional[np.random.SeedSequence]:
+    """The same SeedSequence, as it was after spawning n_children_spawned
+    children, so that its next child is the one it would have spawned
+    then.
+    """
+    if seed_sequence is None or n_children_spawned is None:
+        return seed_sequence
+    return np.random.SeedSequence(
+        seed_sequence.entropy,
+        spawn_key=seed_sequence.spawn_key,
+        pool_size=seed_sequence.pool_size,
+        n_children_spawned=n_children_spawned,
+    )
@@ -0,0 +1,143 @@
+import asyncio
+import secrets
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Iterator, Optional
+
+from spymaster.broadcast import Channel
+from spymaster.players.online_player import OnlinePlayer
+from spymaster.spymaster import MissionResult, Spymaster
+
+# Game codes avoid letters and digits that are easy to confuse
+CODE_ALPHABET = "ABCDEFGHJKLMNPQRSTUVWXYZ23456789"
+CODE_LENGTH = 6
+
+
+@dataclass
+class Session:
+    """A game being played on the server, and an online player who can
+    reconnect to it with the session's code. In a game between two
+    online players, each has their own session, and they share the
+    game's task and channel.
+
+    Each round's result, from White's point of view, is published on
+    the channel for spectators.
+    """
+
+    code: str
+    game: Spymaster
+    player: OnlinePlayer
+    channel: Channel[MissionResult] = field(default_factory=Channel, repr=False)
+    task: Optional["asyncio.Task[None]"] = field(default=None, repr=False)
+
+    def start(self, task: Optional["asyncio.Task[None]"] = None) -> None:
+        """Start playing the game in the background, if it isn't already.
+        The sessions of two online players in the same game share the
+        task that plays it.
+        """
+        if self.task is None:
+            self.task = task or asyncio.create_task(
+                self.game.play(on_result=self.publish)
+            )
+            self.task.add_done_callback(self.finish)
+
+    def publish(self, game: Spymaster, result: MissionResult) -> None:
+        self.channel.publish(result)
+
+    def finish(self, task: "asyncio.Task[None]") -> None:
+        if not task.cancelled() and task.exception() is not None:
+            print(f"game {self.code} ended: {task.exception()!r}")
+        self.channel.close()
+        self.player.release()
+
+    @property
+    def finished(self) -> bool:
+        return self.task is not None and self.task.done()
+
+    def close(self) -> None:
+        """Abandon the game, releasing its websocket."""
+        if self.task is not None:
+            self.task.cancel()
+        self.player.release()
+
+
+class GameRegistry:
+    """The sessions on the server, by code, in least recently used order.
+
+    Finished games and games whose player has been idle for longer than
+    idle_timeout seconds are evicted whenever a session is added. If
+    the registry is still full, the least recently used sessions are
+    closed to make room, so there are never more than max_games.
+
+    The two sessions of a game between online players are evicted one
+    at a time, but the game they share is only abandoned once neither
+    is left in the registry.
+    """
+
+    def __init__(self, max_games: int = 1000, idle_timeout: float = 600.0):
+        self.max_games = max_games
+        self.idle_timeout = idle_timeout
+        self.sessions: OrderedDict[str, Session] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.sessions)
+
+    def __iter__(self) -> Iterator[Session]:
+        return iter(list(self.sessions.values()))
+
+    def new_code(self) -> str:
+        """A code that no session in the registry has."""
+        while True:
+            code = "".join(secrets.choice(CODE_ALPHABET) for _ in range(CODE_LENGTH))
+            if code not in self.sessions:
+                return code
+
+    def get(self, code: str) -> Optional[Session]:
+        """The session with the given code, marked as recently used; or
+        None if there is no such session or it has finished.
+        """
+        session = self.sessions.get(code.upper())
+        if session is None or session.finished:
+            return None
+        self.sessions.move_to_end(session.code)
+        return session
+
+    def add(self, session: Session) -> None:
+        self.evict()
+        while len(self.sessions) >= self.max_games:
+            _, oldest = self.sessions.popitem(last=False)
+            self.close(oldest)
+        self.sessions[session.code] = session
+
+    def remove(self, code: str) -> None:
+        session = self.sessions.pop(code, None)
+        if session is not None:
+            self.close(session)
+
+    def close(self, session: Session) -> None:
+        """Close a session that has been removed, abandoning its game
+        unless another session still in the registry shares it.
+        """
+        shared = session.task is not None and any(
+            other.task is session.task for other in self.sessions.values()
+        )
+        if shared:
+            session.player.release()
+        else:
+            session.close()
+
+    def expired(self, session: Session) -> bool:
+        return (
+            session.finished
+            or time.monotonic() - session.player.last_seen > self.idle_timeout
+        )
+
+    def evict(self) -> int:
+        """Close and remove finished and idle sessions. Returns how many
+        were removed.
+        """
+        expired = [code for code, s in self.sessions.items() if self.expired(s)]
+        for code in expired:
+            self.remove(code)
+        return len(expired)
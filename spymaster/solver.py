@@ -0,0 +1,422 @@
+"""Exact equilibrium play for Spymaster endgames.
+
+Once both hands are small, the rest of the game can be solved exactly
+by backward induction. Each round is a zero-sum matrix game between the
+two players, whose payoffs are the values of the positions that follow,
+and we solve it for minimax mixed strategies with a small linear
+program. The value of a position is the probability of winning minus
+the probability of losing, so the score difference is part of the
+state.
+
+The solver works a level (number of cards left in each hand) at a time.
+A forward pass finds every position that can be reached from the
+positions we were asked about; a backward pass then solves all the
+matrix games on a level at once, with a batched simplex. Positions that
+are mirror images of each other (swap the players and negate the score
+difference) are solved once, and positions whose outcome is already
+decided are not searched at all.
+
+Positions are packed into uint64 keys: White's hand, Black's hand and
+the remaining missions as 16-bit masks, followed by the score
+difference offset by DIFF_OFFSET.
+"""
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from spymaster.players import Player, SyncPlayer
+from spymaster.players.computer_players import russia
+from spymaster.spymaster import Spymaster, bits_of, max_gain
+
+DIFF_OFFSET = 1 << 15
+EPS = 1e-12
+
+_MASKS = np.arange(1 << 16, dtype=np.uint64)
+_BITS = ((_MASKS[:, None] >> np.arange(16, dtype=np.uint64)) & 1).astype(bool)
+del _MASKS
+
+
+def pack(
+    white_hand: np.ndarray,
+    black_hand: np.ndarray,
+    missions: np.ndarray,
+    diff: np.ndarray,
+) -> np.ndarray:
+    return (
+        (white_hand.astype(np.uint64) << np.uint64(48))
+        | (black_hand.astype(np.uint64) << np.uint64(32))
+        | (missions.astype(np.uint64) << np.uint64(16))
+        | (diff + DIFF_OFFSET).astype(np.uint64)
+    )
+
+
+def unpack(keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    mask = np.uint64(0xFFFF)
+    return (
+        ((keys >> np.uint64(48)) & mask).astype(np.int64),
+        ((keys >> np.uint64(32)) & mask).astype(np.int64),
+        ((keys >> np.uint64(16)) & mask).astype(np.int64),
+        (keys & mask).astype(np.int64) - DIFF_OFFSET,
+    )
+
+
+def decided(
+    white_hand: np.ndarray,
+    black_hand: np.ndarray,
+    missions: np.ndarray,
+    diff: np.ndarray,
+) -> np.ndarray:
+    """The outcome of each position if it is already decided: +1 if
+    White is certain to win, -1 if Black is, 0 for a finished draw, and
+    NaN if the position is still undecided.
+    """
+    out = np.full(diff.shape, np.nan)
+    out[diff > max_gain(black_hand, white_hand, missions)] = 1
+    out[-diff > max_gain(white_hand, black_hand, missions)] = -1
+    out[(white_hand == 0) & (diff == 0)] = 0
+    return out
+
+
+def canonical(keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Of each position and its mirror image, the one with the smaller
+    key, and whether that was the mirror image.
+    """
+    white_hand, black_hand, missions, diff = unpack(keys)
+    mirrored = pack(black_hand, white_hand, missions, -diff)
+    flipped = mirrored < keys
+    return np.where(flipped, mirrored, keys), flipped
+
+
+def set_bits(masks: np.ndarray, count: int) -> np.ndarray:
+    """The indices of the set bits of each mask, which must all have
+    exactly count bits set, as an (N, count) array in ascending order.
+    """
+    return np.nonzero(_BITS[masks])[1].reshape(len(masks), count)
+
+
+def expand(keys: np.ndarray, level: int) -> np.ndarray:
+    """The positions following each of the given positions, with level
+    cards in each hand, as an (N, missions, white cards, black cards)
+    array of keys. Everything is in ascending order.
+    """
+    white_hand, black_hand, missions, diff = unpack(keys)
+    m = set_bits(missions, level)[:, :, None, None]
+    w = set_bits(white_hand, level)[:, None, :, None]
+    b = set_bits(black_hand, level)[:, None, None, :]
+    mission = m + 1
+
+    same = w == b
+    dw = np.select([same, w == 0, b == 0, w > b], [0, b, 0, mission], 0)
+    db = np.select([same, b == 0, w == 0, b > w], [0, w, 0, mission], 0)
+
+    return pack(
+        white_hand[:, None, None, None] & ~(1 << w),
+        black_hand[:, None, None, None] & ~(1 << b),
+        missions[:, None, None, None] & ~(1 << m),
+        diff[:, None, None, None] + dw - db,
+    )
+
+
+def solve_matrix_games(
+    payoffs: np.ndarray, max_iter: int = 1000
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Solve a batch of two-player zero-sum matrix games, in which the
+    row player maximises and the column player minimises the payoff.
+
+    @param payoffs: (G, m, n) payoff matrices for the row player
+    @return: the (G,) values of the games, and (G, m) and (G, n)
+        optimal mixed strategies for the row and the column player
+    """
+    n_games, m, n = payoffs.shape
+    rows = np.arange(n_games)
+
+    # Pure saddle points, which are common, need no LP
+    row_mins = payoffs.min(axis=2)
+    col_maxes = payoffs.max(axis=1)
+    values = row_mins.max(axis=1)
+    p = np.zeros((n_games, m))
+    p[rows, row_mins.argmax(axis=1)] = 1
+    q = np.zeros((n_games, n))
+    q[rows, col_maxes.argmin(axis=1)] = 1
+
+    mixed = np.flatnonzero(values < col_maxes.min(axis=1) - EPS)
+    if not len(mixed):
+        return values, p, q
+
+    # Shift the payoffs to be positive and solve the column player's LP,
+    # max 1.y subject to A y <= 1 and y >= 0, by simplex with Bland's
+    # rule. The row player's strategy comes from the duals.
+    shift = 1 - payoffs[mixed].min(axis=(1, 2))
+    tableau = np.zeros((len(mixed), m + 1, n + m + 1))
+    tableau[:, :m, :n] = payoffs[mixed] + shift[:, None, None]
+    tableau[:, :m, n : n + m] = np.eye(m)
+    tableau[:, :m, -1] = 1
+    tableau[:, m, :n] = -1
+    basis = np.tile(np.arange(n, n + m), (len(mixed), 1))
+
+    for _ in range(max_iter):
+        improving = tableau[:, m, :-1] < -EPS
+        active = np.flatnonzero(improving.any(axis=1))
+        if not len(active):
+            break
+        k = np.arange(len(active))
+        t = tableau[active]
+        # Enter the lowest-index improving column...
+        col = improving[active].argmax(axis=1)
+        column = t[k, :m, col]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratios = np.where(column > EPS, t[:, :m, -1] / column, np.inf)
+        # ...and leave the row with the smallest ratio, breaking ties by
+        # the lowest-index basic variable
+        ties = ratios <= ratios.min(axis=1, keepdims=True) + EPS
+        row = np.where(ties, basis[active], n + m).argmin(axis=1)
+
+        pivot_row = t[k, row] / t[k, row, col][:, None]
+        t -= t[k, :, col][:, :, None] * pivot_row[:, None, :]
+        t[k, row] = pivot_row
+        tableau[active] = t
+        basis[active, row] = col
+    else:
+        raise RuntimeError("Simplex did not converge")
+
+    total = tableau[:, m, -1]
+    y = np.zeros((len(mixed), n + m))
+    np.put_along_axis(y, basis, tableau[:, :m, -1], axis=1)
+    values[mixed] = 1 / total - shift
+    p_mixed = tableau[:, m, n : n + m]
+    p[mixed] = p_mixed / p_mixed.sum(axis=1, keepdims=True)
+    q[mixed] = y[:, :n] / y[:, :n].sum(axis=1, keepdims=True)
+    return values, p, q
+
+
+def solve_matrix_game(payoff: np.ndarray) -> Tuple[float, np.ndarray, np.ndarray]:
+    """solve_matrix_games for a single (m, n) game."""
+    values, p, q = solve_matrix_games(np.asarray(payoff, dtype=float)[None])
+    return float(values[0]), p[0], q[0]
+
+
+@dataclass
+class Level:
+    """The solved positions with a given number of cards in each hand.
+
+    keys is sorted. For position i and its j-th remaining mission (in
+    ascending order), white[i, j] is White's equilibrium strategy over
+    her cards and black[i, j] is Black's over his, both in ascending
+    order of card.
+    """
+
+    keys: np.ndarray
+    values: np.ndarray
+    white: np.ndarray
+    black: np.ndarray
+
+    def find(self, keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Indices of the keys in this level, and whether they were found."""
+        idx = np.searchsorted(self.keys, keys)
+        idx = np.minimum(idx, len(self.keys) - 1)
+        return idx, self.keys[idx] == keys
+
+    def merge(self, other: "Level") -> "Level":
+        keys, idx = np.unique(
+            np.concatenate([self.keys, other.keys]), return_index=True
+        )
+        return Level(
+            keys=keys,
+            values=np.concatenate([self.values, other.values])[idx],
+            white=np.concatenate([self.white, other.white])[idx],
+            black=np.concatenate([self.black, other.black])[idx],
+        )
+
+
+class EndgameSolver:
+    """Solves Spymaster endgames and remembers the results, a Level per
+    number of cards in each hand.
+    """
+
+    def __init__(self, chunk_size: int = 20000):
+        self.levels: Dict[int, Level] = {}
+        self.chunk_size = chunk_size
+
+    def lookup(self, keys: np.ndarray, level: int) -> np.ndarray:
+        """Values for White of positions with level cards in each hand,
+        which must be decided or already solved.
+        """
+        out = decided(*unpack(keys))
+        undecided = np.isnan(out)
+        if undecided.any():
+            canon, flipped = canonical(keys[undecided])
+            idx, found = self.levels[level].find(canon)
+            if not found.all():
+                raise KeyError("Position has not been solved")
+            values = self.levels[level].values[idx]
+            out[undecided] = np.where(flipped, -values, values)
+        return out
+
+    def solve(self, keys: np.ndarray) -> np.ndarray:
+        """Solve the given positions (all with the same number of cards,
+        before the next mission is drawn) and everything reachable from
+        them. Returns their values for White.
+        """
+        keys = np.asarray(keys, dtype=np.uint64)
+        white_hand, black_hand, missions, _ = unpack(keys)
+        top = int(white_hand[0]).bit_count()
+        if not all(
+            int(h).bit_count() == top for h in np.concatenate([white_hand, black_hand])
+        ) or not all(int(ms).bit_count() == top for ms in missions):
+            raise ValueError("Hands and missions must all be the same size")
+
+        # Forward pass: find the undecided positions on each level that
+        # we haven't already solved
+        frontier: Dict[int, np.ndarray] = {}
+        current = self._unsolved(keys, top)
+        for level in range(top, 0, -1):
+            frontier[level] = current
+            children = [
+                self._unsolved(expand(chunk, level).ravel(), level - 1)
+                for chunk in self._chunks(current)
+            ]
+            current = np.unique(np.concatenate(children)) if children else current[:0]
+
+        # Backward pass: solve each level using the one below it
+        for level in range(1, top + 1):
+            if not len(frontier[level]):
+                continue
+            solved = [
+                self._solve_level(chunk, level)
+                for chunk in self._chunks(frontier[level])
+            ]
+            new = Level(
+                keys=np.concatenate([s.keys for s in solved]),
+                values=np.concatenate([s.values for s in solved]),
+                white=np.concatenate([s.white for s in solved]),
+                black=np.concatenate([s.black for s in solved]),
+            )
+            self.levels[level] = (
+                self.levels[level].merge(new) if level in self.levels else new
+            )
+
+        return self.lookup(keys, top)
+
+    def _chunks(self, keys: np.ndarray) -> List[np.ndarray]:
+        return [
+            keys[i : i + self.chunk_size] for i in range(0, len(keys), self.chunk_size)
+        ]
+
+    def _unsolved(self, keys: np.ndarray, level: int) -> np.ndarray:
+        """The canonical forms of the undecided positions that aren't in
+        the table yet, sorted and without duplicates.
+        """
+        keys = keys[np.isnan(decided(*unpack(keys)))]
+        keys = np.unique(canonical(keys)[0])
+        if level in self.levels and len(keys):
+            _, found = self.levels[level].find(keys)
+            keys = keys[~found]
+        return keys
+
+    def _solve_level(self, keys: np.ndarray, level: int) -> Level:
+        children = expand(keys, level)
+        if level == 1:
+            payoffs = decided(*unpack(children))
+        else:
+            payoffs = self.lookup(children.ravel(), level - 1).reshape(children.shape)
+        n = len(keys)
+        values, white, black = solve_matrix_games(
+            payoffs.reshape(n * level, level, level)
+        )
+        return Level(
+            keys=keys,
+            values=values.reshape(n, level).mean(axis=1),
+            white=white.reshape(n, level, level).astype(np.float32),
+            black=black.reshape(n, level, level).astype(np.float32),
+        )
+
+    def strategy(self, state: Spymaster) -> Optional[np.ndarray]:
+        """White's equilibrium strategy over her cards (in ascending
+        order) in the current round of a game, or None if the round
+        hasn't been solved or its outcome is already decided.
+        """
+        level = state.white_hand.bit_count()
+        if level not in self.levels:
+            return None
+        key = position_key(state)
+        if not np.isnan(decided(*unpack(key))[0]):
+            return None
+        canon, flipped = canonical(key)
+        idx, found = self.levels[level].find(canon)
+        if not found[0]:
+            return None
+        mission_index = bits_of(
+            state.missions | 1 << (state.current_mission - 1)
+        ).index(state.current_mission - 1)
+        table = self.levels[level].black if flipped[0] else self.levels[level].white
+        return table[idx[0], mission_index]
+
+    def save(self, path: Union[str, Path]) -> None:
+        arrays = {}
+        for level, table in self.levels.items():
+            arrays[f"keys_{level}"] = table.keys
+            arrays[f"values_{level}"] = table.values
+            arrays[f"white_{level}"] = table.white
+            arrays[f"black_{level}"] = table.black
+        np.savez_compressed(path, **arrays)
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "EndgameSolver":
+        solver = cls()
+        with np.load(path) as arrays:
+            for name in arrays.files:
+                if name.startswith("keys_"):
+                    level = int(name[len("keys_") :])
+                    solver.levels[level] = Level(
+                        keys=arrays[f"keys_{level}"],
+                        values=arrays[f"values_{level}"],
+                        white=arrays[f"white_{level}"],
+                        black=arrays[f"black_{level}"],
+                    )
+        return solver
+
+
+def position_key(state: Spymaster) -> np.ndarray:
+    """The key of the position at the start of the current round, i.e.
+    with the current mission put back.
+    """
+    return pack(
+        np.array([state.white_hand]),
+        np.array([state.black_hand]),
+        np.array([state.missions | 1 << (state.current_mission - 1)]),
+        np.array([state.white_score - state.black_score]),
+    )
+
+
+@dataclass
+class EquilibriumPlayer(SyncPlayer):
+    """Plays the exact equilibrium strategy once there are at most
+    max_cards cards left in each hand, and defers to the fallback player
+    before that (and once the game is decided). Each endgame is solved
+    when first reached and then looked up in the solver's tables, which
+    can also be loaded from disk.
+    """
+
+    solver: EndgameSolver = field(default_factory=EndgameSolver)
+    fallback: Player = field(default_factory=lambda: russia)
+    max_cards: int = field(default=5)
+
+    def pick_sync(self, state: Spymaster) -> int:
+        level = state.white_hand.bit_count()
+        if level > self.max_cards:
+            return self.fallback.pick_sync(state)  # type: ignore
+
+        strategy = self.solver.strategy(state)
+        if strategy is None:
+            key = position_key(state)
+            if np.isnan(decided(*unpack(key))[0]):
+                self.solver.solve(key)
+                strategy = self.solver.strategy(state)
+        if strategy is None:
+            return self.fallback.pick_sync(state)  # type: ignore
+
+        cards = bits_of(state.white_hand)
+        return state.rng.choices(cards, weights=strategy.tolist())[0]
@@ -1,15 +1,28 @@
+import asyncio
+import random
 import typing
 from dataclasses import dataclass, field
-from random import shuffle
-from typing import List
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
 
-from dataclasses_json import LetterCase, config, dataclass_json
+import numpy as np
+
+from spymaster import metrics
+from spymaster.rng import GLOBAL_RNG
 
 if typing.TYPE_CHECKING:
     from spymaster.players import Player
 
 
-@dataclass_json(letter_case=LetterCase.CAMEL)
 @dataclass(kw_only=True)
 class MissionResult:
     you_played: int
@@ -38,67 +51,452 @@ class MissionResult:
             mission=self.mission,
             you_scored=self.opp_scored,
             opp_scored=self.you_scored,
+            game_over=self.game_over,
         )
 
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "youPlayed": self.you_played,
+            "oppPlayed": self.opp_played,
+            "mission": self.mission,
+            "youScored": self.you_scored,
+            "oppScored": self.opp_scored,
+            "gameOver": self.game_over,
+        }
+
+
+ALL_CARDS = 0xFFFF
+ALL_MISSIONS = 0xFFFF
+
+
+def mask_of(values: Iterable[int], offset: int = 0) -> int:
+    """Pack a collection of small integers into a bitmask. Bit ``i`` is
+    set iff ``i + offset`` is in ``values``.
+    """
+    mask = 0
+    for v in values:
+        mask |= 1 << (v - offset)
+    return mask
+
+
+def bits_of(mask: int, offset: int = 0) -> List[int]:
+    """Unpack a bitmask into a sorted list of integers; the inverse of
+    mask_of.
+    """
+    out = []
+    while mask:
+        low = mask & -mask
+        out.append(low.bit_length() - 1 + offset)
+        mask ^= low
+    return out
+
+
+def nth_bit(mask: int, n: int) -> int:
+    """Return the index of the n-th lowest set bit of mask (0-indexed)."""
+    for _ in range(n):
+        mask &= mask - 1
+    return (mask & -mask).bit_length() - 1
+
+
+def score_round(white_play: int, black_play: int, mission: int) -> Tuple[int, int]:
+    """The points scored by White and by Black when they play these
+    cards for this mission.
+    """
+    dw = 0
+    db = 0
+    if white_play == black_play:
+        pass
+    elif white_play == 0:
+        dw = black_play
+    elif black_play == 0:
+        db = white_play
+    elif white_play > black_play:
+        dw = mission
+    elif white_play < black_play:
+        db = mission
+    else:
+        raise RuntimeError
+    return dw, db
+
+
+_MASKS = np.arange(1 << 16)
+_BITS = ((_MASKS[:, None] >> np.arange(16)) & 1).astype(bool)
+# Sum of the missions in each mission mask, and the highest card in each
+# hand (or -1 if it is empty)
+MISSIONS_TOTAL = _BITS @ np.arange(1, 17)
+HIGHEST_CARD = np.where(_BITS.any(axis=1), 15 - _BITS[:, ::-1].argmax(axis=1), -1)
+del _MASKS, _BITS
+
+
+def max_gain(hand, opp_hand, missions):
+    """An upper bound on the points that the holder of hand can still
+    score: every remaining mission, plus the best agent that the
+    assassin could kill. Takes masks, or arrays of masks.
+    """
+    assassin = ((hand & 1) == 1) & (opp_hand != 0)
+    return MISSIONS_TOTAL[missions] + assassin * HIGHEST_CARD[opp_hand]
+
+
+class MaskView:
+    """A sorted, list-like view onto a bitmask held by a Spymaster.
+
+    Reads and writes go straight through to the underlying mask, so
+    ``game.white_cards.remove(3)`` behaves like it did when the hands
+    were lists, but no list is ever stored on the game. Missions are
+    numbered from 1, so their view uses an offset of 1.
+    """
+
+    __slots__ = ("_attr", "_game", "_offset")
+
+    def __init__(self, game: "Spymaster", attr: str, offset: int = 0):
+        self._game = game
+        self._attr = attr
+        self._offset = offset
 
-def card_factory() -> List[int]:
-    return list(range(16))
+    @property
+    def mask(self) -> int:
+        return getattr(self._game, self._attr)
 
+    def __contains__(self, item) -> bool:
+        if not isinstance(item, (int, np.integer)):
+            return False
+        i = int(item) - self._offset
+        return 0 <= i < 16 and bool(self.mask >> i & 1)
 
-def mission_factory() -> List[int]:
-    return list(range(1, 17))
+    def __iter__(self) -> Iterator[int]:
+        return iter(bits_of(self.mask, self._offset))
+
+    def __reversed__(self) -> Iterator[int]:
+        return reversed(bits_of(self.mask, self._offset))
+
+    def __len__(self) -> int:
+        return self.mask.bit_count()
+
+    def __bool__(self) -> bool:
+        return self.mask != 0
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return bits_of(self.mask, self._offset)[index]
+        n = len(self)
+        if index < 0:
+            index += n
+        if not 0 <= index < n:
+            raise IndexError("index out of range")
+        return nth_bit(self.mask, index) + self._offset
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, MaskView):
+            return self.mask == other.mask and self._offset == other._offset
+        if isinstance(other, (list, tuple)):
+            return bits_of(self.mask, self._offset) == list(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return repr(bits_of(self.mask, self._offset))
+
+    def remove(self, value: int) -> None:
+        if value not in self:
+            raise ValueError(f"{value} not in view")
+        bit = 1 << (int(value) - self._offset)
+        setattr(self._game, self._attr, self.mask & ~bit)
+
+    def add(self, value: int) -> None:
+        bit = 1 << (int(value) - self._offset)
+        setattr(self._game, self._attr, self.mask | bit)
+
+    append = add
+
+    def pop(self, index: int = -1) -> int:
+        value = self[index]
+        self.remove(value)
+        return value
+
+    def sort(self) -> None:
+        """Views are always sorted; provided for list compatibility."""
+
+    def copy(self) -> List[int]:
+        return bits_of(self.mask, self._offset)
+
+
+OnResult = Callable[["Spymaster", MissionResult], None]
 
 
 def playerencoder(player: "Player") -> str:
     return player.name
 
 
-@dataclass_json(letter_case=LetterCase.CAMEL)
-@dataclass(kw_only=True)
 class Spymaster:
-    white: "Player" = field(metadata=config(encoder=playerencoder))
-    black: "Player" = field(metadata=config(encoder=playerencoder))
-    white_cards: List[int] = field(default_factory=card_factory)
-    black_cards: List[int] = field(default_factory=card_factory)
-    white_score: int = field(default=0)
-    black_score: int = field(default=0)
-    current_mission: int = field(default=None)  # type: ignore
-    remaining_missions: List[int] = field(default_factory=mission_factory)
+    """State of a game of Spymaster.
+
+    The hands and the remaining missions are stored as 16-bit masks
+    (bit i of a hand is card i; bit i of the missions is mission i + 1)
+    and exposed as list-like views, so copying a game or taking a
+    hashable key of its state costs a handful of integer copies.
+
+    All of the randomness in a game, including that used by computer
+    players, is drawn from its rng; give each game its own seeded
+    random.Random to make it reproducible.
+    """
+
+    __slots__ = (
+        "black",
+        "black_hand",
+        "black_score",
+        "current_mission",
+        "missions",
+        "rng",
+        "white",
+        "white_hand",
+        "white_score",
+    )
+
+    def __init__(
+        self,
+        *,
+        white: "Player",
+        black: "Player",
+        white_cards: Optional[Iterable[int]] = None,
+        black_cards: Optional[Iterable[int]] = None,
+        white_score: int = 0,
+        black_score: int = 0,
+        current_mission: Optional[int] = None,
+        remaining_missions: Optional[Iterable[int]] = None,
+        rng: Optional[random.Random] = None,
+    ):
+        self.white = white
+        self.black = black
+        self.white_hand = ALL_CARDS if white_cards is None else _as_mask(white_cards)
+        self.black_hand = ALL_CARDS if black_cards is None else _as_mask(black_cards)
+        self.white_score = white_score
+        self.black_score = black_score
+        self.current_mission = current_mission
+        self.missions = (
+            ALL_MISSIONS
+            if remaining_missions is None
+            else _as_mask(remaining_missions, offset=1)
+        )
+        self.rng = GLOBAL_RNG if rng is None else rng
+
+    @classmethod
+    def from_masks(
+        cls,
+        *,
+        white: "Player",
+        black: "Player",
+        white_hand: int = ALL_CARDS,
+        black_hand: int = ALL_CARDS,
+        white_score: int = 0,
+        black_score: int = 0,
+        current_mission: Optional[int] = None,
+        missions: int = ALL_MISSIONS,
+        rng: Optional[random.Random] = None,
+    ) -> "Spymaster":
+        game = cls.__new__(cls)
+        game.white = white
+        game.black = black
+        game.white_hand = white_hand
+        game.black_hand = black_hand
+        game.white_score = white_score
+        game.black_score = black_score
+        game.current_mission = current_mission
+        game.missions = missions
+        game.rng = GLOBAL_RNG if rng is None else rng
+        return game
+
+    @property
+    def white_cards(self) -> MaskView:
+        return MaskView(self, "white_hand")
+
+    @white_cards.setter
+    def white_cards(self, cards: Iterable[int]):
+        self.white_hand = _as_mask(cards)
+
+    @property
+    def black_cards(self) -> MaskView:
+        return MaskView(self, "black_hand")
+
+    @black_cards.setter
+    def black_cards(self, cards: Iterable[int]):
+        self.black_hand = _as_mask(cards)
+
+    @property
+    def remaining_missions(self) -> MaskView:
+        return MaskView(self, "missions", offset=1)
+
+    @remaining_missions.setter
+    def remaining_missions(self, missions: Iterable[int]):
+        self.missions = _as_mask(missions, offset=1)
+
+    @property
+    def key(self) -> Tuple[int, int, int, int, int, Optional[int]]:
+        """A hashable snapshot of the game state (excluding players)."""
+        return (
+            self.white_hand,
+            self.black_hand,
+            self.missions,
+            self.white_score,
+            self.black_score,
+            self.current_mission,
+        )
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Spymaster):
+            return NotImplemented
+        return (
+            self.white is other.white
+            and self.black is other.black
+            and self.key == other.key
+        )
+
+    __hash__ = None  # type: ignore  # mutable; hash game.key instead
+
+    def __repr__(self) -> str:
+        return (
+            f"Spymaster(white={self.white!r}, black={self.black!r}, "
+            f"white_cards={self.white_cards!r}, black_cards={self.black_cards!r}, "
+            f"white_score={self.white_score}, black_score={self.black_score}, "
+            f"current_mission={self.current_mission}, "
+            f"remaining_missions={self.remaining_missions!r})"
+        )
+
+    def copy(self) -> "Spymaster":
+        return self.from_masks(
+            white=self.white,
+            black=self.black,
+            white_hand=self.white_hand,
+            black_hand=self.black_hand,
+            white_score=self.white_score,
+            black_score=self.black_score,
+            current_mission=self.current_mission,
+            missions=self.missions,
+            rng=self.rng,
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "white": playerencoder(self.white),
+            "black": playerencoder(self.black),
+            "whiteCards": bits_of(self.white_hand),
+            "blackCards": bits_of(self.black_hand),
+            "whiteScore": self.white_score,
+            "blackScore": self.black_score,
+            "currentMission": self.current_mission,
+            "remainingMissions": bits_of(self.missions, 1),
+        }
 
     def print_score(self):
         print(f"{self.white.name} (White): {self.white_score}")
         print(f"{self.black.name} (Black): {self.black_score}")
 
     def flipped(self):
-        return Spymaster(
+        return self.from_masks(
             white=self.black,
             black=self.white,
-            white_cards=self.black_cards,
-            black_cards=self.white_cards,
+            white_hand=self.black_hand,
+            black_hand=self.white_hand,
             white_score=self.black_score,
             black_score=self.white_score,
             current_mission=self.current_mission,
-            remaining_missions=self.remaining_missions,
+            missions=self.missions,
+            rng=self.rng,
         )
 
-    async def play(self):
-        while self.remaining_missions:
-            shuffle(self.remaining_missions)
-            self.current_mission = self.remaining_missions.pop()
-            self.remaining_missions.sort()
+    def draw_mission(self) -> int:
+        """Draw a mission uniformly at random from those remaining, and
+        make it the current mission.
+        """
+        mission = nth_bit(self.missions, self.rng.randrange(self.missions.bit_count()))
+        self.missions &= ~(1 << mission)
+        self.current_mission = mission + 1
+        return self.current_mission
 
-            white_play = self.choose_and_validate(self.white)
-            black_play = self.flipped().choose_and_validate(self.black)
-            result = self.resolve(await white_play, await black_play)
+    def decided(self) -> bool:
+        """Whether the winner is settled, between rounds: the leader is
+        further ahead than the other player could catch up, even winning
+        every remaining mission and assassinating the leader's highest
+        card.
+        """
+        lead = self.white_score - self.black_score
+        return bool(
+            lead > max_gain(self.black_hand, self.white_hand, self.missions)
+            or -lead > max_gain(self.white_hand, self.black_hand, self.missions)
+        )
+
+    async def play(
+        self, on_result: Optional[OnResult] = None, stop_when_decided: bool = False
+    ):
+        """Play the game to completion. If given, on_result is called
+        with the game and each round's result, from White's point of
+        view, before the players see it.
+
+        If stop_when_decided, the game ends as soon as the winner is
+        settled (see decided), with the scores as they are then: for
+        when only the outcome matters, not the final scores.
+        """
+        hooks = metrics.game_hooks()
+        while self.missions:
+            self.draw_mission()
+
+            # Both players choose at the same time, so that neither waits
+            # on the other (e.g. two online players)
+            white_play, black_play = await both(
+                hooks.pick(self.white, self.choose_and_validate(self.white)),
+                hooks.pick(self.black, self.flipped().choose_and_validate(self.black)),
+            )
+            result = hooks.resolve(self, white_play, black_play)
 
-            if not self.white_cards:
-                assert not self.black_cards
+            if not self.white_hand:
+                assert not self.black_hand
                 result.game_over = True
+            elif stop_when_decided and self.decided():
+                result.game_over = True
+            if on_result is not None:
+                on_result(self, result)
+
+            await hooks.receive(
+                both(
+                    self.white.receive(self, result),
+                    self.black.receive(self, result.flipped()),
+                )
+            )
+            hooks.round_played()
+            if result.game_over:
+                break
+        hooks.game_played()
 
-            wr = self.white.receive(self, result)
-            br = self.black.receive(self, result.flipped())
-            await wr
-            await br
+    def play_sync(
+        self, on_result: Optional[OnResult] = None, stop_when_decided: bool = False
+    ):
+        """Play the game to completion without an event loop. Both
+        players must be SyncPlayers. Illegal choices raise ValueError,
+        as they would from Player.warn_illegal_choice. on_result and
+        stop_when_decided are as for play.
+        """
+        white = self.white
+        black = self.black
+        hooks = metrics.game_hooks()
+        pick = hooks.pick_sync
+        while self.missions:
+            self.draw_mission()
+
+            white_play = pick(white, self)  # type: ignore[arg-type]
+            black_play = pick(black, self.flipped())  # type: ignore[arg-type]
+            result = hooks.resolve(self, white_play, black_play)
+
+            if not self.white_hand:
+                assert not self.black_hand
+                result.game_over = True
+            elif stop_when_decided and self.decided():
+                result.game_over = True
+            if on_result is not None:
+                on_result(self, result)
+
+            hooks.receive_sync(self, result)
+            hooks.round_played()
+            if result.game_over:
+                break
+        hooks.game_played()
 
     def resolve(self, white_play: int, black_play: int) -> MissionResult:
         """
@@ -110,29 +508,18 @@ class Spymaster:
         @param black_play: The card that Black played
         @return: MissionResult from White's point of view
         """
-        if white_play not in self.white_cards:
+        white_play = int(white_play)
+        black_play = int(black_play)
+        if not 0 <= white_play < 16 or not self.white_hand >> white_play & 1:
             raise ValueError("White card not in hand")
 
-        if black_play not in self.black_cards:
+        if not 0 <= black_play < 16 or not self.black_hand >> black_play & 1:
             raise ValueError("Black card not in hand")
 
-        self.white_cards.remove(white_play)
-        self.black_cards.remove(black_play)
-
-        dw = 0
-        db = 0
-        if white_play == black_play:
-            pass
-        elif white_play == 0:
-            dw = black_play
-        elif black_play == 0:
-            db = white_play
-        elif white_play > black_play:
-            dw = self.current_mission
-        elif white_play < black_play:
-            db = self.current_mission
-        else:
-            raise RuntimeError
+        self.white_hand &= ~(1 << white_play)
+        self.black_hand &= ~(1 << black_play)
+
+        dw, db = score_round(white_play, black_play, self.current_mission)
 
         self.white_score += dw
         self.black_score += db
@@ -154,3 +541,22 @@ class Spymaster:
             else:
                 print(f"{player.name} chose an illegal card: {picked}")
                 await player.warn_illegal_choice(self, picked)
+
+
+async def both(first: Awaitable[Any], second: Awaitable[Any]) -> List[Any]:
+    """Await two things concurrently. If either fails, the other is
+    cancelled.
+    """
+    tasks = [asyncio.ensure_future(first), asyncio.ensure_future(second)]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+
+
+def _as_mask(values: Iterable[int], offset: int = 0) -> int:
+    if isinstance(values, MaskView):
+        return values.mask
+    return mask_of(values, offset)
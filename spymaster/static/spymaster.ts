@@ -123,6 +123,42 @@ class GameState {
     this.remainingMissions = obj.remainingMissions;
   }
 
+  // From a snapshot message: ["s", version, white, black, whiteHand,
+  // blackHand, whiteScore, blackScore, currentMission, missions]
+  static fromSnapshot(msg: any[]): GameState {
+    return new GameState({
+      white: msg[2],
+      black: msg[3],
+      whiteCards: bits(msg[4], 0),
+      blackCards: bits(msg[5], 0),
+      whiteScore: msg[6],
+      blackScore: msg[7],
+      currentMission: msg[8],
+      remainingMissions: bits(msg[9], 1),
+    });
+  }
+
+  drawMission(mission: number) {
+    this.currentMission = mission;
+    this.remainingMissions = this.remainingMissions.filter((m) => m !== mission);
+  }
+
+  applyResult(result: MissionResult) {
+    this.whiteCards = this.whiteCards.filter((c) => c !== result.youPlayed);
+    this.blackCards = this.blackCards.filter((c) => c !== result.oppPlayed);
+    this.whiteScore += result.youScored;
+    this.blackScore += result.oppScored;
+  }
+}
+
+// The values of the set bits of a mask, plus offset
+function bits(mask: number, offset: number): number[] {
+  const values = [];
+  for (let i = 0; i < 16; i++) {
+    if (mask & (1 << i))
+      values.push(i + offset);
+  }
+  return values;
 }
 
 class MissionResult {
@@ -148,6 +184,19 @@ class MissionResult {
     this.oppScored = obj.oppScored;
     this.gameOver = obj.gameOver;
   }
+
+  // From a result message: ["r", youPlayed, oppPlayed, youScored,
+  // oppScored, gameOver]
+  static fromMessage(msg: any[], mission: number): MissionResult {
+    return new MissionResult({
+      youPlayed: msg[1],
+      oppPlayed: msg[2],
+      mission: mission,
+      youScored: msg[3],
+      oppScored: msg[4],
+      gameOver: msg[5] === 1,
+    });
+  }
 }
 
 function repaintUiForSituation() {
@@ -214,20 +263,34 @@ initializeButtons();
 
 let situation: GameState = null;
 
+// Keeps the page's query, e.g. /?opponent=human to play another person
 const url = new URL(window.location.href);
 url.protocol = 'ws:';
 url.pathname = '/ws';
 url.searchParams.set('whoami', 'Joanna');
 url.searchParams.set('white', 'yes');
+// Protocol version: a snapshot on connecting, then only the changes
+url.searchParams.set('v', '2');
+// Rejoin the game we were playing, if it is still going
+const code = sessionStorage.getItem("code");
+if (code !== null)
+  url.searchParams.set('code', code);
 const ws = new WebSocket(url.toString());
 
 ws.addEventListener("message", (event) => {
   const data = JSON.parse(event.data);
   console.log(data);
 
-  if (data["msgType"] === "situation") {
+  if (data["msgType"] === "session") {
+    sessionStorage.setItem("code", data["code"]);
+  } else if (data["msgType"] === "lobby") {
+    messageP.innerHTML = data["message"];
+  } else if (data[0] === "s") {
+    // snapshot of the game, sent when we connect
+    situation = GameState.fromSnapshot(data);
+  } else if (data[0] === "p") {
     // about to make a play
-    situation = new GameState(data["situation"]);
+    situation.drawMission(data[1]);
     nextMissionBtn.hidden = false;
 
     if (situation.whiteCards.length === 16) {
@@ -247,10 +310,10 @@ ws.addEventListener("message", (event) => {
       nextMissionBtn.hidden = true;
     });
 
-  } else if (data["msgType"] === "result") {
+  } else if (data[0] === "r") {
     // both sides have made a play, let's see the result
-    situation = new GameState(data["situation"]);
-    const result = new MissionResult(data["result"]);
+    const result = MissionResult.fromMessage(data, situation.currentMission);
+    situation.applyResult(result);
     console.log(result);
     updateUiForResult(result);
   }
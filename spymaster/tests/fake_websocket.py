@@ -0,0 +1,73 @@
+import asyncio
+from typing import Any, AsyncIterator, List, Optional
+
+from fastapi.websockets import WebSocketDisconnect
+
+
+class FakeWebSocket:
+    """Stands in for a client's websocket on the server side. Messages
+    the server sends are collected in sent; the client's messages are
+    queued with put, and disconnect makes the server's next receive
+    raise WebSocketDisconnect.
+    """
+
+    def __init__(self, query_params=None):
+        self.query_params = query_params or {}
+        self.sent: List[Any] = []
+        self.inbox: "asyncio.Queue[Any]" = asyncio.Queue()
+        self.new_message = asyncio.Event()
+        self.closed = False
+
+    async def accept(self) -> None:
+        pass
+
+    async def send_json(self, data: Any) -> None:
+        if self.closed:
+            raise WebSocketDisconnect(1006)
+        self.sent.append(data)
+        self.new_message.set()
+
+    async def receive_json(self) -> Any:
+        message = await self.inbox.get()
+        if message is None:
+            raise WebSocketDisconnect(1006)
+        return message
+
+    async def close(self, code: int = 1000, reason: Optional[str] = None) -> None:
+        self.closed = True
+        self.new_message.set()
+
+    def put(self, data: Any) -> None:
+        self.inbox.put_nowait(data)
+
+    def disconnect(self) -> None:
+        self.closed = True
+        self.inbox.put_nowait(None)
+
+    async def received(self, start: int = 0) -> AsyncIterator[Any]:
+        """The client's view: every message the server sends, from index
+        start onwards, until the websocket closes.
+        """
+        seen = start
+        while True:
+            while seen < len(self.sent):
+                seen += 1
+                yield self.sent[seen - 1]
+            if self.closed:
+                return
+            self.new_message.clear()
+            await self.new_message.wait()
+
+
+async def play_as_client(websocket: FakeWebSocket, start: int = 0) -> Any:
+    """Play the lowest card in each situation the server sends, until
+    the game is over. Returns the last result, or None if the websocket
+    closed first.
+    """
+    async for message in websocket.received(start):
+        if message["msgType"] == "situation":
+            cards = message["situation"]["whiteCards"]
+            websocket.put({"msgType": "card", "card": cards[0]})
+        elif message["msgType"] == "result" and message["result"]["gameOver"]:
+            return message["result"]
+    return None
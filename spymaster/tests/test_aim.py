@@ -0,0 +1,102 @@
+import copy
+import random
+import unittest
+
+import numpy as np
+
+from ..batch import BatchSpymaster
+from ..players import SyncPlayer
+from ..players.aim import (
+    aim,
+    aim_high,
+    aim_high_mask,
+    aim_low,
+    aim_low_mask,
+    aim_mask,
+    chuck,
+    chuck_mask,
+    mx,
+    mx_mask,
+)
+from ..players.computer_players import america, britain, china, russia
+from ..spymaster import Spymaster, bits_of
+
+
+class TestMasks(unittest.TestCase):
+    def test_same_as_collections(self):
+        rng = random.Random(0)
+        for _ in range(2000):
+            mine = rng.randrange(1, 1 << 16)
+            theirs = rng.randrange(1 << 16)
+            cards = bits_of(mine)
+            target = rng.randrange(16)
+            low = rng.randrange(1, 16)
+            high = rng.randrange(low, 16)
+            self.assertEqual(aim_high_mask(mine, target), aim_high(cards, target))
+            self.assertEqual(aim_low_mask(mine, target), aim_low(cards, target))
+            self.assertEqual(
+                mx_mask(mine, theirs, low, high),
+                mx(cards, bits_of(theirs), low, high),
+            )
+            seed = rng.random()
+            target = rng.randrange(20)
+            first = random.Random(seed)
+            second = random.Random(seed)
+            self.assertEqual(
+                aim_mask(mine, target, rng=first), aim(cards, target, rng=second)
+            )
+            self.assertEqual(chuck_mask(mine, first), chuck(cards, second))
+
+
+class TestBatchedPlayers(unittest.TestCase):
+    def test_seeded_same_as_one_at_a_time(self):
+        """Seeded games make the same choices batched as one at a time."""
+        seeds = list(range(200))
+        for player in (russia, britain):
+            batched = copy.copy(player)
+            looped = copy.copy(player)
+            first = BatchSpymaster(200, white=batched, black=china, seeds=seeds)
+            second = BatchSpymaster(200, white=looped, black=china, seeds=seeds)
+            for _ in range(16):
+                first.draw_missions()
+                second.draw_missions()
+                picks = batched.pick_batch(first)
+                np.testing.assert_array_equal(
+                    picks, SyncPlayer.pick_batch(looped, second)
+                )
+                replies = china.pick_batch(first.flipped())
+                china.pick_batch(second.flipped())
+                dw, db = first.resolve(picks, replies)
+                second.resolve(picks, replies)
+                batched.receive_batch(first, picks, replies, dw, db)
+                SyncPlayer.receive_batch(looped, second, picks, replies, dw, db)
+                self.assertEqual(batched.__dict__, looped.__dict__)
+
+    def test_america_plays_each_game_alone(self):
+        """America's aim depends only on the game it is playing, so its
+        seeded games end the same batched as alone.
+        """
+        seeds = list(range(50))
+        batch = BatchSpymaster(50, white=america, black=china, seeds=seeds)
+        batch.play()
+        for g, seed in enumerate(seeds):
+            game = Spymaster(white=america, black=china, rng=random.Random(seed))
+            game.play_sync()
+            scores = (batch.white_score[g], batch.black_score[g])
+            self.assertEqual(scores, (game.white_score, game.black_score))
+
+    def test_unseeded_distribution(self):
+        """Unseeded batches draw from numpy, with the same distribution."""
+        n_games = 20000
+        rng = np.random.default_rng(0)
+        batch = BatchSpymaster(n_games, white=russia, black=china, rng=rng)
+        batch.current_mission[:] = 16
+        picks = russia.pick_batch(batch)
+        game = batch.game(0)
+        game.rng = random.Random(0)
+        expected = [russia.pick_sync(game) for _ in range(n_games)]
+        np.testing.assert_allclose(
+            np.bincount(picks, minlength=16) / n_games,
+            np.bincount(expected, minlength=16) / n_games,
+            atol=0.02,
+        )
@@ -0,0 +1,96 @@
+import random
+import unittest
+
+import numpy as np
+
+from ..batch import BatchSpymaster
+from ..players.computer_players import america, china, russia
+from ..players.evolutionary_players import (
+    PerceptronPopulation,
+    SingleLayerPerceptronPlayer,
+    stack_weights,
+)
+from ..spymaster import Spymaster
+
+
+class TestBatchSpymaster(unittest.TestCase):
+    def test_resolve_matches_spymaster(self):
+        batch = BatchSpymaster(5, white=china, black=china)
+        batch.current_mission[:] = 10
+        white_play = np.array([3, 0, 7, 5, 0])
+        black_play = np.array([3, 9, 0, 2, 0])
+        games = batch.games()
+        results = [g.resolve(w, b) for g, w, b in zip(games, white_play, black_play)]
+
+        dw, db = batch.resolve(white_play, black_play)
+        self.assertEqual(dw.tolist(), [r.you_scored for r in results])
+        self.assertEqual(db.tolist(), [r.opp_scored for r in results])
+        self.assertEqual(dw.tolist(), [0, 9, 0, 10, 0])
+        self.assertEqual(db.tolist(), [0, 0, 7, 0, 0])
+        for g, game in enumerate(games):
+            self.assertEqual(batch.game(g).key, game.key)
+
+        with self.assertRaises(ValueError):
+            batch.resolve(white_play, np.array([4, 4, 4, 4, 3]))
+
+    def test_play(self):
+        batch = BatchSpymaster(20, white=russia, black=america)
+        batch.play()
+        self.assertFalse(batch.white_cards.any())
+        self.assertFalse(batch.black_cards.any())
+        self.assertFalse(batch.remaining_missions.any())
+
+    def test_perceptron_pick_batch_matches_pick_sync(self):
+        player = SingleLayerPerceptronPlayer.randomized()
+        batch = BatchSpymaster(10, white=player, black=china)
+        for _ in range(8):
+            batch.draw_missions()
+            picks = player.pick_batch(batch)
+            expected = [player.pick_sync(game) for game in batch.games()]
+            self.assertEqual(picks.tolist(), expected)
+            batch.resolve(picks, china.pick_batch(batch.flipped()))
+
+
+class TestPerceptronPopulation(unittest.TestCase):
+    def test_pick_batch_matches_players(self):
+        players = [SingleLayerPerceptronPlayer.randomized() for _ in range(4)]
+        blocked = PerceptronPopulation.from_players(players, 3)
+        assignment = np.array([3, 0, 0, 2, 1, 3, 2, 1, 0, 1, 2, 3])
+        gathered = PerceptronPopulation(stack_weights(players), assignment)
+        batch = BatchSpymaster(12, white=china, black=china)
+        for _ in range(5):
+            batch.draw_missions()
+            games = batch.games()
+            expected = [players[g // 3].pick_sync(game) for g, game in enumerate(games)]
+            self.assertEqual(blocked.pick_batch(batch).tolist(), expected)
+            expected = [players[p].pick_sync(g) for p, g in zip(assignment, games)]
+            self.assertEqual(gathered.pick_batch(batch).tolist(), expected)
+            batch.resolve(china.pick_batch(batch), china.pick_batch(batch.flipped()))
+
+
+class TestSeededGames(unittest.TestCase):
+    def test_seeded_batch_matches_spymaster(self):
+        seeds = [11, 22, 33, 44]
+        batch = BatchSpymaster(4, white=russia, black=china, seeds=seeds)
+        batch.play()
+        for g, seed in enumerate(seeds):
+            game = Spymaster(white=russia, black=china, rng=random.Random(seed))
+            game.play_sync()
+            self.assertEqual(game.white_score, batch.white_score[g])
+            self.assertEqual(game.black_score, batch.black_score[g])
+
+    def test_stop_when_decided(self):
+        seeds = list(range(20))
+        full = BatchSpymaster(20, white=russia, black=china, seeds=seeds)
+        full.play()
+        batch = BatchSpymaster(20, white=russia, black=china, seeds=seeds)
+        batch.play(stop_when_decided=True)
+        finished = ~batch.white_cards.any(axis=1)
+        self.assertTrue((batch.decided() | finished).all())
+        np.testing.assert_array_equal(
+            np.sign(batch.white_score - batch.black_score),
+            np.sign(full.white_score - full.black_score),
+        )
+        # Decided agrees with Spymaster.decided
+        for game, decided in zip(batch.games(), batch.decided()):
+            self.assertEqual(game.decided(), decided)
@@ -0,0 +1,29 @@
+import unittest
+
+from ..benchmarks.suite import compare, players, rate, server
+
+
+class TestBenchmarks(unittest.TestCase):
+    def test_rate(self):
+        self.assertGreater(rate(lambda: 10, min_seconds=0.01), 10)
+
+    def test_players(self):
+        results = players(quick=True)
+        self.assertIn("Russia_pick_us", results)
+        self.assertIn("Perceptron_pick_us", results)
+        self.assertTrue(all(us > 0 for us in results.values()))
+
+    def test_server(self):
+        results = server(quick=True)
+        self.assertGreater(results["messages_per_second"], 0)
+        self.assertGreater(results["games_per_second"], 0)
+
+    def test_compare(self):
+        baseline = {"results": {"engine": {"games_per_second": 100.0}}}
+        current = {
+            "results": {"engine": {"games_per_second": 150.0, "new_per_second": 1.0}}
+        }
+        table = compare(baseline, current)
+        self.assertIn("engine.games_per_second", table)
+        self.assertIn("+50.0%", table)
+        self.assertNotIn("new_per_second", table)
@@ -0,0 +1,116 @@
+import asyncio
+import unittest
+from unittest import mock
+
+from .. import protocol, webserver
+from ..broadcast import LAGGED, Channel
+from .fake_websocket import FakeWebSocket, play_as_client
+
+
+class TestChannel(unittest.TestCase):
+    def test_fan_out(self):
+        async def main():
+            channel = Channel()
+            subscriptions = [channel.subscribe() for _ in range(3)]
+            for event in range(5):
+                channel.publish(event)
+            channel.close()
+            return [[event async for event in s] for s in subscriptions]
+
+        self.assertEqual(asyncio.run(main()), [list(range(5))] * 3)
+
+    def test_slow_subscriber_lags(self):
+        async def main():
+            channel = Channel(maxsize=4)
+            slow = channel.subscribe()
+            fast = channel.subscribe()
+            events = []
+            for event in range(10):
+                channel.publish(event)
+                events.append(await fast.get())
+            channel.publish(10)
+            channel.close()
+            return events, [event async for event in slow], slow.n_dropped
+
+        events, slow, n_dropped = asyncio.run(main())
+        self.assertEqual(events, list(range(10)))
+        # Everything the slow subscriber missed is replaced with LAGGED
+        self.assertEqual(slow, [LAGGED])
+        self.assertEqual(n_dropped, 11)
+
+    def test_subscribe_after_close(self):
+        async def main():
+            channel = Channel()
+            channel.close()
+            return [event async for event in channel.subscribe()]
+
+        self.assertEqual(asyncio.run(main()), [])
+
+
+class SlowWebSocket(FakeWebSocket):
+    async def send_json(self, data):
+        await asyncio.sleep(0.01)
+        await super().send_json(data)
+
+
+def watch(messages):
+    """White's hand and both scores after the messages a spectator got."""
+    state = None
+    for message in messages:
+        if message[0] == protocol.SNAPSHOT:
+            state = [message[4], message[6], message[7]]
+        else:
+            _, _, white_played, _, white_scored, black_scored, _ = message
+            state[0] &= ~(1 << white_played)
+            state[1] += white_scored
+            state[2] += black_scored
+    return state
+
+
+class TestSpectators(unittest.TestCase):
+    def spectate(self, websocket_type, spectator_queue=64):
+        async def main():
+            player = FakeWebSocket()
+            handler = asyncio.create_task(webserver.ws(player))
+            async for message in player.received():
+                if message["msgType"] == "session":
+                    break
+            code = message["code"]
+            spectator = websocket_type({"code": code})
+            spectating = asyncio.create_task(webserver.spectate(spectator))
+            games = await webserver.games_view()
+            result = await play_as_client(player)
+            await handler
+            await spectating
+            return games, code, result, player.sent[-1], spectator
+
+        server = webserver.GameServer(spectator_queue=spectator_queue)
+        with mock.patch.object(webserver, "gs", server):
+            return asyncio.run(main())
+
+    def test_spectator(self):
+        games, code, _, last, spectator = self.spectate(FakeWebSocket)
+        self.assertEqual([game["code"] for game in games], [code])
+        situation = last["situation"]
+        self.assertEqual(
+            watch(spectator.sent),
+            [0, situation["whiteScore"], situation["blackScore"]],
+        )
+        self.assertTrue(spectator.closed)
+
+    def test_slow_spectator(self):
+        """A spectator that falls behind catches up with snapshots."""
+        _, _, _, last, spectator = self.spectate(SlowWebSocket, spectator_queue=2)
+        snapshots = [m for m in spectator.sent if m[0] == protocol.SNAPSHOT]
+        self.assertGreater(len(snapshots), 1)
+        situation = last["situation"]
+        self.assertEqual(
+            watch(spectator.sent),
+            [0, situation["whiteScore"], situation["blackScore"]],
+        )
+
+    def test_no_such_game(self):
+        spectator = FakeWebSocket({"code": "NOSUCH"})
+        asyncio.run(webserver.spectate(spectator))
+        self.assertTrue(spectator.closed)
+        self.assertEqual(spectator.sent, [])
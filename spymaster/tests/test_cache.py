@@ -0,0 +1,94 @@
+import asyncio
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from ..cache import GameCache
+from ..gene_pool import GenePool, PlayAgainstChallengerTournament, RoundRobinTournament
+
+
+class TestGameCache(unittest.TestCase):
+    def test_lookup(self):
+        cache = GameCache(max_size=2)
+        cache.store(["a", "b"], ["b", "a"], [1, 2], np.array([3, 4]), np.array([5, 6]))
+        found, white, black = cache.lookup(["a", "a"], ["b", "b"], [1, 2])
+        self.assertEqual(found.tolist(), [True, False])
+        self.assertEqual(white.tolist(), [3, 0])
+        self.assertEqual(black.tolist(), [5, 0])
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+        # ("a", "b", 1) was used more recently than ("b", "a", 2)
+        cache.store(["c"], ["a"], [3], np.array([0]), np.array([1]))
+        self.assertEqual(len(cache), 2)
+        found, _, _ = cache.lookup(["a", "b", "c"], ["b", "a", "a"], [1, 2, 3])
+        self.assertEqual(found.tolist(), [True, False, True])
+
+    def test_stopped(self):
+        cache = GameCache()
+        cache.store(["a"], ["b"], [1], np.array([3]), np.array([0]), stopped=True)
+        found, _, _ = cache.lookup(["a"], ["b"], [1])
+        self.assertEqual(found.tolist(), [False])
+        found, _, _ = cache.lookup(["a"], ["b"], [1], stopped=True)
+        self.assertEqual(found.tolist(), [True])
+
+    def test_save(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "cache.npz"
+            cache = GameCache(path=path)
+            seed = 2**64 - 1
+            cache.store(["a"], ["b"], [seed], np.array([60]), np.array([76]))
+            cache.save()
+            loaded = GameCache(path=path)
+        found, white, black = loaded.lookup(["a"], ["b"], [seed])
+        self.assertEqual(found.tolist(), [True])
+        self.assertEqual((white[0], black[0]), (60, 76))
+
+
+class TestCachedTournaments(unittest.TestCase):
+    def test_challenger(self):
+        pool = GenePool(n_players=4, tournament=RoundRobinTournament(), seed=0)
+        cache = GameCache()
+        tournament = PlayAgainstChallengerTournament(n_games=5, seed=1, cache=cache)
+        first = asyncio.run(tournament.play(pool.players))
+        second = asyncio.run(tournament.play(pool.players))
+        self.assertEqual(first, second)
+        self.assertEqual((cache.hits, cache.misses), (20, 20))
+        # The same as playing the games
+        uncached = PlayAgainstChallengerTournament(n_games=5, seed=1, cache=GameCache())
+        self.assertEqual(asyncio.run(uncached.play(pool.players)), first)
+
+    def test_shared_with_stopped_games(self):
+        pool = GenePool(n_players=4, tournament=RoundRobinTournament(), seed=0)
+        whites, blacks, seeds = [0, 1, 2], [1, 2, 3], [6, 106, 206]
+        cache = GameCache()
+        stopping = RoundRobinTournament(seed=1, cache=cache)
+        full = PlayAgainstChallengerTournament(seed=1, cache=cache)
+        stopped = asyncio.run(stopping.play_pairs(pool.players, whites, blacks, seeds))
+        cached = asyncio.run(full.play_pairs(pool.players, whites, blacks, seeds))
+        uncached = PlayAgainstChallengerTournament()
+        played = asyncio.run(uncached.play_pairs(pool.players, whites, blacks, seeds))
+        # The first game stops early
+        self.assertLess(stopped[0][0], played[0][0])
+        np.testing.assert_array_equal(cached, played)
+        self.assertEqual(len(cache), 6)
+
+    def test_needs_seed(self):
+        with self.assertRaises(ValueError):
+            RoundRobinTournament(cache=GameCache())
+
+    def test_gene_pool(self):
+        cache = GameCache()
+        pool = GenePool(
+            n_players=6,
+            tournament=RoundRobinTournament(seed=1, cache=cache),
+            n_replace=2,
+            seed=0,
+            cache=cache,
+        )
+        asyncio.run(pool.simulate(n_iterations=2))
+        # In the second generation, the games between the four survivors,
+        # and their games against the reference player, were cached
+        self.assertEqual(cache.hits, 4 * 3 + 4)
+        self.assertEqual(cache.misses, 2 * (6 * 5 + 6) - cache.hits)
@@ -0,0 +1,99 @@
+import asyncio
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from ..evolution_strategy import EvolutionStrategy, centered_ranks
+from ..gene_pool import PlayAgainstChallengerTournament
+from ..parallel import ParallelChallengerTournament
+from ..players.evolutionary_players import Network, NetworkPlayer
+
+
+def new_strategy(**kwargs):
+    tournament = PlayAgainstChallengerTournament(n_games=4, seed=1)
+    return EvolutionStrategy(n_players=6, tournament=tournament, seed=0, **kwargs)
+
+
+class TestEvolutionStrategy(unittest.TestCase):
+    def test_centered_ranks(self):
+        np.testing.assert_allclose(
+            centered_ranks([3.0, -10.0, 7.0, 5.0]), [-1 / 6, -0.5, 0.5, 1 / 6]
+        )
+
+    def test_gradient(self):
+        """The update climbs a score that rewards one weight."""
+        strategy = new_strategy()
+        start = strategy.center[0]
+        for _ in range(20):
+            noise = strategy.sample()
+            scores = strategy.population.reshape(6, -1)[:, 0]
+            strategy.update(strategy.gradient(noise, scores))
+            strategy.generation += 1
+        self.assertGreater(strategy.center[0], start + 1)
+
+    def test_antithetic_samples(self):
+        strategy = new_strategy()
+        strategy.sample()
+        parameters = strategy.population.reshape(6, -1)
+        np.testing.assert_allclose(
+            parameters[:3] + parameters[3:],
+            np.tile(2 * strategy.center, (3, 1)),
+            atol=1e-5,
+        )
+        for i, player in enumerate(strategy.players):
+            self.assertTrue(np.shares_memory(player.weights_matrix, parameters[i]))
+        with self.assertRaises(ValueError):
+            EvolutionStrategy(n_players=5, tournament=strategy.tournament)
+
+    def test_simulate(self):
+        strategy = new_strategy()
+        asyncio.run(strategy.simulate(n_iterations=2))
+        self.assertEqual(strategy.generation, 2)
+        self.assertEqual(len(strategy.history), 2)
+        best = strategy.best_player
+        np.testing.assert_array_equal(best.parameters, strategy.center)
+
+    def test_networks(self):
+        network = Network(hidden=(8,))
+        strategy = new_strategy(network=network, sigma=0.1)
+        asyncio.run(strategy.simulate(n_iterations=1))
+        self.assertIsInstance(strategy.best_player, NetworkPlayer)
+        self.assertEqual(strategy.population.shape, (6, network.n_parameters))
+
+    def test_parallel(self):
+        serial = new_strategy()
+        asyncio.run(serial.simulate(n_iterations=2))
+        with ParallelChallengerTournament(
+            n_games=4, max_workers=2, seed=1
+        ) as tournament:
+            strategy = EvolutionStrategy(n_players=6, tournament=tournament, seed=0)
+            asyncio.run(strategy.simulate(n_iterations=2))
+        np.testing.assert_array_equal(strategy.center, serial.center)
+
+    def test_resume(self):
+        strategy = new_strategy()
+        asyncio.run(strategy.simulate(n_iterations=3))
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "checkpoint.npz"
+            interrupted = new_strategy()
+            asyncio.run(interrupted.simulate(n_iterations=2, checkpoint_path=path))
+            tournament = PlayAgainstChallengerTournament(n_games=4, seed=1)
+            resumed = EvolutionStrategy.resume(path, tournament)
+        self.assertEqual(resumed.generation, 2)
+        asyncio.run(resumed.simulate(n_iterations=1))
+        self.assertEqual(resumed.history, strategy.history)
+        np.testing.assert_array_equal(resumed.center, strategy.center)
+
+    def test_fitness_is_center(self):
+        strategy = new_strategy()
+        strategy.sample()
+        fitness = asyncio.run(strategy.evaluate_fitness())
+        evaluator = new_strategy().fitness_evaluator
+        points = asyncio.run(
+            evaluator.play_against(
+                [strategy.best_player] * 6, strategy.reference_player
+            )
+        )
+        self.assertEqual(fitness, points.sum())
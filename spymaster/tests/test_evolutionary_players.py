@@ -1,7 +1,18 @@
 import asyncio
 import unittest
 
-from spymaster.players.evolutionary_players import SingleLayerPerceptronPlayer
+import numpy as np
+
+from spymaster.batch import BatchSpymaster
+from spymaster.players.computer_players import china
+from spymaster.players.evolutionary_players import (
+    Network,
+    NetworkPlayer,
+    NetworkPopulation,
+    SingleLayerPerceptronPlayer,
+    stack_parameters,
+    stackable,
+)
 from spymaster.spymaster import Spymaster
 
 
@@ -13,3 +24,67 @@ class TestSingleLayerPerceptronPlayer(unittest.TestCase):
         asyncio.run(game.play())
         game.print_score()
         print("---")
+
+    def test_create_offspring(self):
+        player = SingleLayerPerceptronPlayer.randomized(np.random.default_rng(0))
+        self.assertTrue(np.shares_memory(player.parameters, player.weights_matrix))
+        child = player.create_offspring(mutation_rate=0, rng=np.random.default_rng(1))
+        self.assertIsInstance(child, SingleLayerPerceptronPlayer)
+        np.testing.assert_array_equal(child.weights_matrix, player.weights_matrix)
+        self.assertFalse(np.shares_memory(child.parameters, player.parameters))
+        # Mutation adds noise, rather than scaling the weights
+        child = player.create_offspring(mutation_rate=0.1, rng=np.random.default_rng(1))
+        noise = child.weights_matrix - player.weights_matrix
+        self.assertAlmostEqual(float(noise.mean()), 0, delta=0.02)
+        self.assertAlmostEqual(float(noise.std()), 0.1, delta=0.02)
+
+
+class TestNetworkPlayer(unittest.TestCase):
+    network = Network(hidden=[24, 8], activation="relu")
+
+    def test_network(self):
+        self.assertEqual(self.network.hidden, (24, 8))
+        self.assertEqual(self.network.sizes, (51, 24, 8, 16))
+        self.assertEqual(self.network.n_parameters, 52 * 24 + 25 * 8 + 9 * 16)
+        with self.assertRaises(ValueError):
+            Network(activation="sigmoid")
+        with self.assertRaises(ValueError):
+            NetworkPlayer(name="bad", parameters=np.zeros(3))
+
+    def test_play(self):
+        white = NetworkPlayer.randomized(self.network)
+        game = Spymaster(white=white, black=china)
+        game.play_sync()
+        self.assertEqual(game.white_hand, 0)
+
+    def test_create_offspring(self):
+        player = NetworkPlayer.randomized(self.network, np.random.default_rng(0))
+        child = player.create_offspring(rng=np.random.default_rng(1))
+        self.assertIsInstance(child, NetworkPlayer)
+        self.assertEqual(child.network, self.network)
+        self.assertNotEqual(child.player_id, player.player_id)
+        # Same parameters, different architecture
+        tanh = Network(hidden=(24, 8), activation="tanh")
+        other = NetworkPlayer(name="other", parameters=player.parameters, network=tanh)
+        self.assertNotEqual(other.player_id, player.player_id)
+
+    def test_pick_batch_matches_pick_sync(self):
+        players = [
+            NetworkPlayer.randomized(self.network, np.random.default_rng(i))
+            for i in range(4)
+        ]
+        self.assertTrue(stackable(players))
+        self.assertFalse(stackable([*players, NetworkPlayer.randomized()]))
+        assignment = np.array([3, 0, 0, 2, 1, 3, 2, 1, 0, 1, 2])
+        population = NetworkPopulation(
+            self.network, stack_parameters(players), assignment
+        )
+        batch = BatchSpymaster(11, white=china, black=china)
+        for _ in range(8):
+            batch.draw_missions()
+            games = batch.games()
+            expected = [players[p].pick_sync(g) for p, g in zip(assignment, games)]
+            self.assertEqual(population.pick_batch(batch).tolist(), expected)
+            expected = [players[0].pick_sync(game) for game in games]
+            self.assertEqual(players[0].pick_batch(batch).tolist(), expected)
+            batch.resolve(china.pick_batch(batch), china.pick_batch(batch.flipped()))
@@ -0,0 +1,82 @@
+import asyncio
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from .. import webserver
+from ..players import SyncPlayer
+from ..players.computer_players import china
+from ..players.executor_player import ExecutorPlayer
+from ..spymaster import Spymaster
+
+
+class SlowPlayer(SyncPlayer):
+    """Plays its lowest card after a delay, noting what it is told."""
+
+    def __init__(self, delay: float):
+        super().__init__("Slow")
+        self.delay = delay
+        self.calls = []
+
+    def pick_sync(self, state):
+        time.sleep(self.delay)
+        self.calls.append("pick")
+        return state.white_cards[0]
+
+    def receive_sync(self, state, result):
+        self.calls.append("receive")
+
+
+def play(slow: SlowPlayer, deadline: float) -> ExecutorPlayer:
+    async def main():
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            player = ExecutorPlayer(
+                name="Slow", player=slow, executor=executor, deadline=deadline
+            )
+            await Spymaster(white=player, black=china).play()
+            await player.last_call
+        return player
+
+    return asyncio.run(main())
+
+
+class TestExecutorPlayer(unittest.TestCase):
+    def test_in_time(self):
+        slow = SlowPlayer(delay=0)
+        player = play(slow, deadline=5)
+        self.assertEqual(player.n_moves, 16)
+        self.assertEqual(player.n_fallbacks, 0)
+        self.assertEqual(slow.calls, ["pick", "receive"] * 16)
+
+    def test_fallback(self):
+        slow = SlowPlayer(delay=0.02)
+        player = play(slow, deadline=0.001)
+        self.assertEqual(player.n_fallbacks, 16)
+        # The player still sees every move and result, in order
+        self.assertEqual(slow.calls, ["pick", "receive"] * 16)
+
+    def test_event_loop_not_blocked(self):
+        async def main():
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                player = ExecutorPlayer(
+                    name="Slow", player=SlowPlayer(0.2), executor=executor
+                )
+                pick = asyncio.create_task(
+                    player.pick(Spymaster(white=player, black=china))
+                )
+                longest = 0.0
+                while not pick.done():
+                    start = time.monotonic()
+                    await asyncio.sleep(0.005)
+                    longest = max(longest, time.monotonic() - start)
+                return longest
+
+        self.assertLess(asyncio.run(main()), 0.1)
+
+    def test_server_ai_per_game(self):
+        server = webserver.GameServer()
+        first = server.new_opponent()
+        second = server.new_opponent()
+        self.assertIsInstance(first, ExecutorPlayer)
+        self.assertIsNot(first.player, second.player)
+        self.assertEqual(first.name, "Russia")
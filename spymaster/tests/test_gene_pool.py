@@ -0,0 +1,257 @@
+import asyncio
+import random
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+
+from .. import gene_pool
+from ..gene_pool import (
+    FitnessEvaluator,
+    GenePool,
+    PlayAgainstChallengerTournament,
+    RoundRobinTournament,
+    SwissTournament,
+    crossover,
+    select_parents,
+    swiss_pairs,
+)
+from ..players.computer_players import AmericaPlayer, computer_players, russia
+from ..players.evolutionary_players import Network, NetworkPlayer
+from ..ratings import EloRatings
+from ..spymaster import Spymaster
+
+players = list(computer_players.values())
+
+
+class TestTournaments(unittest.TestCase):
+    def test_round_robin_tournament(self):
+        scores = asyncio.run(RoundRobinTournament().play(players))
+        n = len(players)
+        self.assertEqual(len(scores), n)
+        # Every ordered pair plays once, and each game awards one point
+        self.assertEqual(sum(scores), n * (n - 1))
+
+    def test_play_against_challenger_tournament(self):
+        scores = asyncio.run(PlayAgainstChallengerTournament().play(players[:2]))
+        self.assertEqual(len(scores), 2)
+
+    def test_swiss_tournament(self):
+        # Two rounds of two pairs and a bye, two games per pair
+        scores = asyncio.run(SwissTournament(n_rounds=2).play(players))
+        self.assertEqual(len(scores), len(players))
+        self.assertEqual(sum(scores), 2 * (2 * 2 + 1))
+
+    def test_seeded_swiss_tournament(self):
+        pool = GenePool(n_players=16, tournament=RoundRobinTournament())
+        first = asyncio.run(SwissTournament(seed=3).play(pool.players))
+        second = asyncio.run(SwissTournament(seed=3).play(pool.players))
+        self.assertEqual(first, second)
+        # Five rounds of eight pairs
+        self.assertEqual(sum(first), 5 * 8 * 2)
+
+    def test_stop_when_decided(self):
+        pool = GenePool(n_players=6, tournament=RoundRobinTournament(), seed=0)
+        for competitors in (players, pool.players):
+            tournament = RoundRobinTournament(seed=2)
+            full = RoundRobinTournament(seed=2)
+            full.stop_when_decided = False
+            self.assertEqual(
+                asyncio.run(tournament.play(competitors)),
+                asyncio.run(full.play(competitors)),
+            )
+        self.assertFalse(PlayAgainstChallengerTournament.stop_when_decided)
+
+    def test_sync_players_are_batched(self):
+        whites = np.array([0, 0, 1, 2, 0, 1])
+        blacks = np.array([1, 1, 0, 0, 2, 0])
+        seeds = list(range(len(whites)))
+        tournament = PlayAgainstChallengerTournament()
+        with mock.patch.object(gene_pool, "play_games") as play_games:
+            white_scores, black_scores = asyncio.run(
+                tournament.play_new(players, whites, blacks, seeds)
+            )
+        play_games.assert_not_called()
+        for k, (i, j) in enumerate(zip(whites, blacks)):
+            game = Spymaster(
+                white=players[i], black=players[j], rng=random.Random(seeds[k])
+            )
+            game.play_sync()
+            self.assertEqual(white_scores[k], game.white_score)
+            self.assertEqual(black_scores[k], game.black_score)
+
+    def test_seeded_with_america_in_another_process(self):
+        script = (
+            "import asyncio\n"
+            "from spymaster.gene_pool import RoundRobinTournament\n"
+            "from spymaster.players.computer_players import AmericaPlayer, russia\n"
+            "players = [AmericaPlayer('a'), russia, AmericaPlayer('b')]\n"
+            "print(asyncio.run(RoundRobinTournament(seed=1).play(players)))\n"
+        )
+        root = Path(__file__).parents[2]
+        output = subprocess.run(
+            [sys.executable, "-c", script],
+            cwd=root,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        competitors = [AmericaPlayer("a"), russia, AmericaPlayer("b")]
+        scores = asyncio.run(RoundRobinTournament(seed=1).play(competitors))
+        self.assertEqual(output.strip(), str(scores))
+
+    def test_swiss_pairs(self):
+        pairs, bye = swiss_pairs([0, 1, 2, 3, 4], met={(0, 1)}, had_bye={4})
+        self.assertEqual(bye, 3)
+        self.assertEqual(pairs, [(0, 2), (1, 4)])
+        # Rematches only when there is no one else left
+        pairs, bye = swiss_pairs([0, 1], met={(0, 1)}, had_bye=set())
+        self.assertEqual(pairs, [(0, 1)])
+        self.assertIsNone(bye)
+
+
+class TestGenePool(unittest.TestCase):
+    def test_simulate(self):
+        pool = GenePool(n_players=4, tournament=RoundRobinTournament(), n_replace=1)
+        asyncio.run(pool.simulate(n_iterations=2))
+        self.assertEqual(len(pool.players), 4)
+
+    def test_fitness_evaluator(self):
+        pool = GenePool(n_players=4, tournament=RoundRobinTournament(), n_replace=1)
+        fitness = asyncio.run(FitnessEvaluator().evaluate_population(pool))
+        self.assertTrue(0 <= fitness <= 4)
+
+    def test_population_round_robin(self):
+        pool = GenePool(n_players=5, tournament=RoundRobinTournament())
+        scores = asyncio.run(RoundRobinTournament().play(pool.players))
+        self.assertEqual(sum(scores), 5 * 4)
+
+    def test_networks(self):
+        network = Network(hidden=(8,))
+        pool = GenePool(
+            n_players=5, tournament=RoundRobinTournament(), n_replace=2, network=network
+        )
+        self.assertEqual(pool.population.shape, (5, network.n_parameters))
+        asyncio.run(pool.simulate(n_iterations=2))
+        for i, player in enumerate(pool.players):
+            self.assertIsInstance(player, NetworkPlayer)
+            self.assertTrue(np.shares_memory(player.parameters, pool.population[i]))
+
+
+class TestGeneticOperators(unittest.TestCase):
+    def test_select_parents(self):
+        rng = np.random.default_rng(0)
+        scores = np.array([3.0, 1.0, 4.0, 1.0, 5.0])
+        self.assertEqual(select_parents(scores, 2).tolist(), [4, 2])
+        # A tournament of many contestants almost always includes the best
+        parents = select_parents(scores, 10, "tournament", 50, rng)
+        self.assertEqual(parents.tolist(), [4] * 10)
+        parents = select_parents(scores, 10_000, "rank", rng=rng)
+        counts = np.bincount(parents, minlength=5) / 10_000
+        np.testing.assert_allclose(counts, np.array([3, 1, 4, 2, 5]) / 15, atol=0.02)
+        with self.assertRaises(ValueError):
+            select_parents(scores, 2, "roulette")
+
+    def test_crossover(self):
+        rng = np.random.default_rng(0)
+        first = np.zeros((100, 16, 51), dtype=np.float32)
+        second = np.ones((100, 16, 51), dtype=np.float32)
+        self.assertFalse(crossover(first.copy(), second, 0.0, rng).any())
+        children = crossover(first.copy(), second, 1.0, rng)
+        # Whole rows come from one parent or the other
+        rows = children.mean(axis=2)
+        self.assertTrue(np.isin(rows, [0, 1]).all())
+        self.assertAlmostEqual(rows.mean(), 0.5, delta=0.05)
+
+    def test_replacement(self):
+        ratings = EloRatings()
+        pool = GenePool(
+            n_players=8,
+            tournament=RoundRobinTournament(),
+            n_replace=3,
+            seed=0,
+            ratings=ratings,
+            selection="tournament",
+            crossover_rate=0.5,
+        )
+        players = list(pool.players)
+        before = pool.population.copy()
+        scores = np.arange(8.0)[::-1]
+        for player, score in zip(pool.players, scores):
+            ratings.get(player.player_id).rating = score
+        pool.replacement(scores)
+
+        self.assertEqual(pool.players, players)
+        changed = (pool.population != before).any(axis=(1, 2))
+        self.assertEqual(np.nonzero(changed)[0].tolist(), [5, 6, 7])
+        # The offspring start at their parents' ratings, and the players
+        # they replaced are forgotten
+        self.assertEqual(len(ratings), 8)
+        for player in pool.players[5:]:
+            self.assertIn(ratings.rating(player.player_id), scores)
+
+
+class TestCheckpoints(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = Path(self.directory.name) / "checkpoint.npz"
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def new_pool(self, **kwargs):
+        tournament = RoundRobinTournament(seed=1)
+        return GenePool(
+            n_players=6, tournament=tournament, n_replace=2, seed=0, **kwargs
+        )
+
+    def test_players_are_views(self):
+        pool = self.new_pool()
+        asyncio.run(pool.simulate(n_iterations=2))
+        self.assertEqual(pool.population.shape, (6, 16, 51))
+        self.assertEqual(pool.population.dtype, np.float32)
+        for i, player in enumerate(pool.players):
+            self.assertTrue(np.shares_memory(player.weights_matrix, pool.population[i]))
+
+    def test_resume(self):
+        pool = self.new_pool()
+        asyncio.run(pool.simulate(n_iterations=4))
+
+        interrupted = self.new_pool()
+        asyncio.run(
+            interrupted.simulate(
+                n_iterations=3, checkpoint_path=self.path, checkpoint_every=2
+            )
+        )
+        self.assertFalse(self.path.with_name(self.path.name + ".tmp").exists())
+        resumed = GenePool.resume(self.path, RoundRobinTournament(seed=1))
+        self.assertEqual(resumed.generation, 3)
+        asyncio.run(resumed.simulate(n_iterations=1))
+
+        self.assertEqual(resumed.generation, 4)
+        self.assertEqual(resumed.history, pool.history)
+        np.testing.assert_array_equal(resumed.population, pool.population)
+
+    def test_resume_networks(self):
+        network = Network(hidden=(8, 4), activation="relu")
+        pool = self.new_pool(network=network, crossover_rate=0.5)
+        asyncio.run(pool.simulate(n_iterations=2, checkpoint_path=self.path))
+        resumed = GenePool.resume(self.path, RoundRobinTournament(seed=1))
+        self.assertEqual(resumed.network, network)
+        np.testing.assert_array_equal(resumed.population, pool.population)
+        asyncio.run(resumed.simulate(n_iterations=1))
+        asyncio.run(pool.simulate(n_iterations=1))
+        np.testing.assert_array_equal(resumed.population, pool.population)
+
+    def test_memmap(self):
+        population_path = Path(self.directory.name) / "population.npy"
+        pool = self.new_pool(population_path=population_path)
+        self.assertIsInstance(pool.population, np.memmap)
+        asyncio.run(pool.simulate(n_iterations=1, checkpoint_path=self.path))
+        np.testing.assert_array_equal(
+            np.load(population_path, mmap_mode="r"), pool.population
+        )
@@ -0,0 +1,130 @@
+import asyncio
+import unittest
+from unittest import mock
+
+from .. import webserver
+from ..lobby import Lobby
+from ..players.online_player import OnlinePlayer
+from .fake_websocket import FakeWebSocket, play_as_client
+
+
+def pair(white, black):
+    return white.name, black.name
+
+
+class TestLobby(unittest.TestCase):
+    def test_pairs_in_order_of_arrival(self):
+        async def main():
+            lobby = Lobby(wait_timeout=5)
+            players = [OnlinePlayer(name=str(i)) for i in range(4)]
+            waiting = [asyncio.create_task(lobby.match(p, pair)) for p in players]
+            return await asyncio.gather(*waiting)
+
+        self.assertEqual(
+            asyncio.run(main()), [("0", "1"), ("0", "1"), ("2", "3"), ("2", "3")]
+        )
+
+    def test_timeout(self):
+        async def main():
+            lobby = Lobby(wait_timeout=0.01)
+            result = await lobby.match(OnlinePlayer(name="alone"), pair)
+            return result, len(lobby)
+
+        self.assertEqual(asyncio.run(main()), (None, 0))
+
+    def test_leave(self):
+        async def main():
+            lobby = Lobby(wait_timeout=5)
+            gone = OnlinePlayer(name="gone")
+            waiting = asyncio.create_task(lobby.match(gone, pair))
+            await asyncio.sleep(0)
+            lobby.leave(gone)
+            left = await waiting
+            arrived = [OnlinePlayer(name="a"), OnlinePlayer(name="b")]
+            paired = await asyncio.gather(*(lobby.match(p, pair) for p in arrived))
+            return left, paired
+
+        left, paired = asyncio.run(main())
+        self.assertIsNone(left)
+        self.assertEqual(paired, [("a", "b"), ("a", "b")])
+
+
+async def connect(n_clients: int, **query) -> list:
+    """Connect n_clients stand-in clients to the server, one at a time."""
+    clients = []
+    for _ in range(n_clients):
+        websocket = FakeWebSocket(query)
+        clients.append((websocket, asyncio.create_task(webserver.ws(websocket))))
+        await asyncio.sleep(0)
+    return clients
+
+
+class TestMatchmaking(unittest.TestCase):
+    def play(self, n_clients: int, lobby_timeout: float = 30.0):
+        """Play games between n_clients clients that want a human opponent."""
+
+        async def main():
+            clients = await connect(n_clients, opponent="human")
+            results = await asyncio.gather(*(play_as_client(ws) for ws, _ in clients))
+            await asyncio.gather(*(handler for _, handler in clients))
+            return [ws for ws, _ in clients], results
+
+        server = webserver.GameServer(lobby_timeout=lobby_timeout)
+        with mock.patch.object(webserver, "gs", server):
+            return asyncio.run(main())
+
+    def test_human_game(self):
+        clients, results = self.play(2)
+        white, black = clients
+        self.assertEqual(white.sent[0]["msgType"], "lobby")
+        self.assertEqual(white.sent[1]["msgType"], "session")
+        situation = next(m for m in black.sent if m["msgType"] == "situation")
+        self.assertEqual(situation["situation"]["black"], white.sent[1]["code"])
+        # Each client sees the game from their own side
+        self.assertEqual(results[0]["youScored"], results[1]["oppScored"])
+        self.assertEqual(results[0]["oppPlayed"], results[1]["youPlayed"])
+        self.assertTrue(all(result["gameOver"] for result in results))
+
+    def test_ai_fallback(self):
+        clients, results = self.play(1, lobby_timeout=0.01)
+        situation = next(m for m in clients[0].sent if m["msgType"] == "situation")
+        self.assertEqual(situation["situation"]["black"], "Russia")
+        self.assertTrue(results[0]["gameOver"])
+
+    def test_disconnect_while_waiting(self):
+        async def main():
+            [(gone, handler)] = await connect(1, opponent="human")
+            while not server.lobby:
+                await asyncio.sleep(0)
+            waiting = len(server.lobby)
+            gone.disconnect()
+            await handler
+            # The next player doesn't get paired with the one who left
+            [(websocket, handler)] = await connect(1, opponent="human")
+            result = await play_as_client(websocket)
+            await handler
+            return waiting, websocket, result
+
+        server = webserver.GameServer(lobby_timeout=0.05)
+        with mock.patch.object(webserver, "gs", server):
+            waiting, websocket, result = asyncio.run(main())
+        self.assertEqual(waiting, 1)
+        self.assertEqual(len(server.lobby), 0)
+        situation = next(m for m in websocket.sent if m["msgType"] == "situation")
+        self.assertEqual(situation["situation"]["black"], "Russia")
+        self.assertTrue(result["gameOver"])
+
+    def test_load(self):
+        """Many clients arriving at once are paired up, and all their
+        games are played to the end.
+        """
+        n_clients = 20
+        clients, results = self.play(n_clients)
+        self.assertTrue(all(result["gameOver"] for result in results))
+        opponents = {
+            next(m for m in ws.sent if m["msgType"] == "situation")["situation"][
+                "black"
+            ]
+            for ws in clients
+        }
+        self.assertEqual(len(opponents), n_clients)
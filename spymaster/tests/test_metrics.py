@@ -0,0 +1,92 @@
+import asyncio
+import unittest
+from unittest import mock
+
+from .. import metrics, webserver
+from ..gene_pool import GenePool, RoundRobinTournament
+from ..metrics import MetricsRegistry
+from ..players.computer_players import china, russia
+from ..spymaster import Spymaster
+
+
+class TestRegistry(unittest.TestCase):
+    def test_render(self):
+        registry = MetricsRegistry()
+        counter = registry.counter("games_total", "Games", ["player"])
+        counter.inc(1, 'Ru"ssia')
+        counter.inc(2, 'Ru"ssia')
+        self.assertIs(registry.counter("games_total", "Games", ["player"]), counter)
+        histogram = registry.histogram("pick_seconds", "Picks", buckets=[0.1, 1])
+        for value in (0.05, 0.5, 5):
+            histogram.observe(value)
+        self.assertEqual(
+            registry.render().splitlines(),
+            [
+                "# HELP games_total Games",
+                "# TYPE games_total counter",
+                'games_total{player="Ru\\"ssia"} 3',
+                "# HELP pick_seconds Picks",
+                "# TYPE pick_seconds histogram",
+                'pick_seconds_bucket{le="0.1"} 1',
+                'pick_seconds_bucket{le="1"} 2',
+                'pick_seconds_bucket{le="+Inf"} 3',
+                "pick_seconds_sum 5.55",
+                "pick_seconds_count 3",
+            ],
+        )
+        with self.assertRaises(ValueError):
+            registry.gauge("games_total", "Games")
+        with self.assertRaises(ValueError):
+            counter.inc(1)
+        with self.assertRaises(TypeError):
+            metrics.Metric("untyped", "Not a kind of metric")
+
+    def test_server_leaves_instrumentation_alone(self):
+        webserver.GameServer(registry=MetricsRegistry())
+        self.assertIsNone(metrics.instruments)
+
+
+class TestInstruments(unittest.TestCase):
+    def setUp(self):
+        self.instruments = metrics.enable(MetricsRegistry())
+
+    def tearDown(self):
+        metrics.disable()
+
+    def test_play_sync(self):
+        Spymaster(white=russia, black=china).play_sync()
+        pick_seconds = self.instruments.pick_seconds
+        self.assertEqual(pick_seconds.count("RussiaPlayer"), 16)
+        self.assertEqual(pick_seconds.count("RandomPlayer"), 16)
+        self.assertEqual(self.instruments.resolve_seconds.count(), 16)
+        self.assertEqual(self.instruments.rounds.get(), 16)
+        self.assertEqual(self.instruments.games.get(), 1)
+
+        metrics.disable()
+        Spymaster(white=russia, black=china).play_sync()
+        self.assertEqual(self.instruments.games.get(), 1)
+
+    def test_play(self):
+        asyncio.run(Spymaster(white=russia, black=china).play())
+        self.assertEqual(self.instruments.pick_seconds.count("RussiaPlayer"), 16)
+        self.assertEqual(self.instruments.receive_seconds.count(), 16)
+        self.assertEqual(self.instruments.games.get(), 1)
+
+    def test_gene_pool(self):
+        pool = GenePool(n_players=4, tournament=RoundRobinTournament(), n_replace=1)
+        asyncio.run(pool.simulate(n_iterations=2))
+        generation_seconds = self.instruments.generation_seconds
+        for stage in ("tournament", "fitness", "breeding", "total"):
+            self.assertEqual(generation_seconds.count(stage), 2)
+        self.assertEqual(self.instruments.generations.get(), 2)
+
+    def test_endpoint(self):
+        registry = self.instruments.registry
+        server = webserver.GameServer(registry=registry)
+        with mock.patch.object(webserver, "gs", server):
+            asyncio.run(Spymaster(white=russia, black=china).play())
+            response = asyncio.run(webserver.metrics_view())
+        text = response.body.decode()
+        self.assertIn("spymaster_games_total 1", text)
+        self.assertIn("webserver_sessions 0", text)
+        self.assertIn('spymaster_pick_seconds_count{player="RussiaPlayer"} 16', text)
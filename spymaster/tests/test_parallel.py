@@ -0,0 +1,89 @@
+import asyncio
+import tempfile
+import unittest
+from pathlib import Path
+
+from ..gene_pool import GenePool, PlayAgainstChallengerTournament, RoundRobinTournament
+from ..parallel import (
+    ParallelChallengerTournament,
+    ParallelRoundRobinTournament,
+    player_from_spec,
+    player_spec,
+)
+from ..players.computer_players import computer_players, russia
+from ..players.evolutionary_players import (
+    Network,
+    NetworkPlayer,
+    SingleLayerPerceptronPlayer,
+)
+
+
+class TestParallelTournaments(unittest.TestCase):
+    def test_player_spec(self):
+        player = SingleLayerPerceptronPlayer.randomized()
+        rebuilt = player_from_spec(player_spec(player))
+        self.assertEqual(
+            rebuilt.weights_matrix.tolist(), player.weights_matrix.tolist()
+        )
+        self.assertIs(player_from_spec(player_spec(russia)), russia)
+        network = NetworkPlayer.randomized(Network(hidden=(4,)))
+        spec = player_spec(network)
+        self.assertEqual(spec[0], "network")
+        self.assertEqual(player_from_spec(spec).player_id, network.player_id)
+
+    def test_mapped_player_spec(self):
+        with tempfile.TemporaryDirectory() as directory:
+            pool = GenePool(
+                n_players=3,
+                tournament=RoundRobinTournament(),
+                population_path=Path(directory) / "population.npy",
+            )
+            pool.population.flush()
+            spec = player_spec(pool.players[2])
+            self.assertEqual(spec[0], "mapped")
+            rebuilt = player_from_spec(spec)
+            self.assertEqual(
+                rebuilt.weights_matrix.tolist(), pool.players[2].weights_matrix.tolist()
+            )
+            self.assertEqual(rebuilt.player_id, pool.players[2].player_id)
+            del rebuilt
+
+    def test_round_robin(self):
+        players = list(computer_players.values())
+        n = len(players)
+        with ParallelRoundRobinTournament(max_workers=2) as tournament:
+            scores = asyncio.run(tournament.play(players))
+            n_games = sum(stats.n_games for stats in tournament.stats)
+        self.assertEqual(n_games, n * (n - 1))
+        self.assertEqual(len(scores), n)
+        self.assertEqual(sum(scores), n * (n - 1))
+
+    def test_challenger(self):
+        players = [SingleLayerPerceptronPlayer.randomized() for _ in range(3)]
+        with ParallelChallengerTournament(n_games=4, max_workers=2) as tournament:
+            scores = asyncio.run(tournament.play(players))
+            self.assertIn("games/s", tournament.report())
+        self.assertEqual(len(scores), 3)
+
+    def test_seeded_matches_serial(self):
+        players = [SingleLayerPerceptronPlayer.randomized() for _ in range(4)]
+        with ParallelChallengerTournament(
+            n_games=5, max_workers=2, seed=42
+        ) as tournament:
+            parallel = asyncio.run(tournament.play(players))
+        serial = asyncio.run(
+            PlayAgainstChallengerTournament(n_games=5, seed=42).play(players)
+        )
+        self.assertEqual(parallel, serial)
+
+        with ParallelRoundRobinTournament(max_workers=2, seed=7) as tournament:
+            parallel = asyncio.run(tournament.play(players))
+        serial = asyncio.run(RoundRobinTournament(seed=7).play(players))
+        self.assertEqual(parallel, serial)
+
+        # Computer players, including America, which adapts within a game
+        computers = list(computer_players.values())
+        with ParallelRoundRobinTournament(max_workers=2, seed=7) as tournament:
+            parallel = asyncio.run(tournament.play(computers))
+        serial = asyncio.run(RoundRobinTournament(seed=7).play(computers))
+        self.assertEqual(parallel, serial)
@@ -0,0 +1,120 @@
+import asyncio
+import random
+import unittest
+
+from .. import protocol
+from ..players.computer_players import russia
+from ..players.online_player import OnlinePlayer
+from ..spymaster import Spymaster, bits_of
+from .fake_websocket import FakeWebSocket
+
+
+class DeltaClient:
+    """Keeps track of the game from version 2 messages, as the browser
+    does, playing its highest card each round.
+    """
+
+    def __init__(self, websocket: FakeWebSocket):
+        self.websocket = websocket
+        self.state = None
+        self.n_messages = 0
+
+    def apply(self, message):
+        kind = message[0]
+        if kind == protocol.SNAPSHOT:
+            _, _, _, _, wh, bh, ws, bs, _, missions = message
+            self.state = {
+                "hand": wh,
+                "opp_hand": bh,
+                "score": ws,
+                "opp_score": bs,
+                "missions": missions,
+            }
+        elif kind == protocol.PICK:
+            self.state["missions"] &= ~(1 << (message[1] - 1))
+            self.websocket.put({"card": bits_of(self.state["hand"])[-1]})
+        elif kind == protocol.RESULT:
+            _, you, opp, you_scored, opp_scored, game_over = message
+            self.state["hand"] &= ~(1 << you)
+            self.state["opp_hand"] &= ~(1 << opp)
+            self.state["score"] += you_scored
+            self.state["opp_score"] += opp_scored
+            return game_over
+
+    async def play(self, start: int = 0):
+        async for message in self.websocket.received(start):
+            self.n_messages += 1
+            if self.apply(message):
+                return
+
+    def matches(self, game: Spymaster) -> bool:
+        return self.state == {
+            "hand": game.white_hand,
+            "opp_hand": game.black_hand,
+            "score": game.white_score,
+            "opp_score": game.black_score,
+            "missions": game.missions,
+        }
+
+
+class TestDeltaProtocol(unittest.TestCase):
+    def test_game(self):
+        async def main():
+            websocket = FakeWebSocket({"v": "2"})
+            player = OnlinePlayer(name="You", websocket=websocket)
+            game = Spymaster(white=player, black=russia, rng=random.Random(0))
+            client = DeltaClient(websocket)
+            await asyncio.gather(game.play(), client.play())
+            return game, client
+
+        game, client = asyncio.run(main())
+        self.assertTrue(client.matches(game))
+        # One snapshot, then a pick and a result per round
+        self.assertEqual(client.n_messages, 1 + 2 * 16)
+
+    def test_snapshot_before_result(self):
+        game = Spymaster(white=russia, black=russia, rng=random.Random(1))
+        game.draw_mission()
+        before = protocol.snapshot(game)
+        result = game.resolve(3, 7)
+        self.assertEqual(protocol.snapshot(game, before=result), before)
+
+    def test_reconnect_before_result(self):
+        """A client that reconnects between picking and hearing the
+        result is brought up to date.
+        """
+
+        async def main():
+            first = FakeWebSocket({"v": "2"})
+            player = OnlinePlayer(name="You", websocket=first)
+            game = Spymaster(white=player, black=russia, rng=random.Random(2))
+            playing = asyncio.create_task(game.play())
+            async for message in first.received():
+                if message[0] == protocol.PICK:
+                    break
+            # Pick a card, then switch connections before the result
+            first.put({"card": 0})
+            second = FakeWebSocket({"v": "2"})
+            player.connect(second)
+            client = DeltaClient(second)
+            await asyncio.gather(playing, client.play())
+            return game, client, second
+
+        game, client, second = asyncio.run(main())
+        self.assertEqual(second.sent[0][0], protocol.SNAPSHOT)
+        self.assertEqual(second.sent[1][0], protocol.RESULT)
+        self.assertTrue(client.matches(game))
+
+    def test_version_1_by_default(self):
+        async def main():
+            websocket = FakeWebSocket()
+            player = OnlinePlayer(name="You", websocket=websocket)
+            game = Spymaster(white=player, black=russia)
+            game.draw_mission()
+            await player.wscomm.send_situation(game, None)
+            return websocket.sent[0]
+
+        message = asyncio.run(main())
+        self.assertEqual(message["msgType"], "situation")
+        self.assertEqual(message["message"], "Pick a card")
+        self.assertEqual(len(message["situation"]["whiteCards"]), 16)
@@ -0,0 +1,66 @@
+import asyncio
+import tempfile
+import unittest
+from pathlib import Path
+
+from ..gene_pool import GenePool, PlayAgainstChallengerTournament, RoundRobinTournament
+from ..players.computer_players import computer_players
+from ..ratings import EloRatings
+
+
+class TestEloRatings(unittest.TestCase):
+    def test_update(self):
+        ratings = EloRatings()
+        self.assertEqual(ratings.expected("a", "b"), 0.5)
+        ratings.update("a", "b", 1)
+        self.assertGreater(ratings.rating("a"), ratings.initial)
+        self.assertLess(ratings.rating("b"), ratings.initial)
+        self.assertAlmostEqual(ratings.rating("a") + ratings.rating("b"), 3000)
+        self.assertGreater(ratings.expected("a", "b"), 0.5)
+
+    def test_inherit_and_forget(self):
+        ratings = EloRatings()
+        ratings.update("a", "b", 1)
+        ratings.inherit("child", "a")
+        self.assertEqual(ratings.rating("child"), ratings.rating("a"))
+        self.assertEqual(ratings.get("child").games, 0)
+        ratings.forget(["a", "child"])
+        self.assertNotIn("a", ratings)
+        self.assertIn("b", ratings)
+
+    def test_save_and_load(self):
+        ratings = EloRatings(k=10)
+        ratings.update("a", "b", 0.5)
+        ratings.update("a", "c", 0)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "ratings.json"
+            ratings.save(path)
+            loaded = EloRatings.load(path)
+        self.assertEqual(loaded.k, 10)
+        self.assertEqual(loaded.ratings, ratings.ratings)
+
+
+class TestRatedTournaments(unittest.TestCase):
+    def test_round_robin_records_every_game(self):
+        players = list(computer_players.values())
+        ratings = EloRatings()
+        asyncio.run(RoundRobinTournament(ratings=ratings).play(players))
+        n = len(players)
+        self.assertEqual(
+            sum(r.games for r in ratings.ratings.values()), 2 * n * (n - 1)
+        )
+
+    def test_gene_pool_selects_on_ratings(self):
+        ratings = EloRatings()
+        pool = GenePool(
+            n_players=6,
+            tournament=PlayAgainstChallengerTournament(n_games=2),
+            n_replace=2,
+            ratings=ratings,
+            seed=0,
+        )
+        asyncio.run(pool.simulate(n_iterations=3))
+        ids = {player.player_id for player in pool.players}
+        self.assertTrue(ids <= set(ratings.ratings))
+        # Only the current players and the challenger are remembered
+        self.assertEqual(len(ratings), len(ids) + 1)
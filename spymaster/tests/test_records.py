@@ -0,0 +1,117 @@
+import asyncio
+import random
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from ..batch import BatchSpymaster, masks_of
+from ..gene_pool import GenePool, RoundRobinTournament
+from ..players.computer_players import china, computer_players, russia
+from ..records import (
+    NO_SEED,
+    GameLog,
+    GameRecorder,
+    players_path,
+    replay,
+    replay_batch,
+)
+from ..spymaster import Spymaster
+
+
+class TestRecords(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = Path(self.directory.name) / "games.log"
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_record_and_replay(self):
+        states = []
+
+        with GameRecorder(self.path, flush_every=2) as recorder:
+
+            def on_result(game, result):
+                recorder.on_result(game, result)
+                states.append(game.copy())
+
+            for seed in range(3):
+                game = Spymaster(white=russia, black=china, rng=random.Random(seed))
+                recorder.watch(game, seed)
+                game.play_sync(on_result)
+
+        log = GameLog(self.path)
+        self.assertEqual(len(log), 3)
+        self.assertEqual(log.players, ["Russia", "China"])
+        self.assertEqual(log.names(2), ["Russia", "China"])
+        self.assertEqual(log[1]["seed"], 1)
+        for g in range(3):
+            for n_rounds in (1, 8, 16):
+                expected = states[16 * g + n_rounds - 1]
+                replayed = replay(log[g], n_rounds)
+                self.assertEqual(replayed.key, expected.key)
+
+    def test_replay_batch(self):
+        with GameRecorder(self.path) as recorder:
+            for _ in range(5):
+                Spymaster(white=russia, black=china).play_sync(recorder.on_result)
+        log = GameLog(self.path)
+        self.assertTrue((log.records["seed"] == NO_SEED).all())
+        batch = replay_batch(log.records, n_rounds=10)
+        for g, game in enumerate(batch.games()):
+            self.assertEqual(game.key, replay(log[g], 10).key)
+
+    def test_batch_hook(self):
+        seeds = list(range(100, 120))
+        batch = BatchSpymaster(20, white=russia, black=china, seeds=seeds)
+        with GameRecorder(self.path) as recorder:
+            batch.play(recorder.batch_hook(["Russia"] * 20, ["China"] * 20, seeds))
+
+        log = GameLog(self.path)
+        self.assertEqual(log.records["seed"].tolist(), seeds)
+        replayed = replay_batch(log.records)
+        np.testing.assert_array_equal(replayed.white_score, batch.white_score)
+        np.testing.assert_array_equal(replayed.black_score, batch.black_score)
+        # The seed reproduces the recorded missions
+        game = Spymaster(white=russia, black=china, rng=random.Random(seeds[3]))
+        missions = []
+        game.play_sync(lambda game, result: missions.append(result.mission))
+        self.assertEqual(missions, log[3]["missions"].tolist())
+        self.assertEqual(masks_of(replayed.white_cards).tolist(), [0] * 20)
+
+    def test_append(self):
+        for player in (russia, china):
+            with GameRecorder(self.path) as recorder:
+                Spymaster(white=player, black=china).play_sync(recorder.on_result)
+        log = GameLog(self.path)
+        self.assertEqual(log.players, ["Russia", "China"])
+        self.assertEqual(log.records["white"].tolist(), [0, 1])
+
+    def test_not_a_log(self):
+        self.path.write_bytes(b"not a log")
+        with self.assertRaises(ValueError):
+            GameRecorder(self.path)
+        self.assertFalse(players_path(self.path).exists())
+
+    def test_tournament(self):
+        players = list(computer_players.values())
+        pool = GenePool(n_players=4, tournament=RoundRobinTournament())
+        with GameRecorder(self.path) as recorder:
+            tournament = RoundRobinTournament(seed=0, recorder=recorder)
+            scores = asyncio.run(tournament.play(players))
+            asyncio.run(tournament.play(pool.players))
+        log = GameLog(self.path)
+        self.assertEqual(len(log), 5 * 4 + 4 * 3)
+        self.assertEqual(len(log.players), 5 + 4)
+        # Replaying the round robin gives the same scores
+        records = log.records[:20]
+        batch = replay_batch(records)
+        wins = np.zeros(5)
+        np.add.at(wins, records["white"], batch.white_score > batch.black_score)
+        np.add.at(wins, records["black"], batch.black_score > batch.white_score)
+        draws = batch.white_score == batch.black_score
+        np.add.at(wins, records["white"], 0.5 * draws)
+        np.add.at(wins, records["black"], 0.5 * draws)
+        self.assertEqual(wins.tolist(), scores)
@@ -0,0 +1,37 @@
+import random
+import unittest
+
+from ..players.computer_players import china
+from ..players.search_players import MonteCarloPlayer
+from ..spymaster import Spymaster
+
+
+class TestMonteCarloPlayer(unittest.TestCase):
+    def test_beats_random_player(self):
+        player = MonteCarloPlayer("Monte Carlo", n_rollouts=100)
+        wins = 0
+        for seed in range(5):
+            game = Spymaster(white=player, black=china, rng=random.Random(seed))
+            game.play_sync()
+            self.assertFalse(game.white_cards)
+            wins += game.white_score > game.black_score
+        self.assertGreaterEqual(wins, 4)
+
+    def test_reuses_rollouts(self):
+        player = MonteCarloPlayer("Monte Carlo", n_rollouts=200, record_depth=1)
+        game = Spymaster(white=player, black=china, rng=random.Random(0))
+        game.draw_mission()
+        card = player.pick_sync(game)
+        root = player.tree[
+            (game.white_hand, game.black_hand, game.missions, game.current_mission, 0)
+        ]
+        self.assertEqual(sum(n for n, _ in root.values()), 200)
+        self.assertIn(card, root)
+        # Rollouts also record our decisions in the next round
+        self.assertGreater(len(player.tree), 1)
+
+    def test_time_limit(self):
+        player = MonteCarloPlayer("Monte Carlo", n_rollouts=10**9, time_limit=0.01)
+        game = Spymaster(white=player, black=china, rng=random.Random(0))
+        game.draw_mission()
+        player.pick_sync(game)
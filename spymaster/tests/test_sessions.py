@@ -0,0 +1,143 @@
+import asyncio
+import time
+import unittest
+
+from .. import webserver
+from ..players.computer_players import russia
+from ..players.online_player import OnlinePlayer
+from ..sessions import GameRegistry, Session
+from ..spymaster import Spymaster
+from .fake_websocket import FakeWebSocket, play_as_client
+
+
+def new_session(registry: GameRegistry) -> Session:
+    code = registry.new_code()
+    player = OnlinePlayer(name=code)
+    session = Session(
+        code=code, game=Spymaster(white=player, black=russia), player=player
+    )
+    registry.add(session)
+    return session
+
+
+class TestGameRegistry(unittest.TestCase):
+    def test_unique_codes(self):
+        registry = GameRegistry()
+        sessions = [new_session(registry) for _ in range(200)]
+        self.assertEqual(len({s.code for s in sessions}), 200)
+        self.assertIs(registry.get(sessions[0].code.lower()), sessions[0])
+        self.assertIsNone(registry.get("NOSUCH"))
+
+    def test_least_recently_used_evicted(self):
+        registry = GameRegistry(max_games=3)
+        first, second, third = (new_session(registry) for _ in range(3))
+        registry.get(first.code)
+        fourth = new_session(registry)
+        self.assertEqual(len(registry), 3)
+        self.assertIsNone(registry.get(second.code))
+        self.assertTrue(second.player.released.is_set())
+        for session in (first, third, fourth):
+            self.assertIs(registry.get(session.code), session)
+
+    def test_idle_evicted(self):
+        registry = GameRegistry(idle_timeout=60)
+        idle = new_session(registry)
+        idle.player.last_seen = time.monotonic() - 61
+        active = new_session(registry)
+        self.assertEqual(list(registry), [active])
+
+    def test_shared_game_outlives_one_idle_seat(self):
+        async def main():
+            registry = GameRegistry(idle_timeout=60)
+            white, black = OnlinePlayer(name="W"), OnlinePlayer(name="B")
+            game = Spymaster(white=white, black=black)
+            seats = [Session(code=p.name, game=game, player=p) for p in (white, black)]
+            for seat in seats:
+                registry.add(seat)
+            seats[0].start()
+            seats[1].start(seats[0].task)
+            white.last_seen = time.monotonic() - 61
+            registry.evict()
+            await asyncio.sleep(0)
+            still_playing = not seats[1].task.done()
+            black.last_seen = time.monotonic() - 61
+            registry.evict()
+            await asyncio.wait([seats[1].task], timeout=1)
+            return still_playing, seats[1].task.cancelled(), len(registry)
+
+        still_playing, cancelled, n_sessions = asyncio.run(main())
+        self.assertTrue(still_playing)
+        self.assertTrue(cancelled)
+        self.assertEqual(n_sessions, 0)
+
+
+class TestWebServer(unittest.TestCase):
+    def test_game(self):
+        async def play():
+            websocket = FakeWebSocket()
+            handler = asyncio.create_task(webserver.ws(websocket))
+            result = await play_as_client(websocket)
+            await handler
+            return websocket, result
+
+        websocket, result = asyncio.run(play())
+        self.assertEqual(websocket.sent[0]["msgType"], "session")
+        self.assertTrue(result["gameOver"])
+        self.assertTrue(websocket.closed)
+        self.assertIsNone(webserver.gs.registry.get(websocket.sent[0]["code"]))
+
+    def test_reconnect(self):
+        async def play():
+            first = FakeWebSocket()
+            handler = asyncio.create_task(webserver.ws(first))
+            async for message in first.received():
+                if message["msgType"] == "result":
+                    break
+                if message["msgType"] == "situation":
+                    first.put({"msgType": "card", "card": 15})
+            first.disconnect()
+            await handler
+
+            code = first.sent[0]["code"]
+            second = FakeWebSocket({"code": code})
+            handler = asyncio.create_task(webserver.ws(second))
+            result = await play_as_client(second)
+            await handler
+            return code, second, result
+
+        code, second, result = asyncio.run(play())
+        self.assertEqual(second.sent[0], {"msgType": "session", "code": code})
+        self.assertTrue(result["gameOver"])
+        # One mission was played before reconnecting
+        results = [m for m in second.sent if m["msgType"] == "result"]
+        self.assertEqual(len(results), 15)
+
+
+class BrokenWebSocket(FakeWebSocket):
+    """Raises error whenever the server sends anything."""
+
+    def __init__(self, error: Exception):
+        super().__init__()
+        self.error = error
+
+    async def send_json(self, data) -> None:
+        raise self.error
+
+
+class TestOnlinePlayer(unittest.TestCase):
+    def receive(self, error: Exception) -> OnlinePlayer:
+        player = OnlinePlayer(name="online", websocket=BrokenWebSocket(error))
+        game = Spymaster(white=player, black=russia)
+        game.draw_mission()
+        result = game.resolve(0, 0)
+        asyncio.run(player.receive(game, result))
+        return player
+
+    def test_closed_websocket_releases(self):
+        error = RuntimeError('Cannot call "send" once a close message has been sent.')
+        player = self.receive(error)
+        self.assertFalse(player.connected.is_set())
+
+    def test_other_errors_propagate(self):
+        with self.assertRaises(RuntimeError):
+            self.receive(RuntimeError("Something else went wrong"))
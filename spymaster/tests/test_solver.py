@@ -0,0 +1,84 @@
+import random
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from ..players.computer_players import china
+from ..solver import (
+    EndgameSolver,
+    EquilibriumPlayer,
+    pack,
+    solve_matrix_game,
+    solve_matrix_games,
+)
+from ..spymaster import Spymaster, mask_of
+
+
+def position(white_cards, black_cards, missions, diff=0):
+    return pack(
+        np.array([mask_of(white_cards)]),
+        np.array([mask_of(black_cards)]),
+        np.array([mask_of(missions, offset=1)]),
+        np.array([diff]),
+    )
+
+
+class TestMatrixGames(unittest.TestCase):
+    def test_known_games(self):
+        value, p, q = solve_matrix_game([[1, -1], [-1, 1]])
+        self.assertAlmostEqual(value, 0)
+        np.testing.assert_allclose(p, [0.5, 0.5])
+
+        value, p, q = solve_matrix_game([[0, -1, 1], [1, 0, -1], [-1, 1, 0]])
+        self.assertAlmostEqual(value, 0)
+        np.testing.assert_allclose(q, [1 / 3] * 3)
+
+        value, p, q = solve_matrix_game([[3, 0], [-1, 2]])
+        self.assertAlmostEqual(value, 1)
+        np.testing.assert_allclose(p, [0.5, 0.5])
+        np.testing.assert_allclose(q, [1 / 3, 2 / 3])
+
+    def test_strategies_are_optimal(self):
+        rng = np.random.default_rng(0)
+        payoffs = rng.normal(size=(50, 4, 4))
+        values, p, q = solve_matrix_games(payoffs)
+        # Neither player can do better than the value by deviating
+        row_payoffs = np.einsum("gij,gj->gi", payoffs, q)
+        col_payoffs = np.einsum("gi,gij->gj", p, payoffs)
+        self.assertTrue((row_payoffs <= values[:, None] + 1e-9).all())
+        self.assertTrue((col_payoffs >= values[:, None] - 1e-9).all())
+
+
+class TestEndgameSolver(unittest.TestCase):
+    def test_last_round(self):
+        solver = EndgameSolver()
+        self.assertEqual(solver.solve(position([5], [3], [7]))[0], 1)
+        self.assertEqual(solver.solve(position([0], [3], [7]))[0], 1)
+        self.assertEqual(solver.solve(position([3], [3], [7], diff=-1))[0], -1)
+
+    def test_symmetric_position_is_even(self):
+        solver = EndgameSolver()
+        value = solver.solve(position([0, 4, 9], [0, 4, 9], [2, 5, 11]))[0]
+        self.assertAlmostEqual(value, 0)
+
+    def test_save_and_load(self):
+        solver = EndgameSolver()
+        key = position([1, 6, 12, 15], [0, 2, 7, 14], [3, 8, 9, 16])
+        value = solver.solve(key)[0]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "endgames.npz"
+            solver.save(path)
+            loaded = EndgameSolver.load(path)
+        self.assertEqual(loaded.lookup(key, 4)[0], value)
+
+
+class TestEquilibriumPlayer(unittest.TestCase):
+    def test_play(self):
+        player = EquilibriumPlayer("Equilibrium", max_cards=3)
+        for seed in range(5):
+            game = Spymaster(white=player, black=china, rng=random.Random(seed))
+            game.play_sync()
+            self.assertFalse(game.white_cards)
+        self.assertIn(3, player.solver.levels)
@@ -0,0 +1,127 @@
+import asyncio
+import random
+import unittest
+
+import numpy as np
+
+from ..players.computer_players import america, china, russia
+from ..rng import GLOBAL_RNG
+from ..spymaster import Spymaster, bits_of, mask_of
+
+
+class TestSpymasterState(unittest.TestCase):
+    def test_mask_round_trip(self):
+        values = [0, 3, 7, 15]
+        self.assertEqual(bits_of(mask_of(values)), values)
+        self.assertEqual(bits_of(mask_of([1, 16], offset=1), offset=1), [1, 16])
+
+    def test_views_behave_like_lists(self):
+        game = Spymaster(white=russia, black=america)
+        self.assertEqual(game.white_cards, list(range(16)))
+        self.assertEqual(game.remaining_missions, list(range(1, 17)))
+        self.assertIn(0, game.white_cards)
+        self.assertNotIn(16, game.white_cards)
+        self.assertNotIn(0, game.remaining_missions)
+
+        game.white_cards.remove(5)
+        self.assertNotIn(5, game.white_cards)
+        self.assertEqual(len(game.white_cards), 15)
+        self.assertEqual(game.white_cards[5], 6)
+        self.assertEqual(game.white_cards[-1], 15)
+        with self.assertRaises(ValueError):
+            game.white_cards.remove(5)
+
+    def test_resolve(self):
+        game = Spymaster(white=russia, black=america, current_mission=10)
+        result = game.resolve(12, 4)
+        self.assertEqual(result.you_scored, 10)
+        self.assertEqual(game.white_score, 10)
+        self.assertNotIn(12, game.white_cards)
+        self.assertNotIn(4, game.black_cards)
+
+        result = game.resolve(0, 9)
+        self.assertEqual(result.you_scored, 9)
+        with self.assertRaises(ValueError):
+            game.resolve(0, 1)
+
+    def test_copy_and_key(self):
+        game = Spymaster(white=russia, black=america)
+        game.draw_mission()
+        clone = game.copy()
+        self.assertEqual(clone, game)
+        self.assertEqual(hash(clone.key), hash(game.key))
+        clone.white_cards.remove(0)
+        self.assertIn(0, game.white_cards)
+        self.assertNotEqual(clone.key, game.key)
+
+    def test_to_dict(self):
+        game = Spymaster(white=russia, black=america, white_cards=[1, 2])
+        d = game.to_dict()
+        self.assertEqual(d["white"], "Russia")
+        self.assertEqual(d["whiteCards"], [1, 2])
+        self.assertEqual(d["remainingMissions"], list(range(1, 17)))
+
+    def test_play(self):
+        game = Spymaster(white=russia, black=america)
+        asyncio.run(game.play())
+        self.assertFalse(game.white_cards)
+        self.assertFalse(game.remaining_missions)
+        self.assertLessEqual(game.white_score + game.black_score, 136 + 120)
+
+    def test_play_sync(self):
+        game = Spymaster(white=russia, black=america)
+        game.play_sync()
+        self.assertFalse(game.white_cards)
+        self.assertFalse(game.black_cards)
+        self.assertFalse(game.remaining_missions)
+
+    def test_unseeded_games_use_global_rng(self):
+        def play():
+            game = Spymaster(white=russia, black=china)
+            game.play_sync()
+            return game.to_dict()
+
+        GLOBAL_RNG.seed(7)
+        first = play()
+        GLOBAL_RNG.seed(7)
+        random.seed(8)
+        self.assertEqual(play(), first)
+
+    def test_decided(self):
+        game = Spymaster(
+            white=russia,
+            black=china,
+            white_cards=[5, 9],
+            black_cards=[0, 3],
+            white_score=20,
+            black_score=5,
+            remaining_missions=[2, 4],
+        )
+        # Black can still score 2 + 4 and assassinate White's 9
+        self.assertFalse(game.decided())
+        game.black_score = 4
+        self.assertTrue(game.decided())
+        game.black_cards = [1, 3]
+        game.black_score = 13
+        self.assertTrue(game.decided())
+        game.white_score = game.black_score
+        self.assertFalse(game.decided())
+
+    def test_stop_when_decided(self):
+        n_rounds = 0
+        for seed in range(50):
+            full = Spymaster(white=russia, black=china, rng=random.Random(seed))
+            full.play_sync()
+            results = []
+            game = Spymaster(white=russia, black=china, rng=random.Random(seed))
+            game.play_sync(
+                lambda game, result, results=results: results.append(result),
+                stop_when_decided=True,
+            )
+            self.assertTrue(results[-1].game_over)
+            n_rounds += len(results)
+            self.assertEqual(
+                np.sign(game.white_score - game.black_score),
+                np.sign(full.white_score - full.black_score),
+            )
+        self.assertLess(n_rounds, 50 * 16)
@@ -1,41 +1,178 @@
+import asyncio
+import copy
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
-from typing import Dict
+from typing import Any, Callable, Dict, List, Optional
 
-from commonmark import commonmark
 import uvicorn
+from commonmark import commonmark
 from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.websockets import WebSocket, WebSocketDisconnect
 
+from spymaster import metrics, protocol
+from spymaster.broadcast import LAGGED, Channel
+from spymaster.lobby import Lobby
+from spymaster.players import SyncPlayer
 from spymaster.players.computer_players import russia
-from spymaster.players.online_player import OnlinePlayer
-from .spymaster import Spymaster
+from spymaster.players.executor_player import ExecutorPlayer
+from spymaster.players.online_player import OnlinePlayer, disconnected
+from spymaster.sessions import GameRegistry, Session
+
+from .spymaster import MissionResult, Spymaster
 
 
 class GameServer:
-    def __init__(self):
+    """Serves games between online players, or against an AI.
+
+    Each game gets its own AI from new_ai (by default a copy of
+    russia), so that players that keep state between rounds don't
+    share it between games. The AI's moves are computed by a pool of
+    ai_workers threads rather than on the event loop, and a move that
+    isn't ready within ai_deadline seconds is replaced by a fallback
+    (see ExecutorPlayer).
+
+    Spectators can watch any game. Each has a queue of up to
+    spectator_queue results, beyond which they are sent a fresh
+    snapshot instead, so that they never hold up the game.
+
+    The metrics in registry are served at /metrics, along with the
+    server's own gauges. They include game timings while
+    instrumentation is enabled (see spymaster.metrics), which it is
+    for this module if SPYMASTER_METRICS=1.
+    """
+
+    def __init__(
+        self,
+        max_games: int = 1000,
+        idle_timeout: float = 600.0,
+        new_ai: Callable[[], SyncPlayer] = partial(copy.deepcopy, russia),
+        ai_workers: int = 4,
+        ai_deadline: float = 2.0,
+        lobby_timeout: float = 30.0,
+        spectator_queue: int = 64,
+        registry: metrics.MetricsRegistry = metrics.REGISTRY,
+    ):
         self.app = FastAPI()
-        self.games: Dict[str, Spymaster] = {}
-        self.online_players: Dict[str, OnlinePlayer] = {}
+        self.metrics = registry
+        self.registry = GameRegistry(max_games=max_games, idle_timeout=idle_timeout)
+        self.spectator_queue = spectator_queue
+        self.lobby: Lobby[List[Session]] = Lobby(wait_timeout=lobby_timeout)
+        self.new_ai = new_ai
+        self.ai_deadline = ai_deadline
+        self.ai_executor = ThreadPoolExecutor(
+            max_workers=ai_workers, thread_name_prefix="ai"
+        )
 
-    def connect_player(self, code: str, websocket: WebSocket) -> OnlinePlayer:
-        """If the player is already connected, update her websocket.
-        Otherwise create a new player.
-        """
-        # if code in self.online_players:
-        #     player = self.online_players[code]
-        #     player.websocket = websocket
-        # else:
-        player = OnlinePlayer(name=code, websocket=websocket, game=None)
-        game = Spymaster(white=player, black=russia)
+    def render_metrics(self) -> str:
+        """The metrics registry, after updating the server's gauges."""
+        sessions = list(self.registry)
+        self.metrics.gauge("webserver_sessions", "Sessions being served").set(
+            len(sessions)
+        )
+        self.metrics.gauge("webserver_spectators", "Spectators watching games").set(
+            sum(
+                len(s.channel)
+                for s in sessions
+                if s.game.white is s.player and not s.finished
+            )
+        )
+        self.metrics.gauge(
+            "webserver_lobby_waiting", "Players waiting in the lobby"
+        ).set(len(self.lobby))
+        return self.metrics.render()
+
+    def new_opponent(self) -> ExecutorPlayer:
+        ai = self.new_ai()
+        return ExecutorPlayer(
+            name=ai.name,
+            player=ai,
+            executor=self.ai_executor,
+            deadline=self.ai_deadline,
+        )
+
+    def new_session(
+        self,
+        player: OnlinePlayer,
+        game: Spymaster,
+        channel: Optional[Channel[MissionResult]] = None,
+    ) -> Session:
         player.game = game
-        self.games[code] = game
+        session = Session(
+            code=player.name,
+            game=game,
+            player=player,
+            channel=channel or Channel(self.spectator_queue),
+        )
+        self.registry.add(session)
+        return session
 
-        return player
+    def new_player(self) -> OnlinePlayer:
+        return OnlinePlayer(name=self.registry.new_code())
 
+    def pair(self, white: OnlinePlayer, black: OnlinePlayer) -> List[Session]:
+        """Start a game between two online players."""
+        game = Spymaster(white=white, black=black)
+        channel: Channel[MissionResult] = Channel(self.spectator_queue)
+        white_session, black_session = (
+            self.new_session(white, game, channel),
+            self.new_session(black, game, channel),
+        )
+        white_session.start()
+        black_session.start(white_session.task)
+        return [white_session, black_session]
+
+    async def join(self, websocket: WebSocket) -> Session:
+        """Find the session for a player who has just connected.
+
+        With the code of a game that is still going, the player rejoins
+        it. With opponent=human, the player waits in the lobby for
+        another online player, or for the AI if no one turns up.
+        Otherwise the player starts a new game against the AI.
+        """
+        code = websocket.query_params.get("code")
+        session = self.registry.get(code) if code else None
+        if session is not None:
+            return session
 
+        player = self.new_player()
+        if websocket.query_params.get("opponent") == "human":
+            await websocket.send_json(
+                {"msgType": "lobby", "message": "Waiting for an opponent..."}
+            )
+            sessions = await self.wait_in_lobby(player, websocket)
+            if sessions is not None:
+                return next(s for s in sessions if s.player is player)
+        return self.new_session(
+            player, Spymaster(white=player, black=self.new_opponent())
+        )
+
+    async def wait_in_lobby(
+        self, player: OnlinePlayer, websocket: WebSocket
+    ) -> Optional[List[Session]]:
+        """Wait in the lobby until paired, timed out, or disconnected.
+        Clients send nothing while they wait, so anything they do send
+        is ignored.
+        """
+        match = asyncio.ensure_future(self.lobby.match(player, self.pair))
+        while not match.done():
+            message = asyncio.ensure_future(websocket.receive_json())
+            await asyncio.wait([match, message], return_when=asyncio.FIRST_COMPLETED)
+            if not message.done():
+                message.cancel()
+            elif message.exception() is not None:
+                self.lobby.leave(player)
+                await match
+                raise message.exception()
+        return match.result()
+
+
+if os.environ.get("SPYMASTER_METRICS") == "1":
+    metrics.enable()
 gs = GameServer()
 app = gs.app
 templates = Jinja2Templates(directory=Path(__file__).parent / "templates")
@@ -54,11 +191,70 @@ async def index_view(request: Request) -> HTMLResponse:
 @app.websocket("/ws")
 async def ws(websocket: WebSocket):
     await websocket.accept()
-    player = gs.connect_player("QWERTY", websocket)
     try:
-        await player.game.play()
-    except WebSocketDisconnect as exc:
-        print("disconnected", exc.code, exc.reason)
+        session = await gs.join(websocket)
+        await websocket.send_json({"msgType": "session", "code": session.code})
+    except WebSocketDisconnect:
+        return
+    released = session.player.connect(websocket)
+    session.start()
+    # The game runs in its own task, which outlives this websocket if
+    # the player drops and comes back with the code
+    await released.wait()
+
+
+@app.get("/games")
+async def games_view() -> List[Dict[str, Any]]:
+    """The games being played, for spectators to choose from."""
+    return [
+        {
+            "code": session.code,
+            "white": session.game.white.name,
+            "black": session.game.black.name,
+            "whiteScore": session.game.white_score,
+            "blackScore": session.game.black_score,
+            "spectators": len(session.channel),
+        }
+        for session in gs.registry
+        if session.game.white is session.player and not session.finished
+    ]
+
+
+@app.websocket("/spectate")
+async def spectate(websocket: WebSocket):
+    """Watch the game with the given code: a snapshot of the game (in
+    version 2 of the protocol), then each round's result as it happens.
+    A spectator who falls behind gets a fresh snapshot instead of the
+    results they missed.
+    """
+    await websocket.accept()
+    session = gs.registry.get(websocket.query_params.get("code", ""))
+    if session is None:
+        await websocket.close(code=1008, reason="No such game")
+        return
+    game = session.game
+    subscription = session.channel.subscribe()
+    try:
+        await websocket.send_json(protocol.snapshot(game))
+        async for event in subscription:
+            if event is LAGGED:
+                await websocket.send_json(protocol.snapshot(game))
+            else:
+                await websocket.send_json(protocol.observed(event))
+        await websocket.close()
+    except (WebSocketDisconnect, RuntimeError) as error:
+        if not disconnected(error):
+            raise
+    finally:
+        session.channel.unsubscribe(subscription)
+
+
+@app.get("/metrics")
+async def metrics_view() -> PlainTextResponse:
+    """Metrics in the Prometheus text format."""
+    return PlainTextResponse(
+        gs.render_metrics(), media_type="text/plain; version=0.0.4"
+    )
 
 
 @app.get("/help")